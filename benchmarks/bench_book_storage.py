@@ -0,0 +1,106 @@
+"""
+Benchmark the two ways the recorder stores books (see marketdata/chunks.py), on synthetic books where each update
+changes a few levels near the top of the book, as depth updates mostly do:
+    - size: bytes per book of DEPTH chunks (all levels of every book) and BOOK_DELTA chunks (changed levels, with
+      a keyframe at the start of every chunk)
+    - random access: microseconds to get the book as of a random time, by binary search of the rows of DEPTH
+      chunks, and by seeking to the keyframe of a BOOK_DELTA chunk and applying the changes from there
+    - sequential read: books/sec rebuilding every book of the file
+
+Run from the repository root:
+    python -m benchmarks.bench_book_storage [levels] [chunk_rows]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from common.interface_book import OrderBook, PriceLevel, VenueOrderBook
+from marketdata.chunks import ChunkKind
+from marketdata.recorder import MarketDataRecorder, FILE_SUFFIX
+from marketdata.store import MarketDataStore
+
+BOOKS = 100000
+LOOKUPS = 5000
+EXCHANGE = 'Bench'
+SYMBOL = 'BTCUSDT'
+TICK = 0.1
+
+
+# books of a random walk: most updates change a size or two near the top, some move the mid by a tick; books are
+# interval milliseconds apart on average
+def synthetic_books(levels: int, count: int, seed: int = 1, interval: float = 50):
+    rng = random.Random(seed)
+    mid = 23142.95
+    bid_sizes = [round(rng.uniform(0.1, 5), 3) for _ in range(levels)]
+    ask_sizes = [round(rng.uniform(0.1, 5), 3) for _ in range(levels)]
+    timestamp = 1700000000000.0
+    for version in range(count):
+        move = rng.random()
+        if move < 0.05:
+            mid += TICK
+            bid_sizes = [round(rng.uniform(0.1, 5), 3)] + bid_sizes[:-1]
+            ask_sizes = ask_sizes[1:] + [round(rng.uniform(0.1, 5), 3)]
+        elif move < 0.1:
+            mid -= TICK
+            bid_sizes = bid_sizes[1:] + [round(rng.uniform(0.1, 5), 3)]
+            ask_sizes = [round(rng.uniform(0.1, 5), 3)] + ask_sizes[:-1]
+        else:
+            for _ in range(rng.randint(1, 2)):
+                sizes = bid_sizes if rng.random() < 0.5 else ask_sizes
+                sizes[min(int(rng.expovariate(0.7)), levels - 1)] = round(rng.uniform(0.1, 5), 3)
+        best_bid = round(mid - TICK / 2, 1)
+        best_ask = round(mid + TICK / 2, 1)
+        timestamp += rng.uniform(0, 2 * interval)
+        yield OrderBook(timestamp=timestamp, contract_name=SYMBOL,
+                        bids=[PriceLevel(round(best_bid - i * TICK, 1), bid_sizes[i]) for i in range(levels)],
+                        asks=[PriceLevel(round(best_ask + i * TICK, 1), ask_sizes[i]) for i in range(levels)],
+                        version=version, update_id=version)
+
+
+def record(directory: str, levels: int, chunk_rows: int, depth_format: ChunkKind, count: int = BOOKS,
+           interval: float = 50):
+    recorder = MarketDataRecorder(directory, levels=levels, chunk_rows=chunk_rows, flush_interval=60,
+                                  depth_format=depth_format)
+    recorder.start()
+    for book in synthetic_books(levels, count, interval=interval):
+        recorder.on_depth(EXCHANGE, VenueOrderBook(EXCHANGE, book))
+    recorder.close()
+
+
+# bytes of the recordings of a directory, indexes excluded
+def recorded_size(directory: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for path, _, names in os.walk(directory)
+               for name in names if name.endswith(FILE_SUFFIX))
+
+
+def measure(name: str, directory: str):
+    times = [book.timestamp for book in synthetic_books(1, BOOKS)]
+    rng = random.Random(2)
+    targets = [rng.uniform(times[0], times[-1]) for _ in range(LOOKUPS)]
+    store = MarketDataStore(directory, EXCHANGE)
+
+    start = time.perf_counter()
+    for target in targets:
+        store.book_at(SYMBOL, target)
+    random_access = (time.perf_counter() - start) / LOOKUPS * 1e6
+
+    start = time.perf_counter()
+    count = sum(1 for _ in store.books(SYMBOL))
+    rate = count / (time.perf_counter() - start)
+    store.close()
+
+    size = recorded_size(directory)
+    print('{:<11} {:>11,} bytes  {:>6.1f} bytes/book   random access {:>7.1f} us   read {:>9,.0f} books/sec'.format(
+        name, size, size / BOOKS, random_access, rate))
+
+
+if __name__ == '__main__':
+    levels = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    chunk_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    print('{} books of {} levels, {} rows per chunk'.format(BOOKS, levels, chunk_rows))
+
+    for depth_format in [ChunkKind.DEPTH, ChunkKind.BOOK_DELTA]:
+        with tempfile.TemporaryDirectory() as directory:
+            record(directory, levels, chunk_rows, depth_format)
+            measure(depth_format.name, directory)
@@ -0,0 +1,106 @@
+"""
+Benchmark the event loop implementations available to the gateways' loop threads (see gateways/event_loop.py),
+receiving depth diff messages from a local websocket stand-in of the exchange stream:
+    - throughput: messages/sec when the stand-in sends as fast as it can
+    - latency: p50/p99 from the stand-in sending a message to the callback receiving it decoded, when the
+      stand-in sends at a steady rate
+
+The stand-in runs on a standard asyncio loop in its own thread, the consumer runs on a dedicated thread with the
+loop under test, like the gateways. Both share a clock since they are in the same process.
+
+Run from the repository root, optionally pinning the consumer thread to a CPU:
+    python -m benchmarks.bench_event_loop [cpu]
+"""
+import asyncio
+import json
+import sys
+import time
+from threading import Thread, Event
+import websockets
+from gateways.event_loop import LoopType, available_loop_types, new_event_loop, pin_current_thread
+
+THROUGHPUT_MESSAGES = 50000
+LATENCY_MESSAGES = 2000
+LATENCY_INTERVAL = 0.001    # seconds between messages in the latency run
+
+LEVELS = [["23142.90", "0.512"], ["23142.80", "1.204"], ["23142.70", "0.050"], ["23142.60", "3.110"],
+          ["23142.50", "0.800"]]
+
+
+# stand-in exchange stream: on request {"count", "interval"}, send count depth diff messages stamped with the
+# send time in "T", interval seconds apart or back to back if interval is 0
+async def stream_handler(websocket, *args):
+    request = json.loads(await websocket.recv())
+    count = request['count']
+    interval = request['interval']
+    for i in range(count):
+        message = {"e": "depthUpdate", "s": "BTCUSDT", "U": i, "u": i, "b": LEVELS, "a": LEVELS,
+                   "T": time.perf_counter_ns()}
+        await websocket.send(json.dumps(message))
+        if interval:
+            await asyncio.sleep(interval)
+
+
+def start_server() -> str:
+    started = Event()
+    address = {}
+
+    async def serve():
+        async with websockets.serve(stream_handler, '127.0.0.1', 0) as server:
+            address['port'] = server.sockets[0].getsockname()[1]
+            started.set()
+            await asyncio.Future()
+
+    Thread(target=lambda: asyncio.run(serve()), daemon=True, name='stand-in').start()
+    started.wait()
+    return 'ws://127.0.0.1:{}'.format(address['port'])
+
+
+async def consume(url: str, count: int, interval: float, callback):
+    async with websockets.connect(url, max_queue=None) as ws:
+        await ws.send(json.dumps({'count': count, 'interval': interval}))
+        for _ in range(count):
+            callback(json.loads(await ws.recv()))
+
+
+# run a consumer on a new thread with its own loop of the given type, as the gateways do
+def run_consumer(loop_type: LoopType, cpu, coroutine_factory):
+    def target():
+        pin_current_thread(cpu)
+        loop = new_event_loop(loop_type)
+        try:
+            loop.run_until_complete(coroutine_factory())
+        finally:
+            loop.close()
+
+    thread = Thread(target=target, name=loop_type.name)
+    thread.start()
+    thread.join()
+
+
+def measure(url: str, loop_type: LoopType, cpu):
+    received = [0]
+
+    def on_message(message: dict):
+        received[0] += 1
+
+    start = time.perf_counter()
+    run_consumer(loop_type, cpu, lambda: consume(url, THROUGHPUT_MESSAGES, 0, on_message))
+    rate = received[0] / (time.perf_counter() - start)
+
+    latencies = []
+
+    def on_message_latency(message: dict):
+        latencies.append((time.perf_counter_ns() - message['T']) / 1000)
+
+    run_consumer(loop_type, cpu, lambda: consume(url, LATENCY_MESSAGES, LATENCY_INTERVAL, on_message_latency))
+    latencies.sort()
+    print('{:<10} {:>10.0f} msgs/sec   p50 {:>8.1f} us   p99 {:>8.1f} us'.format(
+        loop_type.name, rate, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]))
+
+
+if __name__ == '__main__':
+    cpu = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    url = start_server()
+    for loop_type in available_loop_types():
+        measure(url, loop_type, cpu)
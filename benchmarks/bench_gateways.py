@@ -0,0 +1,102 @@
+"""
+Measure each gateway against a local ExchangeStandIn (gateways/binance2/exchange_stand_in.py):
+    - sustained callbacks/sec of depth and market trades
+    - latency percentiles from the stand-in stamping an event to the gateway callback receiving it
+
+The stand-in generates events for every symbol at the given rate per symbol, 0 for as fast as it can. Latency is
+taken from the event time of the book or trade, which the stand-in sends with microsecond precision.
+
+Run from the repository root:
+    python -m benchmarks.bench_gateways [binance2|week07|all] [seconds] [depth_rate] [trade_rate]
+"""
+import importlib
+import sys
+import time
+from gateways.binance2.binance2 import BinanceGateway, ProductType
+from gateways.binance2.exchange_stand_in import ExchangeStandIn
+
+SYMBOLS = ['BTCUSDT', 'ETHUSDT']
+WARMUP_SECONDS = 1
+READY_TIMEOUT = 10
+
+
+# callback counts and latencies (microseconds) of one stream, recorded after the warm-up
+class Recorder:
+    def __init__(self, name: str):
+        self.name = name
+        self.recording = False
+        self.latencies = []
+
+    def record(self, event_time: float):
+        if self.recording:
+            self.latencies.append(time.time() * 1e6 - event_time * 1000)
+
+    def report(self, seconds: float):
+        latencies = sorted(self.latencies)
+        if not latencies:
+            print('{:<22} no callbacks'.format(self.name))
+            return
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+        print('{:<22} {:>9.0f} /sec   p50 {:>9.1f} us   p90 {:>9.1f} us   p99 {:>9.1f} us   p99.9 {:>9.1f} us'
+              .format(self.name, len(latencies) / seconds, percentile(0.5), percentile(0.9), percentile(0.99),
+                      percentile(0.999)))
+
+
+def run(label: str, recorders: [Recorder], is_ready, seconds: float):
+    deadline = time.time() + READY_TIMEOUT
+    while not is_ready():
+        if time.time() > deadline:
+            print('{}: not ready after {} seconds'.format(label, READY_TIMEOUT))
+            return
+        time.sleep(0.1)
+    time.sleep(WARMUP_SECONDS)
+
+    for recorder in recorders:
+        recorder.recording = True
+    time.sleep(seconds)
+    for recorder in recorders:
+        recorder.recording = False
+
+    print(label)
+    for recorder in recorders:
+        recorder.report(seconds)
+
+
+def bench_binance2(endpoints, seconds: float):
+    depth = Recorder('  depth')
+    trades = Recorder('  trades')
+    gateway = BinanceGateway(SYMBOLS, product_type=ProductType.FUTURE, name='binance2', endpoints=endpoints)
+    gateway.register_depth_callback(lambda exchange, venue_book: depth.record(venue_book.get_book().timestamp))
+    gateway.register_market_trades_callback(lambda trade_list: [trades.record(t.received_time) for t in trade_list])
+    gateway.connect()
+    run('BinanceGateway ({} symbols)'.format(len(SYMBOLS)), [depth, trades], lambda: not gateway.not_ready(),
+        seconds)
+    gateway.disconnect()
+
+
+def bench_week07(endpoints, seconds: float):
+    gateway_module = importlib.import_module('workshop.week_07.binance_gateway')
+    depth = Recorder('  depth')
+    gateway = gateway_module.BinanceFutureGateway(SYMBOLS[0], api_key='key', api_secret='secret', name='week07',
+                                                  endpoints=endpoints)
+    gateway.register_depth_callback(lambda venue_book: depth.record(venue_book.get_book().timestamp))
+    gateway.connect()
+    run('BinanceFutureGateway (1 symbol)', [depth], lambda: gateway.get_order_book().bids, seconds)
+
+
+if __name__ == '__main__':
+    which = sys.argv[1] if len(sys.argv) > 1 else 'all'
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    depth_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 1000
+    trade_rate = float(sys.argv[4]) if len(sys.argv) > 4 else 100
+
+    benches = {'binance2': bench_binance2, 'week07': bench_week07}
+    for name, bench in benches.items():
+        if which in (name, 'all'):
+            # a stand-in per gateway, stopped afterwards so that the next gateway runs alone
+            stand_in = ExchangeStandIn(SYMBOLS, depth_rate=depth_rate, trade_rate=trade_rate)
+            bench(stand_in.start(), seconds)
+            stand_in.stop()
@@ -0,0 +1,75 @@
+"""
+Benchmark decoding of the 1000-level depth payload of workshop/week_01/7_parse_json_ans.py and of a futures
+user data stream message, for each JSON backend installed.
+
+Run from the repository root:
+    python -m benchmarks.bench_json_decoding
+"""
+import ast
+import os
+import timeit
+from common.interface_book import PriceLevel
+from common.json_decoder import JsonDecoder, available_backends, decode_levels
+from gateways.binance2.binance_messages import decode_order_trade_update
+
+NUMBER = 200
+PAYLOAD_FILE = os.path.join(os.path.dirname(__file__), '..', 'workshop', 'week_01', '7_parse_json_ans.py')
+
+ORDER_TRADE_UPDATE = '{"e":"ORDER_TRADE_UPDATE","T":1675173673975,"E":1675173673983,"o":{"s":"BTCUSDT",' \
+                     '"c":"algo-20230131-1a2b3c4d-1","S":"BUY","o":"LIMIT","f":"GTX","q":"0.010","p":"23142.90",' \
+                     '"ap":"23142.90","sp":"0","x":"TRADE","X":"FILLED","i":3283461264,"l":"0.010","z":"0.010",' \
+                     '"L":"23142.90","n":"0.00462858","N":"USDT","T":1675173673975,"t":339466713,"b":"0",' \
+                     '"a":"0","m":true,"R":false,"wt":"CONTRACT_PRICE","ot":"LIMIT","ps":"BOTH","cp":false,' \
+                     '"rp":"0","pP":false,"si":0,"ss":0,"V":"NONE","pm":"NONE","gtd":0}}'
+ACCOUNT_UPDATE = '{"e":"ACCOUNT_UPDATE","E":1675173673983,"T":1675173673975,"a":{"m":"ORDER",' \
+                 '"B":[{"a":"USDT","wb":"14982.75843121","cw":"14982.75843121","bc":"0"}],' \
+                 '"P":[{"s":"BTCUSDT","pa":"0.010","ep":"23142.90","cr":"0","up":"0","mt":"cross","iw":"0",' \
+                 '"ps":"BOTH","ma":"USDT","bep":"23142.9"}]}}'
+
+
+# read the json_text string assigned in the week 1 exercise without running it
+def load_depth_payload() -> str:
+    with open(PAYLOAD_FILE) as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and node.targets[0].id == 'json_text':
+            return node.value.value
+    raise ValueError('json_text not found in {}'.format(PAYLOAD_FILE))
+
+
+# the week_03 parse() loop, one object per level
+def parse_loop(order_book: dict):
+    bids = []
+    for level in order_book['bids']:
+        bids.append(PriceLevel(float(level[0]), float(level[1])))
+    asks = []
+    for level in order_book['asks']:
+        asks.append(PriceLevel(float(level[0]), float(level[1])))
+    return bids, asks
+
+
+# the decoder layer, converting only the levels needed
+def decode_depth(order_book: dict, k: int = None):
+    return decode_levels(order_book['bids'], k), decode_levels(order_book['asks'], k)
+
+
+def run(label: str, func):
+    seconds = min(timeit.Timer(func).repeat(repeat=5, number=NUMBER)) / NUMBER
+    print('{:<52} {:>10.1f} us'.format(label, seconds * 1e6))
+
+
+if __name__ == '__main__':
+    payload = load_depth_payload()
+    print('depth payload: {} bytes'.format(len(payload)))
+    for backend in available_backends():
+        decoder = JsonDecoder(backend)
+        loads = decoder.loads
+        run('[{}] loads depth'.format(backend), lambda: loads(payload))
+        run('[{}] loads + parse loop, all levels'.format(backend), lambda: parse_loop(loads(payload)))
+        run('[{}] loads + decode_levels, all levels'.format(backend), lambda: decode_depth(loads(payload)))
+        run('[{}] loads + decode_levels, top 5'.format(backend), lambda: decode_depth(loads(payload), 5))
+        run('[{}] loads ORDER_TRADE_UPDATE'.format(backend), lambda: loads(ORDER_TRADE_UPDATE))
+        run('[{}] decode_order_trade_update'.format(backend),
+            lambda: decode_order_trade_update(decoder, ORDER_TRADE_UPDATE))
+        run('[{}] decode_order_trade_update, ACCOUNT_UPDATE'.format(backend),
+            lambda: decode_order_trade_update(decoder, ACCOUNT_UPDATE))
@@ -0,0 +1,86 @@
+"""
+Benchmark the cost of a log call on a hot path, e.g. logging.info in on_execution or the depth loop, with the
+handlers of common/config_logging.py writing to a file:
+    - sync: a FileHandler formatting and writing each record on the calling thread
+    - async: an AsyncHandler queueing the record for its writer thread
+    - async+skip: the same, skipping the record fields the format does not use (skip_unused_record_fields)
+
+Calls are timed one by one while logging at a steady pace, as a strategy does, then in a burst to show the queue
+bounded by capacity dropping records when the writer cannot keep up.
+
+Run from the repository root:
+    python -m benchmarks.bench_logging
+"""
+import logging
+import os
+import tempfile
+import time
+from common.config_logging import LOG_FORMAT, AsyncHandler, skip_unused_record_fields
+
+CALLS = 20000
+BURST_CALLS = 200000
+BURST_CAPACITY = 2000
+
+
+def file_handler(path: str) -> logging.Handler:
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    return handler
+
+
+def new_logger(name: str, handler: logging.Handler) -> logging.Logger:
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(handler)
+    return logger
+
+
+# time each call of a log line like those of the strategies, nanoseconds per call
+def time_calls(logger: logging.Logger, calls: int, pause: float = 0) -> [int]:
+    latencies = []
+    for i in range(calls):
+        start = time.perf_counter_ns()
+        logger.info('Order {} filled: side=BUY, price={}, quantity={}'.format(i, 23142.9, 0.01))
+        latencies.append(time.perf_counter_ns() - start)
+        if pause:
+            time.sleep(pause)
+    return latencies
+
+
+def report(name: str, latencies: [int]):
+    latencies = sorted(latencies)
+    print('{:<10} mean {:>7.2f} us   p50 {:>7.2f} us   p99 {:>7.2f} us   max {:>8.1f} us'.format(
+        name, sum(latencies) / len(latencies) / 1000, latencies[len(latencies) // 2] / 1000,
+        latencies[int(len(latencies) * 0.99)] / 1000, latencies[-1] / 1000))
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as directory:
+        print('{} calls, 20 us apart'.format(CALLS))
+        sync_handler = file_handler(os.path.join(directory, 'sync.log'))
+        report('sync', time_calls(new_logger('bench.sync', sync_handler), CALLS, pause=0.00002))
+        sync_handler.close()
+
+        async_handler = AsyncHandler([file_handler(os.path.join(directory, 'async.log'))])
+        report('async', time_calls(new_logger('bench.async', async_handler), CALLS, pause=0.00002))
+        async_handler.close()
+        print('async      {} written in {} batches, {} dropped'.format(
+            async_handler.written, async_handler.batches, async_handler.dropped))
+
+        skip_unused_record_fields()
+        async_handler = AsyncHandler([file_handler(os.path.join(directory, 'async_skip.log'))])
+        report('async+skip', time_calls(new_logger('bench.async_skip', async_handler), CALLS, pause=0.00002))
+        async_handler.close()
+
+        print('\n{} calls back to back, capacity {}'.format(BURST_CALLS, BURST_CAPACITY))
+        sync_handler = file_handler(os.path.join(directory, 'sync_burst.log'))
+        report('sync', time_calls(new_logger('bench.sync_burst', sync_handler), BURST_CALLS))
+        sync_handler.close()
+
+        async_handler = AsyncHandler([file_handler(os.path.join(directory, 'async_burst.log'))],
+                                     capacity=BURST_CAPACITY)
+        report('async', time_calls(new_logger('bench.async_burst', async_handler), BURST_CALLS))
+        async_handler.close()
+        print('async      {} written in {} batches, {} dropped, at most {} queued'.format(
+            async_handler.written, async_handler.batches, async_handler.dropped, async_handler.max_queued))
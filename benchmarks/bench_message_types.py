@@ -0,0 +1,59 @@
+"""
+Benchmark memory and construction cost of the market data and execution message types.
+
+"before" are dict-backed copies of the classes (same __init__, no __slots__), "after" are the classes in common.
+
+Run from the repository root:
+    python -m benchmarks.bench_message_types
+"""
+import gc
+import timeit
+import tracemalloc
+from common.interface_book import PriceLevel
+from common.interface_order import Trade, OrderEvent, Order, Side, OrderType, ExecutionType, OrderStatus
+
+COUNT = 100000
+
+
+# a dict-backed copy of a slotted class, sharing its __init__
+def dict_backed(cls):
+    return type(cls.__name__, (), {'__init__': cls.__init__})
+
+
+# factories to construct one object of each message type
+FACTORIES = {
+    'PriceLevel': (PriceLevel, lambda cls: cls(23142.9, 17.215)),
+    'Trade': (Trade, lambda cls: cls(1675173673975, 'BTCUSDT', 23142.9, 0.01, Side.BUY, False)),
+    'OrderEvent': (OrderEvent, lambda cls: cls('BTCUSDT', 'algo-1', ExecutionType.NEW, OrderStatus.NEW)),
+    'Order': (Order, lambda cls: cls('algo-1', Side.BUY, 0.01, 'BTCUSDT', 1675173673.975, OrderType.Limit, 23142.9)),
+}
+
+
+# average bytes allocated per object, measured over COUNT live objects
+def bytes_per_object(cls, factory) -> float:
+    gc.collect()
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    objects = [factory(cls) for _ in range(COUNT)]
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # exclude the list holding the objects
+    return (end - start - objects.__sizeof__()) / COUNT
+
+
+# average construction time per object in nanoseconds
+def construction_ns(cls, factory) -> float:
+    timer = timeit.Timer(lambda: factory(cls))
+    return min(timer.repeat(repeat=5, number=COUNT)) / COUNT * 1e9
+
+
+if __name__ == '__main__':
+    print('{:<12} {:>14} {:>14} {:>12} {:>12}'.format('type', 'before bytes', 'after bytes', 'before ns', 'after ns'))
+    for name, (slotted_cls, factory) in FACTORIES.items():
+        legacy_cls = dict_backed(slotted_cls)
+        print('{:<12} {:>14.1f} {:>14.1f} {:>12.1f} {:>12.1f}'.format(
+            name,
+            bytes_per_object(legacy_cls, factory),
+            bytes_per_object(slotted_cls, factory),
+            construction_ns(legacy_cls, factory),
+            construction_ns(slotted_cls, factory)))
@@ -0,0 +1,64 @@
+"""
+Benchmark place + cancel round-trip latency of the two order entry transports, against local stand-ins:
+    - REST: SignedRestClient, POST then DELETE /fapi/v1/order on a pooled keep-alive connection
+    - WebSocket API: WsApiClient, order.place then order.cancel on one persistent session
+
+Both stand-ins serve plain text on localhost, so the numbers compare protocol and client overheads only.
+
+Run from the repository root:
+    python -m benchmarks.bench_order_entry
+"""
+import asyncio
+import statistics
+import time
+from benchmarks.bench_rest_client import start_server, API_KEY, API_SECRET
+from gateways.binance2.rest_client import SignedRestClient
+from gateways.binance2.ws_api import WsApiClient
+from gateways.binance2.ws_api_stand_in import WsApiStandIn
+
+ORDERS = 500
+
+
+def report(label: str, latencies: [float]):
+    latencies.sort()
+    print('{:<28} mean {:>8.1f} us   p50 {:>8.1f} us   p99 {:>8.1f} us'.format(
+        label, statistics.mean(latencies), latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]))
+
+
+def measure_rest(client: SignedRestClient) -> [float]:
+    latencies = []
+    for _ in range(ORDERS):
+        start = time.perf_counter()
+        order = client.new_order(symbol="BTCUSDT", side="BUY", type="LIMIT", price=23000.0, quantity=0.01,
+                                 timeInForce="GTC")
+        client.cancel_order("BTCUSDT", order['orderId'])
+        latencies.append((time.perf_counter() - start) * 1e6)
+    return latencies
+
+
+async def measure_ws(client: WsApiClient) -> [float]:
+    await client.connect()
+    await client.sync_time()
+    latencies = []
+    for _ in range(ORDERS):
+        start = time.perf_counter()
+        order = await client.place_order(symbol="BTCUSDT", side="BUY", type="LIMIT", price=23000.0, quantity=0.01,
+                                         timeInForce="GTC")
+        await client.cancel_order("BTCUSDT", order_id=order['orderId'])
+        latencies.append((time.perf_counter() - start) * 1e6)
+    await client.close()
+    return latencies
+
+
+if __name__ == '__main__':
+    server, rest_url = start_server()
+    rest_client = SignedRestClient(API_KEY, API_SECRET, base_url=rest_url)
+    rest_client.sync_time()
+    report('REST keep-alive', measure_rest(rest_client))
+    rest_client.close()
+    server.shutdown()
+
+    stand_in = WsApiStandIn(api_secret=API_SECRET)
+    ws_url = stand_in.start()
+    report('WebSocket API', asyncio.run(measure_ws(WsApiClient(API_KEY, API_SECRET, url=ws_url))))
+    stand_in.stop()
@@ -0,0 +1,77 @@
+"""
+Benchmark pulling a few minutes of books out of days of recordings (see marketdata/store.py):
+    - scan: read the recordings of the symbol from the start, in time order, keeping the books of the range
+    - query: MarketDataStore.books, opening only the partitions of the range and reading only the chunks of the
+      range found from their index
+
+Both give the same books; the time of each is the median of a few queries at random times.
+
+Run from the repository root:
+    python -m benchmarks.bench_range_query [minutes]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from benchmarks.bench_book_storage import EXCHANGE, SYMBOL, record
+from marketdata.chunks import ChunkKind
+from marketdata.reader import DepthBookReader
+from marketdata.recorder import PARTITION_MS, recording_path
+from marketdata.store import MarketDataStore
+
+BOOKS = 300000
+INTERVAL = 1000     # milliseconds between books on average, about 3.5 days of books
+LEVELS = 5
+QUERIES = 5
+
+
+def scan(directory: str, hours: [int], start: float, end: float) -> list:
+    books = []
+    for hour in hours:
+        reader = DepthBookReader(recording_path(directory, EXCHANGE, SYMBOL, ChunkKind.DEPTH, hour), SYMBOL)
+        for timestamp, book in reader.books():
+            if start <= timestamp < end:
+                books.append(book)
+        reader.close()
+    return books
+
+
+def query(directory: str, start: float, end: float) -> list:
+    store = MarketDataStore(directory, EXCHANGE)
+    books = list(store.books(SYMBOL, start, end))
+    store.close()
+    return books
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+if __name__ == '__main__':
+    minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    with tempfile.TemporaryDirectory() as directory:
+        record(directory, LEVELS, 1000, ChunkKind.DEPTH, count=BOOKS, interval=INTERVAL)
+        hours = MarketDataStore(directory, EXCHANGE).hours(SYMBOL, [ChunkKind.DEPTH])
+        size = sum(os.path.getsize(recording_path(directory, EXCHANGE, SYMBOL, ChunkKind.DEPTH, hour)) for hour in hours)
+        print('{} books in {} hourly partitions, {:,} bytes; querying {} minutes'.format(
+            BOOKS, len(hours), size, minutes))
+
+        rng = random.Random(3)
+        scan_times = []
+        query_times = []
+        for _ in range(QUERIES):
+            start = rng.uniform(hours[0] * PARTITION_MS, (hours[-1] + 1) * PARTITION_MS - minutes * 60000)
+            end = start + minutes * 60000
+            scan_time, scanned = timed(scan, directory, hours, start, end)
+            query_time, queried = timed(query, directory, start, end)
+            assert [book.update_id for book in scanned] == [book.update_id for book in queried]
+            scan_times.append(scan_time)
+            query_times.append(query_time)
+
+        print('scan  {:>10.1f} ms'.format(statistics.median(scan_times) * 1000))
+        print('query {:>10.1f} ms'.format(statistics.median(query_times) * 1000))
@@ -0,0 +1,107 @@
+"""
+Benchmark order round-trip latency against a local stand-in of the futures order endpoint:
+    - before: a new requests.Session per order and a re-keyed HMAC per signature, as in week_04 send_market_order
+    - after: SignedRestClient, keeping its connections alive and reusing the keyed HMAC state
+
+Each order is a POST /fapi/v1/order followed by a GET /fapi/v1/order, as in week_04 4_strategy_range_ans.py.
+The stand-in serves plain HTTP, so the saving shown excludes TLS handshakes, which a real exchange adds on top of
+every new connection.
+
+Run from the repository root:
+    python -m benchmarks.bench_rest_client
+"""
+import hashlib
+import hmac
+import json
+import statistics
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from urllib.parse import urlencode
+import requests
+from gateways.binance2.rest_client import SignedRestClient
+
+ORDERS = 500
+API_KEY = 'key'
+API_SECRET = 'secret'
+
+
+# stand-in exchange answering order requests with keep-alive HTTP/1.1; headers and body are written separately,
+# so Nagle's algorithm is disabled or the body would wait for the client's delayed ACK of the headers (~40ms)
+class OrderHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def _reply(self, body: dict):
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        self._reply({'orderId': 1, 'status': 'NEW'})
+
+    def do_GET(self):
+        if self.path.startswith('/fapi/v1/time'):
+            self._reply({'serverTime': int(time.time() * 1000)})
+        else:
+            self._reply({'orderId': 1, 'status': 'FILLED', 'avgPrice': '23142.90'})
+
+    def do_DELETE(self):
+        self._reply({'orderId': 1, 'status': 'CANCELED'})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server() -> (ThreadingHTTPServer, str):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), OrderHandler)
+    Thread(target=server.serve_forever, daemon=True, name='stand-in').start()
+    return server, 'http://127.0.0.1:{}'.format(server.server_address[1])
+
+
+# week_04 style order: new session and new HMAC key per order
+def order_before(base_url: str):
+    def sign_url(api_url, params):
+        query_string = urlencode(params)
+        signature = hmac.new(API_SECRET.encode("utf-8"), query_string.encode("utf-8"), hashlib.sha256).hexdigest()
+        return base_url + api_url + "?" + query_string + "&signature=" + signature
+
+    session = requests.Session()
+    session.headers.update({"Content-Type": "application/json;charset=utf-8", "X-MBX-APIKEY": API_KEY})
+    order_params = {"symbol": "BTCUSDT", "side": "BUY", "type": "MARKET", "quantity": 0.01,
+                    "timestamp": int(time.time() * 1000)}
+    post_data = session.post(url=sign_url('/fapi/v1/order', order_params), params={}).json()
+    query_params = {"symbol": "BTCUSDT", "orderId": post_data['orderId'], "timestamp": int(time.time() * 1000)}
+    session.get(url=sign_url('/fapi/v1/order', query_params), params={}).json()
+    session.close()
+
+
+def order_after(client: SignedRestClient):
+    post_data = client.new_order(symbol="BTCUSDT", side="BUY", type="MARKET", quantity=0.01)
+    client.get_order("BTCUSDT", post_data['orderId'])
+
+
+def measure(label: str, func):
+    latencies = []
+    for _ in range(ORDERS):
+        start = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+    print('{:<28} mean {:>8.1f} us   p50 {:>8.1f} us   p99 {:>8.1f} us'.format(
+        label, statistics.mean(latencies), latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]))
+
+
+if __name__ == '__main__':
+    server, url = start_server()
+    client = SignedRestClient(API_KEY, API_SECRET, base_url=url)
+    client.sync_time()
+
+    measure('new session per order', lambda: order_before(url))
+    measure('SignedRestClient', lambda: order_after(client))
+
+    client.close()
+    server.shutdown()
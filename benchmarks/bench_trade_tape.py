@@ -0,0 +1,107 @@
+"""
+Benchmark keeping recent market trades in a TradeTape (see marketdata/tape.py) against a deque of Trade objects,
+as a strategy would otherwise keep them from the market trades callback:
+    - append: nanoseconds per trade, the tape taking the fields as the gateway does with register_trade_tape, and
+      with a recorder writing full segments to disk
+    - read: microseconds for the VWAP of the last 5 seconds and to copy the last 1000 trades
+
+Run from the repository root:
+    python -m benchmarks.bench_trade_tape
+"""
+import random
+import tempfile
+import time
+from array import array
+from collections import deque
+from common.interface_order import Trade, Side
+from marketdata.recorder import MarketDataRecorder
+from marketdata.tape import TradeTape
+
+TRADES = 500000
+CAPACITY = 65536
+READS = 2000
+LAST_N = 1000
+LAST_MS = 5000
+
+
+# trades a few milliseconds apart as (time, price, size, side)
+def synthetic_trades(count: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    timestamp = 1700000000000.0
+    trades = []
+    for _ in range(count):
+        timestamp += rng.uniform(0, 10)
+        trades.append((timestamp, round(23142.9 + rng.uniform(-5, 5), 1), round(rng.uniform(0.001, 1), 3),
+                       1 if rng.random() < 0.5 else -1))
+    return trades
+
+
+def per_trade_ns(function, trades: list) -> float:
+    start = time.perf_counter_ns()
+    function(trades)
+    return (time.perf_counter_ns() - start) / len(trades)
+
+
+def per_read_us(function) -> float:
+    start = time.perf_counter()
+    for _ in range(READS):
+        function()
+    return (time.perf_counter() - start) / READS * 1e6
+
+
+def append_to_tape(tape: TradeTape):
+    def run(trades):
+        append = tape.append
+        for timestamp, price, size, side in trades:
+            append(timestamp, price, size, side)
+    return run
+
+
+def append_to_deque(history: deque):
+    def run(trades):
+        for timestamp, price, size, side in trades:
+            history.append(Trade(received_time=timestamp, contract_name='BTCUSDT', price=price, size=size,
+                                 side=Side.BUY if side > 0 else Side.SELL, liquidation=False))
+    return run
+
+
+def deque_vwap(history: deque, since: float) -> float:
+    notional = 0.0
+    volume = 0.0
+    for trade in reversed(history):
+        if trade.received_time < since:
+            break
+        notional += trade.price * trade.size
+        volume += trade.size
+    return notional / volume if volume else None
+
+
+if __name__ == '__main__':
+    trades = synthetic_trades(TRADES)
+    now = trades[-1][0]
+    print('{} trades, {} kept'.format(TRADES, CAPACITY))
+
+    history = deque(maxlen=CAPACITY)
+    print('append  deque of Trade       {:>7.0f} ns'.format(per_trade_ns(append_to_deque(history), trades)))
+    tape = TradeTape('BTCUSDT', capacity=CAPACITY)
+    print('append  tape                 {:>7.0f} ns'.format(per_trade_ns(append_to_tape(tape), trades)))
+    with tempfile.TemporaryDirectory() as directory:
+        recorder = MarketDataRecorder(directory)
+        recorder.start()
+        recorded_tape = TradeTape('BTCUSDT', capacity=CAPACITY, recorder=recorder, exchange_name='Bench')
+        print('append  tape with recorder   {:>7.0f} ns'.format(per_trade_ns(append_to_tape(recorded_tape), trades)))
+        recorded_tape.flush()
+        recorder.close()
+        print('        {} bytes written in {} chunks'.format(recorder.bytes_written, recorder.chunks_written))
+
+    print('vwap last {}ms    deque {:>8.1f} us   tape {:>8.1f} us'.format(
+        LAST_MS, per_read_us(lambda: deque_vwap(history, now - LAST_MS)),
+        per_read_us(lambda: tape.vwap(tape.start_since(now - LAST_MS)))))
+
+    times = array('d', bytes(8 * LAST_N))
+    prices = array('d', bytes(8 * LAST_N))
+    sizes = array('d', bytes(8 * LAST_N))
+    sides = array('b', bytes(LAST_N))
+    print('last {} trades   deque {:>8.1f} us   tape {:>8.1f} us (copied to preallocated columns)'.format(
+        LAST_N, per_read_us(lambda: list(history)[-LAST_N:]),
+        per_read_us(lambda: tape.copy(tape.start_of_last(LAST_N), times, prices, sizes, sides))))
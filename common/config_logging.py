@@ -1,23 +1,176 @@
 import logging
 import sys
+import time
+from collections import deque
+from threading import Event, Thread
 
+LOG_FORMAT = "%(asctime)s [%(threadName)-12.12s] [%(levelname)-5.5s]  %(message)s"
 
-# Configure logging to console
-def to_stdout():
+
+# Configure logging to console; asynchronous to format and write records on a background thread, see AsyncHandler;
+# skip_fields to skip the record fields LOG_FORMAT does not use, for every handler, see skip_unused_record_fields
+def to_stdout(asynchronous: bool = False, skip_fields: bool = False):
     # logging configuration
     root = logging.getLogger()
     root.setLevel(logging.INFO)
     handler = logging.StreamHandler(sys.stdout)
     handler.setLevel(logging.INFO)
-    log_formatter = logging.Formatter("%(asctime)s [%(threadName)-12.12s] [%(levelname)-5.5s]  %(message)s")
+    log_formatter = logging.Formatter(LOG_FORMAT)
     handler.setFormatter(log_formatter)
-    root.addHandler(handler)
+    if skip_fields:
+        skip_unused_record_fields()
+    root.addHandler(AsyncHandler([handler]) if asynchronous else handler)
 
 
-# Get a logger that writes to given file
-def get_file_logger(name: str, log_file: str):
+# Get a logger that writes to given file; asynchronous to format and write records on a background thread
+def get_file_logger(name: str, log_file: str, asynchronous: bool = False):
     handler = logging.FileHandler(log_file)
     logger = logging.getLogger(name)
     logger.setLevel(logging.INFO)
-    logger.addHandler(handler)
+    logger.addHandler(AsyncHandler([handler]) if asynchronous else handler)
     return logger
+
+
+# Skip looking up the caller's file and line, and the process names, when creating a record, about half the cost of
+# a log call; %(pathname)s, %(lineno)d, %(funcName)s and %(processName)s are then not available to any handler.
+# See 'Optimization' in the logging HOWTO
+def skip_unused_record_fields():
+    logging._srcfile = None
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+
+# A handler that only enqueues records, so that logging on a gateway or strategy thread costs creating the record
+# and appending it to a queue. A writer thread takes the queued records in batches, formats them and writes each
+# batch to the target handlers in one write and one flush.
+#
+# The queue is bounded by capacity: when full, records below WARNING are dropped and counted, records of WARNING
+# and above are always queued. The writer reports the number dropped since its last report as a warning. Counts
+# are approximate when several threads log at once.
+#
+# Message arguments are rendered on the writer thread, log strings (as with str.format) or values not changed later.
+# Closing the handler, done by logging.shutdown at exit, writes the records still queued.
+class AsyncHandler(logging.Handler):
+    def __init__(self, handlers: [logging.Handler], capacity: int = 100000, batch_size: int = 1000,
+                 flush_interval: float = 0.1):
+        super().__init__()
+        self.handlers = handlers
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = deque()
+        self._wakeup = Event()
+        self._running = True
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.max_queued = 0
+        self._dropped_reported = 0
+
+        self._thread = Thread(target=self._write_forever, daemon=True, name='log-writer')
+        self._thread.start()
+
+    def handle(self, record: logging.LogRecord):
+        # the queue needs no lock: deque appends and pops are atomic, and the writer is the only consumer, so the
+        # record is enqueued without taking the handler lock, which is kept for the other Handler methods
+        result = self.filter(record)
+        if isinstance(result, logging.LogRecord):
+            record = result
+        if result:
+            self.emit(record)
+        return result
+
+    def emit(self, record: logging.LogRecord):
+        queued = len(self._queue)
+        if queued >= self.capacity and record.levelno < logging.WARNING:
+            self.dropped += 1
+            return
+        self._queue.append(record)
+        self.enqueued += 1
+        if queued >= self.max_queued:
+            self.max_queued = queued + 1
+        # wake the writer early only for a full batch, otherwise it wakes every flush_interval
+        if queued + 1 == self.batch_size:
+            self._wakeup.set()
+
+    def flush(self):
+        """ wait until the records queued so far are written """
+        enqueued = self.enqueued
+        while self.written < enqueued and self._thread.is_alive():
+            self._wakeup.set()
+            time.sleep(0.001)
+
+    def close(self):
+        if self._running:
+            self._running = False
+            self._wakeup.set()
+            self._thread.join()
+            for handler in self.handlers:
+                handler.close()
+        super().close()
+
+    def _write_forever(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            running = self._running
+            if self.dropped > self._dropped_reported:
+                self._report_dropped()
+            while self._queue:
+                self._write_batch()
+            if not running:
+                return
+
+    def _write_batch(self):
+        batch = []
+        queue = self._queue
+        while queue and len(batch) < self.batch_size:
+            batch.append(queue.popleft())
+        for handler in self.handlers:
+            try:
+                self._write(handler, batch)
+            except Exception:
+                # a failing handler must not stop the writer
+                for record in batch:
+                    handler.handleError(record)
+        self.written += len(batch)
+        self.batches += 1
+
+    @staticmethod
+    def _write(handler: logging.Handler, batch: [logging.LogRecord]):
+        records = [record for record in batch if record.levelno >= handler.level and handler.filter(record)]
+        if not records:
+            return
+        if not isinstance(handler, logging.StreamHandler):
+            for record in records:
+                handler.handle(record)
+            return
+        # a stream handler gets the batch as one write and one flush; a record that fails to format is reported
+        # alone and the others are still written
+        lines = []
+        for record in records:
+            try:
+                lines.append(handler.format(record))
+            except Exception:
+                handler.handleError(record)
+        if not lines:
+            return
+        terminator = handler.terminator
+        text = terminator.join(lines) + terminator
+        handler.acquire()
+        try:
+            handler.stream.write(text)
+        finally:
+            handler.release()
+        handler.flush()
+
+    def _report_dropped(self):
+        dropped = self.dropped - self._dropped_reported
+        self._dropped_reported += dropped
+        record = logging.LogRecord('logging', logging.WARNING, __file__, 0,
+                                   'Log queue full: dropped {} records ({} in total)'.format(dropped, self.dropped),
+                                   None, None)
+        self._queue.append(record)
+        self.enqueued += 1
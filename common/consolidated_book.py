@@ -0,0 +1,131 @@
+"""
+A consolidated order book merging the depth of several venues into one venue-attributed price ladder.
+
+Register on_depth as the depth callback of each gateway. When a venue publishes a new book, only the levels of
+that venue which changed are removed from or inserted into the merged ladder (bisect on a sorted key list), so
+the cost of an update depends on the number of levels that venue changed rather than on the size of the ladder.
+"""
+from bisect import bisect_left, insort
+from threading import Lock
+from common.interface_book import PriceLevel, OrderBook, VenueOrderBook
+
+
+# One side of the merged ladder, as sorted (sort price, venue) keys best first, with the size of each key
+class ConsolidatedSide:
+    def __init__(self, is_bid: bool):
+        self.is_bid = is_bid
+        self._keys = []
+        self._sizes = {}
+        # last levels seen per venue as {price: size}
+        self._venue_levels = {}
+
+    def update_venue(self, venue: str, levels) -> bool:
+        """ replace the levels of a venue, return True if the ladder changed """
+        sign = -1 if self.is_bid else 1
+        keys = self._keys
+        sizes = self._sizes
+        old_levels = self._venue_levels.get(venue, {})
+        new_levels = {level.price: level.size for level in levels}
+        changed = False
+
+        for price in old_levels:
+            if price not in new_levels:
+                key = (sign * price, venue)
+                del keys[bisect_left(keys, key)]
+                del sizes[key]
+                changed = True
+
+        for price, size in new_levels.items():
+            old_size = old_levels.get(price)
+            if old_size == size:
+                continue
+            key = (sign * price, venue)
+            if old_size is None:
+                insort(keys, key)
+            sizes[key] = size
+            changed = True
+
+        self._venue_levels[venue] = new_levels
+        return changed
+
+    def remove_venue(self, venue: str) -> bool:
+        return self.update_venue(venue, [])
+
+    def top(self, k: int) -> [PriceLevel]:
+        """ up to k venue-attributed levels, best first, with the venue name as quote id """
+        sign = -1 if self.is_bid else 1
+        sizes = self._sizes
+        return [PriceLevel(sign * key[0], sizes[key], quote_id=key[1]) for key in self._keys[:k]]
+
+    def best(self) -> PriceLevel:
+        key = self._keys[0]
+        return PriceLevel(-key[0] if self.is_bid else key[0], self._sizes[key], quote_id=key[1])
+
+    def __len__(self):
+        return len(self._keys)
+
+
+# A consolidated order book of one instrument across venues
+class ConsolidatedOrderBook:
+    def __init__(self, contract_name: str, venue_contracts: dict = None):
+        """ venue_contracts optionally maps an exchange name to the contract name used on that venue; by default
+            the contract has the same name on every venue. Books of other contracts are ignored """
+        self.contract_name = contract_name
+        self._venue_contracts = venue_contracts
+        self.bids = ConsolidatedSide(is_bid=True)
+        self.asks = ConsolidatedSide(is_bid=False)
+        self.timestamp = 0
+        self.version = 0
+        # gateways call back from their own threads
+        self._lock = Lock()
+
+    def register(self, gateway):
+        """ subscribe to depth updates of a gateway implementing GatewayInterface """
+        gateway.register_depth_callback(self.on_depth)
+
+    def on_depth(self, exchange_name: str, venue_book: VenueOrderBook):
+        """ depth callback: merge the latest book of a venue """
+        book = venue_book.get_book()
+        if self._venue_contracts is None:
+            contract_name = self.contract_name
+        else:
+            contract_name = self._venue_contracts.get(exchange_name)
+        if book.contract_name != contract_name:
+            return
+        with self._lock:
+            bids_changed = self.bids.update_venue(exchange_name, book.bids)
+            asks_changed = self.asks.update_venue(exchange_name, book.asks)
+            if bids_changed or asks_changed:
+                self.timestamp = max(self.timestamp, book.timestamp)
+                self.version += 1
+
+    def remove_venue(self, exchange_name: str):
+        """ drop all levels of a venue, for example when its gateway is not ready """
+        with self._lock:
+            if self.bids.remove_venue(exchange_name) | self.asks.remove_venue(exchange_name):
+                self.version += 1
+
+    def get_best_bid(self) -> float:
+        return self.get_best_bid_level().price
+
+    def get_best_ask(self) -> float:
+        return self.get_best_ask_level().price
+
+    def get_best_bid_level(self) -> PriceLevel:
+        """ best bid across venues, quote_id is the venue """
+        with self._lock:
+            return self.bids.best()
+
+    def get_best_ask_level(self) -> PriceLevel:
+        """ best ask across venues, quote_id is the venue """
+        with self._lock:
+            return self.asks.best()
+
+    def get_order_book(self, depth: int = 5) -> OrderBook:
+        """ the top levels of the merged ladder as an OrderBook, each level tagged with its venue in quote_id """
+        with self._lock:
+            return OrderBook(timestamp=self.timestamp, contract_name=self.contract_name,
+                             bids=self.bids.top(depth), asks=self.asks.top(depth), version=self.version)
+
+    def __str__(self):
+        return 'Consolidated={}'.format(self.get_order_book(3))
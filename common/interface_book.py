@@ -1,5 +1,13 @@
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+from common.interface_order import Side
+
+
 # A price tier in the order book
 class PriceLevel:
+    __slots__ = ('price', 'size', 'quote_id')
+
     def __init__(self, price: float, size: float, quote_id: str = None):
         self.price = price
         self.size = size
@@ -11,11 +19,19 @@ class PriceLevel:
 
 # An order book with bid and ask sides
 class OrderBook:
-    def __init__(self, timestamp: float, contract_name: str, bids: [PriceLevel], asks: [PriceLevel]):
+    def __init__(self, timestamp: float, contract_name: str, bids: [PriceLevel], asks: [PriceLevel], version: int = 0,
+                 update_id: int = None):
         self.contract_name = contract_name
         self.timestamp = timestamp
         self.bids = bids
         self.asks = asks
+        # version of the source book, a consumer seeing the same version again can skip its work
+        self.version = version
+        # update id of the last exchange update applied to the source book, None if not known
+        self.update_id = update_id
+        # (prices, cumulative sizes, cumulative notionals, count) per side, computed once on first use
+        self._bid_cumulative = None
+        self._ask_cumulative = None
 
     def __str__(self):
         string = ' Bids:'
@@ -34,6 +50,163 @@ class OrderBook:
     def get_best_ask(self):
         return self.asks[0].price
 
+    def get_mid(self):
+        return 0.5 * (self.get_best_bid() + self.get_best_ask())
+
+    def get_microprice(self):
+        """ mid price weighted by the size on the opposite side of the top of book """
+        bid_size = self._get_cumulative(True)[1][0]
+        ask_size = self._get_cumulative(False)[1][0]
+        return (self.get_best_bid() * ask_size + self.get_best_ask() * bid_size) / (bid_size + ask_size)
+
+    def get_imbalance(self, k: int = 1):
+        """ (bid size - ask size) / (bid size + ask size) over the top k levels, between -1 and 1 """
+        if k < 1:
+            raise ValueError('imbalance levels must be at least 1: {}'.format(k))
+        _, bid_sizes, _, bid_count = self._get_cumulative(True)
+        _, ask_sizes, _, ask_count = self._get_cumulative(False)
+        bid_size = bid_sizes[min(k, bid_count) - 1] if bid_count else 0.0
+        ask_size = ask_sizes[min(k, ask_count) - 1] if ask_count else 0.0
+        total = bid_size + ask_size
+        return (bid_size - ask_size) / total if total else 0.0
+
+    def get_cumulative_bid_size(self, level: int):
+        """ total bid size from the best bid down to the given level (0 = best) """
+        _, sizes, _, count = self._get_cumulative(True)
+        if level >= count:
+            raise IndexError('price level index out of range')
+        return sizes[level]
+
+    def get_cumulative_ask_size(self, level: int):
+        """ total ask size from the best ask up to the given level (0 = best) """
+        _, sizes, _, count = self._get_cumulative(False)
+        if level >= count:
+            raise IndexError('price level index out of range')
+        return sizes[level]
+
+    def get_sweep_price(self, side: Side, size: float):
+        """ average fill price of an order of the given side and size taking liquidity from the book,
+            i.e. a buy sweeps the asks and a sell sweeps the bids; None if the book is not deep enough """
+        if size <= 0:
+            raise ValueError('sweep size must be positive: {}'.format(size))
+        prices, sizes, notionals, count = self._get_cumulative(side == Side.SELL)
+        i = bisect_left(sizes, size, 0, count)
+        if i == count:
+            return None
+        if i == 0:
+            return prices[0]
+        return (notionals[i - 1] + (size - sizes[i - 1]) * prices[i]) / size
+
+    def _get_cumulative(self, is_bid: bool):
+        cumulative = self._bid_cumulative if is_bid else self._ask_cumulative
+        if cumulative is None:
+            levels = self.bids if is_bid else self.asks
+            prices = [level.price for level in levels]
+            sizes = [level.size for level in levels]
+            cumulative = (prices, list(accumulate(sizes)), list(accumulate(p * s for p, s in zip(prices, sizes))),
+                          len(prices))
+            if is_bid:
+                self._bid_cumulative = cumulative
+            else:
+                self._ask_cumulative = cumulative
+        return cumulative
+
+
+# One side of an ArrayOrderBook, holding prices and sizes in preallocated float64 arrays (best level first).
+# It behaves like a read-only list of PriceLevel so callers written against OrderBook keep working.
+# Cumulative sizes and notionals are kept alongside and only recomputed from the first level that changed.
+class ArrayBookSide:
+    def __init__(self, depth: int):
+        self.depth = depth
+        self.prices = array('d', bytes(8 * depth))
+        self.sizes = array('d', bytes(8 * depth))
+        self.cum_sizes = array('d', bytes(8 * depth))
+        self.cum_notionals = array('d', bytes(8 * depth))
+        self.count = 0
+
+    def load(self, levels):
+        """ overwrite this side in place from an iterable of (price, size), stopping at depth """
+        prices = self.prices
+        sizes = self.sizes
+        depth = self.depth
+        previous_count = self.count
+        first_changed = depth
+        count = 0
+        for price, size in levels:
+            if count == depth:
+                break
+            price = float(price)
+            size = float(size)
+            if first_changed == depth and (count >= previous_count or prices[count] != price or sizes[count] != size):
+                first_changed = count
+            prices[count] = price
+            sizes[count] = size
+            count += 1
+        self.count = count
+
+        # update running totals from the first changed level
+        cum_sizes = self.cum_sizes
+        cum_notionals = self.cum_notionals
+        total_size = cum_sizes[first_changed - 1] if first_changed else 0.0
+        total_notional = cum_notionals[first_changed - 1] if first_changed else 0.0
+        for i in range(first_changed, count):
+            total_size += sizes[i]
+            total_notional += prices[i] * sizes[i]
+            cum_sizes[i] = total_size
+            cum_notionals[i] = total_notional
+
+    def get_price(self, index: int) -> float:
+        if index >= self.count:
+            raise IndexError('price level index out of range')
+        return self.prices[index]
+
+    def get_size(self, index: int) -> float:
+        if index >= self.count:
+            raise IndexError('price level index out of range')
+        return self.sizes[index]
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [PriceLevel(self.prices[i], self.sizes[i]) for i in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if index < 0 or index >= self.count:
+            raise IndexError('price level index out of range')
+        return PriceLevel(self.prices[index], self.sizes[index])
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield PriceLevel(self.prices[i], self.sizes[i])
+
+
+# An order book that is updated in place, keeping each side in contiguous arrays instead of lists of PriceLevel.
+# Reading bids/asks still yields PriceLevel objects, but these are only created on access.
+class ArrayOrderBook(OrderBook):
+    def __init__(self, contract_name: str, depth: int = 5, timestamp: float = 0):
+        super().__init__(timestamp, contract_name, ArrayBookSide(depth), ArrayBookSide(depth))
+
+    def update(self, timestamp: float, bids, asks, version: int = None, update_id: int = None):
+        """ replace both sides with the given (price, size) levels, best level first.
+            Version is taken from the source book if given, otherwise incremented """
+        self.timestamp = timestamp
+        self.version = self.version + 1 if version is None else version
+        self.update_id = update_id
+        self.bids.load(bids)
+        self.asks.load(asks)
+
+    def get_best_bid(self):
+        return self.bids.get_price(0)
+
+    def get_best_ask(self):
+        return self.asks.get_price(0)
+
+    def _get_cumulative(self, is_bid: bool):
+        side = self.bids if is_bid else self.asks
+        return side.prices, side.cum_sizes, side.cum_notionals, side.count
+
 
 # A venue order book telling us the exchange that provides the order book
 class VenueOrderBook:
@@ -45,4 +218,4 @@ class VenueOrderBook:
         return self.book
 
     def __str__(self):
-        return '{}={}'.format(self.exchange_name, self.book)
\ No newline at end of file
+        return '{}={}'.format(self.exchange_name, self.book)
@@ -1 +1 @@
-from enum import Enum# Side of an order or tradeclass Side(Enum):    BUY = 0    SELL = 1# Order type indicates execution strategyclass OrderType(Enum):    Limit = 0    Market = 1    StopLimit = 2    StopMarket = 3    PostOnly = 4# Time in force indicates how long an order will remain active before it is executed or expired.class TimeInForce(Enum):    IOC = 1    GTC = 2# New order request# Note: post_only = True means the order will only make liquidity not take; False means it can make or take.class NewOrderSingle:    def __init__(self,                 symbol: str,                 side: Side,                 quantity: float,                 order_type: OrderType,                 price: float = None,                 post_only=False):        self.symbol = symbol        self.side = side        self.price = price        self.quantity = quantity        self.type = order_type        self.post_only = post_only    def __str__(self):        return "symbol=" + self.symbol + \               ", side=" + str(self.side) + \               ", price=" + str(self.price) + \               ", quantity=" + str(self.quantity) + \               ", type=" + str(self.type) + \               ", post_only=" + str(self.post_only)# Execution typeclass ExecutionType(Enum):    NEW = 0    CANCELED = 1    CALCULATED = 2    EXPIRED = 3    TRADE = 4# Order statusclass OrderStatus(Enum):    PENDING_NEW = 0         # sent to exchange but has not received any status    NEW = 1                 # order accepted by exchange but not processed yet by the matching engine    OPEN = 2                # order accepted by exchange and is active on order book    CANCELED = 3            # order is cancelled    PARTIALLY_FILLED = 4    # order is partially filled    FILLED = 5              # order is fully filled and closed (i.e. not expecting any more fills)    PENDING_CANCEL = 6      # cancellation sent to exchange but has not received any status    FAILED = 7              # order failed# An executing orderclass Order:    def __init__(self,                 order_id: str,                 side: Side,                 leaves_qty: float,                 symbol: str,                 timestamp: float,                 order_type: OrderType,                 price: float = None,                 order_status: OrderStatus = OrderStatus.NEW):        self.order_id = order_id        self.side = side        self.leaves_qty = leaves_qty        self.symbol = symbol        self.timestamp = timestamp        self.price = price        self.type = order_type        self.order_status = order_status    def __str__(self):        return "OrderID=" + str(self.order_id) + \               ", Symbol=" + self.symbol + \               ", Side=" + str(self.side) + \               ", Price=" + str(self.price) + \               ", LeavesQty=" + str(self.leaves_qty) + \               ", Timestamp=" + str(self.timestamp) + \               ", Type=" + str(self.type) + \               ", Status" + self.order_status# Instrument trading rulesclass InstrumentDetails:    def __init__(self, contract_name, tick_size, quantity_size=0):        self.contract_name = contract_name        self.tick_size = tick_size        self.quantity_size = quantity_size    def __str__(self):        return "Symbol=" + self.contract_name + \               ", Tick Size=" + str(self.tick_size) + \               ", Quantity Size=" + str(self.quantity_size)# Order eventclass OrderEvent:    def __init__(self, contract_name: str, order_id: str, execution_type: ExecutionType, status: OrderStatus, canceled_reason=None, client_id=None):        self.contract_name = contract_name        self.order_id = order_id        self.client_id = client_id        self.execution_type = execution_type        self.status = status        self.canceled_reason = canceled_reason        # the following fields will be populated if matched        self.side = None        self.last_filled_time = None        self.last_filled_price = 0        self.last_filled_quantity = 0    def __str__(self):        return "Order events [contract={}, order_id={}, status={}, type={}, side={}, last_filled_price={}, last_filled_qty={}, canceled_reason={}]"\            .format(self.contract_name, self.order_id, self.status, self.execution_type, self.side, self.last_filled_price, self.last_filled_quantity, self.canceled_reason)    def __repr__(self):        return str(self)# A trade is an execution/fill by an exchangeclass Trade:    def __init__(self, received_time: float, contract_name: str, price: float, size: float, side: Side, liquidation: False):        self.received_time = received_time        self.contract_name = contract_name        self.price = price        self.size = size        self.side = side        self.liquidation = liquidation    def is_buy(self):        return self.side == Side.BUY
\ No newline at end of file
+from decimal import Decimalfrom enum import Enum# Side of an order or tradeclass Side(Enum):    BUY = 0    SELL = 1# Order type indicates execution strategyclass OrderType(Enum):    Limit = 0    Market = 1    StopLimit = 2    StopMarket = 3    PostOnly = 4# Time in force indicates how long an order will remain active before it is executed or expired.class TimeInForce(Enum):    IOC = 1    GTC = 2# New order request# Note: post_only = True means the order will only make liquidity not take; False means it can make or take.class NewOrderSingle:    def __init__(self,                 symbol: str,                 side: Side,                 quantity: float,                 order_type: OrderType,                 price: float = None,                 post_only=False):        self.symbol = symbol        self.side = side        self.price = price        self.quantity = quantity        self.type = order_type        self.post_only = post_only    def __str__(self):        return "symbol=" + self.symbol + \               ", side=" + str(self.side) + \               ", price=" + str(self.price) + \               ", quantity=" + str(self.quantity) + \               ", type=" + str(self.type) + \               ", post_only=" + str(self.post_only)# Execution typeclass ExecutionType(Enum):    NEW = 0    CANCELED = 1    CALCULATED = 2    EXPIRED = 3    TRADE = 4# Order statusclass OrderStatus(Enum):    PENDING_NEW = 0         # sent to exchange but has not received any status    NEW = 1                 # order accepted by exchange but not processed yet by the matching engine    OPEN = 2                # order accepted by exchange and is active on order book    CANCELED = 3            # order is cancelled    PARTIALLY_FILLED = 4    # order is partially filled    FILLED = 5              # order is fully filled and closed (i.e. not expecting any more fills)    PENDING_CANCEL = 6      # cancellation sent to exchange but has not received any status    FAILED = 7              # order failed# An executing orderclass Order:    __slots__ = ('order_id', 'side', 'leaves_qty', 'symbol', 'timestamp', 'price', 'type', 'order_status')    def __init__(self,                 order_id: str,                 side: Side,                 leaves_qty: float,                 symbol: str,                 timestamp: float,                 order_type: OrderType,                 price: float = None,                 order_status: OrderStatus = OrderStatus.NEW):        self.order_id = order_id        self.side = side        self.leaves_qty = leaves_qty        self.symbol = symbol        self.timestamp = timestamp        self.price = price        self.type = order_type        self.order_status = order_status    def __str__(self):        return "OrderID=" + str(self.order_id) + \               ", Symbol=" + self.symbol + \               ", Side=" + str(self.side) + \               ", Price=" + str(self.price) + \               ", LeavesQty=" + str(self.leaves_qty) + \               ", Timestamp=" + str(self.timestamp) + \               ", Type=" + str(self.type) + \               ", Status" + self.order_status# Instrument trading rules# Prices and quantities can be represented as integers: a number of ticks (price / tick_size) and a number of# lots (quantity / quantity_size). Integer keys are exact and hashable, and compare without float rounding drift.class InstrumentDetails:    def __init__(self, contract_name, tick_size, quantity_size=0):        self.contract_name = contract_name        self.tick_size = tick_size        self.quantity_size = quantity_size        # number of decimals of a tick and of a lot, to convert back to prices and quantities without drift        self._tick = float(tick_size)        self._lot = float(quantity_size)        self._price_decimals = _decimals(tick_size)        self._quantity_decimals = _decimals(quantity_size)    def to_ticks(self, price) -> int:        """ price as a float or string to a number of ticks """        return round(float(price) / self._tick)    def to_price(self, ticks: int) -> float:        return round(ticks * self._tick, self._price_decimals)    def format_price(self, ticks: int) -> str:        """ price string with the exact number of decimals of a tick, as sent in an order """        return '{:.{}f}'.format(ticks * self._tick, self._price_decimals)    def to_lots(self, quantity) -> int:        """ quantity as a float or string to a number of lots """        if not self._lot:            raise ValueError('Quantity size is not set for {}'.format(self.contract_name))        return round(float(quantity) / self._lot)    def to_quantity(self, lots: int) -> float:        if not self._lot:            raise ValueError('Quantity size is not set for {}'.format(self.contract_name))        return round(lots * self._lot, self._quantity_decimals)    def format_quantity(self, lots: int) -> str:        return '{:.{}f}'.format(self.to_quantity(lots), self._quantity_decimals)    def __str__(self):        return "Symbol=" + self.contract_name + \               ", Tick Size=" + str(self.tick_size) + \               ", Quantity Size=" + str(self.quantity_size)# number of decimal places of a tick or lot size, e.g. 2 for 0.01 or '0.010'def _decimals(size) -> int:    exponent = Decimal(str(size)).normalize().as_tuple().exponent    return max(0, -exponent)# Order eventclass OrderEvent:    __slots__ = ('contract_name', 'order_id', 'client_id', 'execution_type', 'status', 'canceled_reason',                 'side', 'last_filled_time', 'last_filled_price', 'last_filled_quantity')    def __init__(self, contract_name: str, order_id: str, execution_type: ExecutionType, status: OrderStatus, canceled_reason=None, client_id=None):        self.contract_name = contract_name        self.order_id = order_id        self.client_id = client_id        self.execution_type = execution_type        self.status = status        self.canceled_reason = canceled_reason        # the following fields will be populated if matched        self.side = None        self.last_filled_time = None        self.last_filled_price = 0        self.last_filled_quantity = 0    def __str__(self):        return "Order events [contract={}, order_id={}, status={}, type={}, side={}, last_filled_price={}, last_filled_qty={}, canceled_reason={}]"\            .format(self.contract_name, self.order_id, self.status, self.execution_type, self.side, self.last_filled_price, self.last_filled_quantity, self.canceled_reason)    def __repr__(self):        return str(self)# A trade is an execution/fill by an exchangeclass Trade:    __slots__ = ('received_time', 'contract_name', 'price', 'size', 'side', 'liquidation')    def __init__(self, received_time: float, contract_name: str, price: float, size: float, side: Side, liquidation: False):        self.received_time = received_time        self.contract_name = contract_name        self.price = price        self.size = size        self.side = side        self.liquidation = liquidation    def is_buy(self):        return self.side == Side.BUY
\ No newline at end of file
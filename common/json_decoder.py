@@ -0,0 +1,52 @@
+"""
+Pluggable JSON decoding. Uses the fastest JSON library installed, in order of preference orjson, ujson and the
+standard json module, unless a backend is named explicitly.
+
+    pip install orjson
+
+JsonDecoder is used where the gateways receive raw text: the user data stream of BinanceFutureGateway and the
+WebSocket API responses. Market data streams of the gateways are decoded by python-binance with the standard json
+module before they reach the gateway, and the depth engine converts each level of a diff as it applies it, so
+decode_levels is not on the live depth path; it is for callers holding a raw depth payload, see
+benchmarks/bench_json_decoding.py.
+"""
+import importlib
+import json
+import logging
+
+# backends in order of preference
+BACKENDS = ['orjson', 'ujson', 'json']
+
+
+def available_backends() -> [str]:
+    backends = []
+    for name in BACKENDS:
+        try:
+            importlib.import_module(name)
+            backends.append(name)
+        except ImportError:
+            pass
+    return backends
+
+
+# A JSON decoder bound to one backend
+class JsonDecoder:
+    def __init__(self, backend: str = None):
+        if backend is None:
+            backend = available_backends()[0]
+        elif backend not in BACKENDS:
+            raise ValueError('Unrecognized JSON backend: {}'.format(backend))
+        self.backend = backend
+        # loads is the backend function itself, so calling it costs no extra indirection
+        self.loads = json.loads if backend == 'json' else importlib.import_module(backend).loads
+        logging.debug('Using JSON backend {}'.format(backend))
+
+    def __str__(self):
+        return 'JsonDecoder[{}]'.format(self.backend)
+
+
+# convert up to k [price, size] string pairs into (price, size) floats, all levels if k is None
+def decode_levels(levels: list, k: int = None) -> [(float, float)]:
+    if k is not None:
+        levels = levels[:k]
+    return [(float(p), float(s)) for p, s in levels]
@@ -4,14 +4,19 @@ Binance gateway implementation using library https://github.com/sammchardy/pytho
 import asyncio
 import logging
 import sys
+import threading
 from enum import Enum
 from threading import Thread
-from binance import AsyncClient, BinanceSocketManager, DepthCacheManager
-from binance.depthcache import FuturesDepthCacheManager
+from binance import AsyncClient, BinanceSocketManager
 from binance.enums import FuturesType
-from gateways.gateway_interface import GatewayInterface, ReadyCheck
+from gateways.gateway_interface import GatewayInterface, ReadyCheck, DepthNotify
+from gateways.depth_engine import L2OrderBook, DepthGapError
+from gateways.dispatcher import CallbackDispatcher, DispatchMode
+from gateways.recovery import ExponentialBackoff, RecoveryStats
+from gateways.event_loop import LoopType, new_event_loop, pin_current_thread
+from gateways.binance2.endpoints import Endpoints
 from common.callback_utils import assert_param_counts
-from common.interface_book import VenueOrderBook, PriceLevel, OrderBook
+from common.interface_book import VenueOrderBook, PriceLevel, OrderBook, ArrayOrderBook
 from common.interface_order import Trade, Side
 
 
@@ -20,36 +25,94 @@ class ProductType(Enum):
     FUTURE = 1  # USD_M, settle in USDT or BUSD
 
 
+# payload of a combined stream message; python-binance reports a lost connection as an error message
+def _stream_data(message: dict) -> dict:
+    if not message or message.get('e') == 'error':
+        raise ConnectionError('stream error: {}'.format(message))
+    return message['data']
+
+
+async def _close_socket(socket):
+    if socket is None:
+        return
+    try:
+        await socket.__aexit__(None, None, None)
+    except Exception:
+        logging.debug('error closing socket', exc_info=True)
+
+
+# conflation key of depth callback arguments (exchange_name, venue_book)
+def _book_symbol(args: tuple) -> str:
+    return args[1].get_book().contract_name
+
+
 class BinanceGateway(GatewayInterface):
-    def __init__(self, symbol: str, api_key=None, api_secret=None, product_type=ProductType.SPOT, name='Binance'):
+    """ A gateway for one or more symbols. Depth and trade streams of all symbols are each subscribed over a single
+        combined stream connection, and all symbols share one event loop thread and one AsyncClient. """
+    def __init__(self, symbol, api_key=None, api_secret=None, product_type=ProductType.SPOT, name='Binance',
+                 array_book=False, depth=5, depth_notify=DepthNotify.EVERY_UPDATE, instruments: dict = None,
+                 dispatch_mode=DispatchMode.INLINE, max_queue=1000, loop_type=LoopType.ASYNCIO, cpu=None,
+                 endpoints: Endpoints = None):
         self._api_key = api_key
         self._api_secret = api_secret
         self._exchange_name = name
-        self._symbol = symbol
+        # a single symbol or a list of symbols
+        self._symbols = [symbol] if isinstance(symbol, str) else list(symbol)
         self._product_type = product_type
+        # number of levels per side published to depth callbacks, and when callbacks are notified
+        self._depth = depth
+        self._depth_notify = depth_notify
 
-        # binance async client
+        # binance async client, connecting to the given endpoints instead of Binance if any
+        self._endpoints = endpoints or Endpoints()
         self._client = None
         self._bm = None         # binance socket manager
-        self._dcm = None        # depth cache, which implements the logic to manage a local order book
+        self._ds = None         # combined depth diff socket of all symbols
         self._dws = None        # depth async WebSocket session
-        self._ts  = None        # trade socket
+        self._ts  = None        # combined trade socket of all symbols
         self._tws = None        # trade async WebSocket session
 
-        # depth cache
-        self._depth_cache = None
-
-        # this is a loop and dedicated thread to run all async concurrent tasks
-        self._loop = asyncio.new_event_loop()
+        # local order book per symbol, maintained from a depth snapshot and the diff stream;
+        # books of symbols given in instruments (symbol -> InstrumentDetails) are keyed by integer ticks and lots
+        futures = product_type == ProductType.FUTURE
+        instruments = instruments or {}
+        self._depth_books = {_symbol: L2OrderBook(_symbol, futures=futures, instrument=instruments.get(_symbol))
+                             for _symbol in self._symbols}
+
+        # with array_book, a single array-backed book per symbol is refreshed in place on every depth update and
+        # handed to callbacks, instead of allocating new PriceLevel objects; callbacks should not hold on to it,
+        # and it requires INLINE dispatch since queued callbacks would read a later or half-written state
+        if array_book and dispatch_mode != DispatchMode.INLINE:
+            raise ValueError('array_book requires INLINE dispatch: {}'.format(dispatch_mode))
+        self._array_books = {_symbol: ArrayOrderBook(_symbol, depth=depth) for _symbol in self._symbols} \
+            if array_book else None
+        self._venue_books = {_symbol: VenueOrderBook(name, _book) for _symbol, _book in self._array_books.items()} \
+            if array_book else None
+
+        # this is a loop and dedicated thread to run all async concurrent tasks, the loop implementation is chosen
+        # by loop_type and the thread optionally pinned to a CPU or a collection of CPUs
+        self._loop = new_event_loop(loop_type)
+        self._cpu = cpu
         self._loop_thread = Thread(target=self._run_async_tasks, daemon=True, name=name)
 
         # readiness and circuit breaker flag
         self._ready_check = ReadyCheck()
         self._signal_reconnect = False
 
-        # callbacks
-        self._depth_callbacks = []
-        self._market_trades_callbacks = []
+        # a fault of one stream only recovers that stream: a depth gap resyncs the book of its symbol from a
+        # snapshot, a lost socket reconnects that socket with jittered exponential backoff;
+        # time from each fault to ready again is recorded per depth book and for the trade socket
+        self._resync_tasks = {}
+        self._recovery = {name: RecoveryStats(name) for name in
+                          ['depth:' + _symbol for _symbol in self._symbols] + ['trades']}
+
+        # callbacks are run by dispatchers, either inline in the socket reading tasks or from per-callback bounded
+        # queues on the gateway loop (LOOP) or a thread pool (THREAD), so slow callbacks do not delay socket reads
+        self._depth_dispatcher = CallbackDispatcher(dispatch_mode, max_queue=max_queue, name=name + '-depth')
+        self._trades_dispatcher = CallbackDispatcher(dispatch_mode, max_queue=max_queue, name=name + '-trades')
+
+        # trade tapes by symbol, appended to on the gateway loop, see marketdata/tape.py
+        self._trade_tapes = {}
 
     def connect(self):
         logging.info('Initializing connection')
@@ -62,8 +125,34 @@ class BinanceGateway(GatewayInterface):
         logging.info("starting event loop thread")
         self._loop_thread.start()
 
+    def disconnect(self):
+        """ close the sockets, then stop the event loop thread and the dispatcher worker threads """
+        logging.info('Disconnecting')
+        if self._loop_thread.is_alive():
+            asyncio.run_coroutine_threadsafe(self._close_all(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop_thread.join()
+            self._loop.close()
+        self._depth_dispatcher.shutdown()
+        self._trades_dispatcher.shutdown()
+
+    async def _close_all(self):
+        # stop the listening and resync tasks before closing their sockets
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._close_depth()
+        await self._close_trade()
+        if self._client is not None:
+            await self._client.close_connection()
+
     def _run_async_tasks(self):
         """ Run the following tasks concurrently in the current thread """
+        pin_current_thread(self._cpu)
+        self._depth_dispatcher.start(self._loop)
+        self._trades_dispatcher.start(self._loop)
         self._loop.create_task(self._listen_depth_forever())
         self._loop.create_task(self._listen_trade_forever())
         self._loop.create_task(self._listen_private_forever())
@@ -93,52 +182,143 @@ class BinanceGateway(GatewayInterface):
 
     async def _connect_authenticate_ws(self):
         logging.info("connecting to ws")
-        self._client = await AsyncClient.create(self._api_key, self._api_secret)
-        self._bm = BinanceSocketManager(self._client)
+        self._client = await self._endpoints.client_class(AsyncClient).create(self._api_key, self._api_secret)
+        self._bm = self._endpoints.socket_manager_class(BinanceSocketManager)(self._client)
         # connected
         self._ready_check.ws_connected = True
 
     async def _listen_depth_forever(self):
         logging.info("start subscribing and listen to depth events")
+        backoff = ExponentialBackoff()
         while True:
             if not self._dws:
-                logging.info("depth socket not connected, reconnecting")
-                if self._product_type == ProductType.SPOT:
-                    self._dcm = DepthCacheManager(self._client, symbol=self._symbol, bm=self._bm, ws_interval=100)
-                elif self._product_type == ProductType.FUTURE:
-                    self._dcm = FuturesDepthCacheManager(self._client, symbol=self._symbol, bm=self._bm)
-                else:
-                    sys.exit('Unrecognized product type: '.format(self._product_type))
-
-                self._dws = await self._dcm.__aenter__()
-                self._ready_check.depth_stream_ready = True
-
-            # wait for depth update
+                try:
+                    await self._connect_depth()
+                except Exception:
+                    logging.exception('failed to connect depth socket')
+                    await self._close_depth()
+                    await backoff.wait()
+                    continue
+
+            # wait for depth update, a failure of the socket only reconnects this socket
             try:
-                self._depth_cache = await self._dws.recv()
+                message = await self._dws.recv()
+                data = _stream_data(message)
+            except Exception:
+                logging.exception('depth socket failed, reconnecting depth socket')
+                for _symbol in self._symbols:
+                    self._recovery['depth:' + _symbol].on_fault()
+                await self._close_depth()
+                await backoff.wait()
+                continue
+            backoff.reset()
 
-                if self._depth_callbacks:
-                    for _cb in self._depth_callbacks:
-                        _cb(self._exchange_name, VenueOrderBook(self._exchange_name, self._get_order_book()))
+            try:
+                symbol = data['s']
+                book = self._depth_books[symbol]
+
+                try:
+                    changed = book.apply_diff(data)
+                except DepthGapError as e:
+                    # only this symbol is resynced from a snapshot, its diffs are buffered meanwhile
+                    logging.warning('{}, resyncing depth of {}'.format(e, symbol))
+                    self._recovery['depth:' + symbol].on_fault()
+                    self._start_depth_resync(symbol)
+                    continue
+
+                if changed and self._depth_dispatcher.has_subscribers() and self._should_notify_depth(book):
+                    self._publish_depth(symbol)
+
+            except Exception:
+                logging.exception('encountered issue in depth processing')
+
+    async def _connect_depth(self):
+        logging.info("depth socket not connected, reconnecting")
+        streams = [_symbol.lower() + '@depth@100ms' for _symbol in self._symbols]
+        self._ds = self._multiplex_socket(streams)
+        self._dws = await self._ds.__aenter__()
+
+        # books are resynced from snapshots in the background, diffs received meanwhile are buffered by the books
+        for _symbol, _book in self._depth_books.items():
+            _book.invalidate(drop_pending=True)
+            self._start_depth_resync(_symbol)
+
+    async def _close_depth(self):
+        self._ready_check.depth_stream_ready = False
+        await _close_socket(self._ds)
+        self._ds = None
+        self._dws = None
 
-            except Exception as e:
-                await self._handle_exception(e, 'encountered issue in depth processing')
+    def _start_depth_resync(self, symbol: str):
+        """ reload the book of a symbol from a snapshot, unless it is already being reloaded """
+        self._ready_check.depth_stream_ready = False
+        if symbol not in self._resync_tasks:
+            self._resync_tasks[symbol] = self._loop.create_task(self._resync_depth(symbol))
+
+    async def _resync_depth(self, symbol: str):
+        backoff = ExponentialBackoff()
+        try:
+            while True:
+                try:
+                    await self._load_depth_snapshot(symbol)
+                    break
+                except Exception:
+                    logging.exception('failed to load depth snapshot of {}'.format(symbol))
+                    await backoff.wait()
+        finally:
+            del self._resync_tasks[symbol]
+
+        elapsed = self._recovery['depth:' + symbol].on_ready()
+        if elapsed is not None:
+            logging.info('{} depth ready in {:.3f}s'.format(symbol, elapsed))
+        self._ready_check.depth_stream_ready = self._dws is not None and \
+            all(_book.is_ready() for _book in self._depth_books.values())
+
+        # the book is rebuilt from the snapshot and the buffered diffs, whose last change rank no longer tells
+        # whether the top changed since the last published book, so it is published once whatever depth_notify
+        if self._depth_dispatcher.has_subscribers():
+            self._publish_depth(symbol)
+
+    def _publish_depth(self, symbol: str):
+        if self._array_books:
+            self._get_order_book(symbol)
+            venue_book = self._venue_books[symbol]
+        else:
+            venue_book = VenueOrderBook(self._exchange_name, self._get_order_book(symbol))
+        self._depth_dispatcher.publish(self._exchange_name, venue_book)
 
     async def _listen_trade_forever(self):
         logging.info("start subscribing and listen to trade events")
+        stats = self._recovery['trades']
+        backoff = ExponentialBackoff()
         while True:
             if not self._tws:
                 logging.info("trade socket not connected, reconnecting")
-                if self._product_type == ProductType.SPOT:
-                    self._ts = self._bm.aggtrade_socket(self._symbol)
-                elif self._product_type == ProductType.FUTURE:
-                    self._ts = self._bm.aggtrade_futures_socket(symbol=self._symbol, futures_type=FuturesType.USD_M)
-                else:
-                    sys.exit('Unrecognized product type: '.format(self._product_type))
-
-                self._tws = await self._ts.__aenter__()
+                streams = [_symbol.lower() + '@aggTrade' for _symbol in self._symbols]
+                try:
+                    self._ts = self._multiplex_socket(streams)
+                    self._tws = await self._ts.__aenter__()
+                except Exception:
+                    logging.exception('failed to connect trade socket')
+                    await self._close_trade()
+                    await backoff.wait()
+                    continue
+                elapsed = stats.on_ready()
+                if elapsed is not None:
+                    logging.info('trade socket ready in {:.3f}s'.format(elapsed))
+
+            # wait for trade message, a failure of the socket only reconnects this socket
+            try:
+                message = await self._tws.recv()
+                data = _stream_data(message)
+            except Exception:
+                logging.exception('trade socket failed, reconnecting trade socket')
+                stats.on_fault()
+                await self._close_trade()
+                await backoff.wait()
+                continue
+            backoff.reset()
 
-            # wait for trade message
             try:
                 """
                 {
@@ -155,21 +335,40 @@ class BinanceGateway(GatewayInterface):
                     "M": true         // Ignore
                 }                
                 """
-                message = await self._tws.recv()
-
-                if self._market_trades_callbacks:
-                    data = message['data']
-                    trade = Trade(received_time=data['T'],
-                                  contract_name=data['s'],
-                                  price=float(data['p']),
-                                  size=float(data['q']),
-                                  side=Side.SELL if data['m'] is True else Side.BUY,
-                                  liquidation=False)
-                    for _cb in self._market_trades_callbacks:
-                        _cb([trade])
+                # a trade tape of the symbol takes the fields as they are, a Trade is only created for callbacks
+                tape = self._trade_tapes.get(data['s'])
+                has_subscribers = self._trades_dispatcher.has_subscribers()
+                if tape is not None or has_subscribers:
+                    price = float(data['p'])
+                    size = float(data['q'])
+                    is_sell = data['m'] is True
+                    if tape is not None:
+                        tape.append(data['T'], price, size, -1 if is_sell else 1)
+                    if has_subscribers:
+                        trade = Trade(received_time=data['T'],
+                                      contract_name=data['s'],
+                                      price=price,
+                                      size=size,
+                                      side=Side.SELL if is_sell else Side.BUY,
+                                      liquidation=False)
+                        self._trades_dispatcher.publish([trade])
+
+            except Exception:
+                logging.exception('encountered issue in trade processing')
+
+    async def _close_trade(self):
+        await _close_socket(self._ts)
+        self._ts = None
+        self._tws = None
 
-            except Exception as e:
-                await self._handle_exception(e, 'encountered issue in trade processing')
+    def _multiplex_socket(self, streams: [str]):
+        """ a combined stream socket of the given streams """
+        if self._product_type == ProductType.SPOT:
+            return self._bm.multiplex_socket(streams)
+        elif self._product_type == ProductType.FUTURE:
+            return self._bm.futures_multiplex_socket(streams, futures_type=FuturesType.USD_M)
+        else:
+            sys.exit('Unrecognized product type: '.format(self._product_type))
 
     async def _listen_private_forever(self):
         if not self._has_keys():
@@ -182,19 +381,43 @@ class BinanceGateway(GatewayInterface):
         self._ready_check.orders_stream_ready = True
         self._ready_check.position_stream_ready = True
 
-    async def _handle_exception(self, e: Exception, msg: str):
-        self._ready_check.ws_connected = False
-        logging.exception(msg)
-        # reset all sockets
-        self._dws = None
-        self._tws = None
-        # reconnect client
-        await self._reconnect_ws()
-
-    def _get_order_book(self) -> OrderBook:
-        bids = [PriceLevel(price=p, size=s) for (p, s) in self._depth_cache.get_bids()[:5]]
-        asks = [PriceLevel(price=p, size=s) for (p, s) in self._depth_cache.get_asks()[:5]]
-        return OrderBook(timestamp=self._depth_cache.update_time, contract_name=self._symbol, bids=bids, asks=asks)
+    async def _load_depth_snapshot(self, symbol: str, attempts=5):
+        for attempt in range(attempts):
+            logging.info("REST - Getting depth snapshot of {}".format(symbol))
+            if self._product_type == ProductType.FUTURE:
+                snapshot = await self._client.futures_order_book(symbol=symbol, limit=1000)
+            else:
+                snapshot = await self._client.get_order_book(symbol=symbol, limit=1000)
+            try:
+                self._depth_books[symbol].apply_snapshot(snapshot)
+                return
+            except DepthGapError as e:
+                # snapshot is older than the buffered diffs, get a newer one
+                if attempt == attempts - 1:
+                    raise
+                logging.warning('{}, snapshot behind the depth stream, retrying'.format(e))
+
+    def _should_notify_depth(self, book: L2OrderBook) -> bool:
+        rank = book.last_change_rank
+        if self._depth_notify == DepthNotify.TOP_N:
+            return 0 <= rank < self._depth
+        if self._depth_notify == DepthNotify.BBO:
+            return rank == 0
+        return True
+
+    def _get_order_book(self, symbol: str, copy: bool = False) -> OrderBook:
+        """ book of the depth engine of a symbol, run on the gateway loop; with array_book the shared array book
+            refreshed in place unless copy """
+        book = self._depth_books[symbol]
+        if self._array_books and not copy:
+            array_book = self._array_books[symbol]
+            array_book.update(book.update_time, book.get_bids(self._depth), book.get_asks(self._depth),
+                              version=book.version, update_id=book.last_update_id)
+            return array_book
+        bids = [PriceLevel(price=p, size=s) for (p, s) in book.get_bids(self._depth)]
+        asks = [PriceLevel(price=p, size=s) for (p, s) in book.get_asks(self._depth)]
+        return OrderBook(timestamp=book.update_time, contract_name=symbol, bids=bids, asks=asks,
+                         version=book.version, update_id=book.last_update_id)
 
     """ ----------------------------------- """
     """             REST API                """
@@ -226,12 +449,25 @@ class BinanceGateway(GatewayInterface):
         return 0
 
     def get_order_book(self, contract_name: str) -> OrderBook:
-        return self._get_order_book()
-
-    def register_depth_callback(self, callback):
-        """ a depth callback function takes two argument: (exchange_name:str, book: VenueOrderBook) """
+        """ the current book of a symbol. The depth engine is updated on the gateway loop, so a call from another
+            thread waits for a copy of the book made on the loop; a call on the loop, e.g. from an inline depth
+            callback, gets the shared array book with array_book """
+        if not self._loop.is_running() or threading.get_ident() == self._loop_thread.ident:
+            return self._get_order_book(contract_name)
+        return asyncio.run_coroutine_threadsafe(self._copy_order_book(contract_name), self._loop).result()
+
+    async def _copy_order_book(self, symbol: str) -> OrderBook:
+        return self._get_order_book(symbol, copy=True)
+
+    def register_depth_callback(self, callback, conflate=False):
+        """ a depth callback function takes two argument: (exchange_name:str, book: VenueOrderBook).
+            With conflate, a callback that falls behind only receives the latest book of each symbol,
+            the number of books skipped is reported as coalesced in get_dispatch_stats(); conflated callbacks
+            are queued, so conflate cannot be used with array_book """
         assert_param_counts(callback, 2)
-        self._depth_callbacks.append(callback)
+        if conflate and self._array_books:
+            raise ValueError('conflate cannot be used with array_book')
+        self._depth_dispatcher.subscribe(callback, conflate_key=_book_symbol if conflate else None)
 
     """ register an execution callback function takes two arguments, 
         an order event: (exchange_name:str, event: OrderEvent, external: bool) """
@@ -246,7 +482,20 @@ class BinanceGateway(GatewayInterface):
     """ register a callback to listen to market trades that takes one argument: [Trades] """
     def register_market_trades_callback(self, callback):
         assert_param_counts(callback, 1)
-        self._market_trades_callbacks.append(callback)
+        self._trades_dispatcher.subscribe(callback)
+
+    def register_trade_tape(self, tape):
+        """ append the market trades of the tape's symbol to a TradeTape on the gateway loop, without creating a
+            Trade per trade; the tape should only be read by callbacks run inline on the loop """
+        self._trade_tapes[tape.symbol] = tape
+
+    def get_dispatch_stats(self) -> list:
+        """ counters of each depth and market trades callback, see SubscriberStats """
+        return self._depth_dispatcher.get_stats() + self._trades_dispatcher.get_stats()
+
+    def get_recovery_stats(self) -> dict:
+        """ RecoveryStats by stream: 'depth:<symbol>' for each depth book and 'trades' for the trade socket """
+        return self._recovery
 
     def reconnect(self):
         """ A signals to reconnect """
@@ -0,0 +1,58 @@
+"""
+Decoding of Binance user data stream messages, reading only the fields used by the gateways.
+"""
+from common.interface_order import OrderEvent, ExecutionType, OrderStatus, Side
+from common.json_decoder import JsonDecoder
+
+# event type searched in the raw text first, so that other user data events are not decoded at all
+ORDER_TRADE_UPDATE = 'ORDER_TRADE_UPDATE'
+
+
+def decode_order_trade_update(decoder: JsonDecoder, message: str):
+    """ return an OrderEvent for a futures ORDER_TRADE_UPDATE text message, None for any other event
+
+        {
+            "e": "ORDER_TRADE_UPDATE",
+            "o": {
+                "s": "BTCUSDT",     // Symbol
+                "c": "algo-1",      // Client order id
+                "S": "BUY",         // Side
+                "x": "TRADE",       // Execution type
+                "X": "FILLED",      // Order status
+                "l": "0.001",       // Last filled quantity
+                "L": "23142.9",     // Last filled price
+                ...
+            },
+            ...
+        }
+    """
+    if ORDER_TRADE_UPDATE not in message:
+        return None
+    data = decoder.loads(message)
+    if data.get('e') != ORDER_TRADE_UPDATE:
+        return None
+
+    order = data['o']
+    execution_type = order['x']
+    order_event = OrderEvent(order['s'], order['c'], ExecutionType[execution_type], OrderStatus[order['X']])
+    order_event.side = Side[order['S']]
+    if execution_type == 'TRADE':
+        order_event.last_filled_price = float(order['L'])
+        order_event.last_filled_quantity = float(order['l'])
+    return order_event
+
+
+# sent on the user data stream when its listen key expires, the stream then stops delivering events
+LISTEN_KEY_EXPIRED = 'listenKeyExpired'
+
+
+def is_listen_key_expired(decoder: JsonDecoder, message: str) -> bool:
+    """ return True for a listenKeyExpired text message
+
+        {
+            "e": "listenKeyExpired",
+            "E": 1576653824250,
+            "listenKey": "WsCMN0a4KHUPTQuX6IUnqEZfB1inxmv1qR4kbf1LuEjur5VdbzqvyxqG9TSjVVxv"
+        }
+    """
+    return LISTEN_KEY_EXPIRED in message and decoder.loads(message).get('e') == LISTEN_KEY_EXPIRED
@@ -0,0 +1,51 @@
+"""
+Configurable endpoints for the python-binance clients used by the gateways, for example to run them against a
+local ExchangeStandIn instead of Binance.
+
+python-binance reads its base urls from class attributes, formatted with the top level domain when a client is
+created, so the endpoints are applied by subclassing the client and socket manager classes; with no urls given,
+the library classes are used unchanged.
+"""
+
+
+class Endpoints:
+    def __init__(self, rest_url: str = None, stream_url: str = None):
+        """ rest_url as 'http://host:port', serving /api and /fapi paths;
+            stream_url as 'ws://host:port', serving /ws/<stream> and /stream?streams=<stream>/<stream> paths """
+        self.rest_url = rest_url
+        self.stream_url = stream_url
+
+    def client_class(self, base):
+        """ the python-binance Client or AsyncClient class sending requests to rest_url """
+        if self.rest_url is None:
+            return base
+        rest_url = self.rest_url
+
+        class _Client(base):
+            API_URL = rest_url + '/api'
+            API_TESTNET_URL = rest_url + '/api'
+            FUTURES_URL = rest_url + '/fapi'
+            FUTURES_TESTNET_URL = rest_url + '/fapi'
+
+        return _Client
+
+    def socket_manager_class(self, base):
+        """ the python-binance BinanceSocketManager class connecting to stream_url """
+        if self.stream_url is None:
+            return base
+        stream_url = self.stream_url + '/'
+
+        class _SocketManager(base):
+            STREAM_URL = stream_url
+            STREAM_TESTNET_URL = stream_url
+            FSTREAM_URL = stream_url
+            FSTREAM_TESTNET_URL = stream_url
+
+        return _SocketManager
+
+    def user_stream_url(self, default: str) -> str:
+        """ base url of the user data stream, followed by the listen key """
+        return default if self.stream_url is None else self.stream_url + '/ws/'
+
+    def __str__(self):
+        return 'Endpoints(rest={}, stream={})'.format(self.rest_url, self.stream_url)
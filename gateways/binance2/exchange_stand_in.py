@@ -0,0 +1,373 @@
+"""
+A local stand-in of the Binance spot and USD-M futures exchange, to run the gateways offline, measure their
+throughput ceilings and reproduce bursts. One aiohttp server on one port serves:
+
+    websocket streams
+        /ws/<symbol>@depth@100ms, /ws/<symbol>@aggTrade   raw streams, symbols in lower case as on Binance
+        /stream?streams=<stream>/<stream>                 combined streams, {"stream": ..., "data": ...}
+        /market/..., /public/...                          the same, as routed by recent python-binance versions
+        /ws/<listenKey>                                   user data stream, ORDER_TRADE_UPDATE events
+    REST
+        GET  /api/v3/ping, /api/v3/time, /api/v3/depth, /fapi/v1/ping, /fapi/v1/time, /fapi/v1/depth
+        POST/PUT/DELETE /fapi/v1/listenKey
+        POST/GET/DELETE /fapi/v1/order, POST/DELETE /fapi/v1/batchOrders
+
+Depth diff and aggTrade events of each symbol are generated at depth_rate and trade_rate events per second, or as
+fast as possible with a rate of 0; set_rates() changes them while running, for example to produce a burst.
+Every diff changes one bid and one ask level of a fixed price ladder, so a gateway notifies its depth callbacks
+once per diff. Market orders fill immediately at the touch, limit orders rest until cancelled. Signatures are
+not verified.
+
+Event times "E" and "T" are float milliseconds since epoch, to microseconds, so that latency to a gateway callback
+can be measured from them in the same process; Binance sends integers.
+
+    stand_in = ExchangeStandIn(['BTCUSDT', 'ETHUSDT'], depth_rate=1000, trade_rate=100)
+    endpoints = stand_in.start()
+    gateway = BinanceGateway(['BTCUSDT', 'ETHUSDT'], product_type=ProductType.FUTURE, endpoints=endpoints)
+
+    pip install aiohttp
+"""
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+from threading import Thread, Event
+from aiohttp import web, WSMsgType
+from gateways.binance2.endpoints import Endpoints
+from gateways.binance2.stand_in_orders import StandInError, StandInOrders
+
+# number of price levels per side of the generated books
+LEVELS = 100
+
+
+def _now() -> float:
+    return time.time() * 1000
+
+
+# a generated order book of one symbol with a fixed price ladder, of which sizes change
+class _SymbolBook:
+    def __init__(self, symbol: str, mid: float, tick: float):
+        self.symbol = symbol
+        self.tick = tick
+        self.bid_prices = [round(mid - tick * (i + 1), 8) for i in range(LEVELS)]
+        self.ask_prices = [round(mid + tick * (i + 1), 8) for i in range(LEVELS)]
+        self.bids = {price: self._size() for price in self.bid_prices}
+        self.asks = {price: self._size() for price in self.ask_prices}
+        self.update_id = 1
+        self.trade_id = 0
+
+    @staticmethod
+    def _size() -> str:
+        return '{:.3f}'.format(random.uniform(0.001, 5))
+
+    def next_diff(self, futures: bool) -> dict:
+        """ change the size of one bid and one ask level among the top 20, as a depth diff event """
+        bid_price = random.choice(self.bid_prices[:20])
+        ask_price = random.choice(self.ask_prices[:20])
+        self.bids[bid_price] = self._size()
+        self.asks[ask_price] = self._size()
+        previous_id = self.update_id
+        self.update_id += 1
+        now = _now()
+        event = {"e": "depthUpdate", "E": now, "s": self.symbol, "U": self.update_id, "u": self.update_id,
+                 "b": [[str(bid_price), self.bids[bid_price]]], "a": [[str(ask_price), self.asks[ask_price]]]}
+        if futures:
+            event["T"] = now
+            event["pu"] = previous_id
+        return event
+
+    def next_trade(self) -> dict:
+        self.trade_id += 1
+        buyer_maker = random.random() < 0.5
+        price = self.bid_prices[0] if buyer_maker else self.ask_prices[0]
+        now = _now()
+        return {"e": "aggTrade", "E": now, "s": self.symbol, "a": self.trade_id, "p": str(price),
+                "q": self._size(), "f": self.trade_id, "l": self.trade_id, "T": now, "m": buyer_maker}
+
+    def snapshot(self, limit: int) -> dict:
+        now = _now()
+        return {"lastUpdateId": self.update_id, "E": now, "T": now,
+                "bids": [[str(p), self.bids[p]] for p in self.bid_prices[:limit]],
+                "asks": [[str(p), self.asks[p]] for p in self.ask_prices[:limit]]}
+
+
+class ExchangeStandIn:
+    def __init__(self, symbols: [str], depth_rate: float = 10, trade_rate: float = 10, futures: bool = True,
+                 host: str = '127.0.0.1', port: int = 0, mid: float = 23000.0, tick: float = 0.1):
+        """ depth_rate and trade_rate are events per second per symbol, 0 for as fast as possible;
+            futures selects the futures depth diff format, with "pu" and "T" """
+        self._books = {symbol: _SymbolBook(symbol, mid, tick) for symbol in symbols}
+        self.depth_rate = depth_rate
+        self.trade_rate = trade_rate
+        self._futures = futures
+        self._host = host
+        self._port = port
+
+        # websockets subscribed to each stream name, and user data websockets by listen key
+        self._subscribers = {}
+        self._user_streams = {}
+        self._listen_keys = set()
+        # every open websocket, closed on stop so that clients see the end of their streams
+        self._sockets = set()
+
+        self._orders = StandInOrders(symbols)
+
+        # events sent per stream type, counted over all connections
+        self.sent = {'depth': 0, 'aggTrade': 0, 'user': 0}
+
+        self._loop = None
+        self._stop = None
+        self._thread = None
+
+    """ ----------------------------------- """
+    """             Lifecycle               """
+    """ ----------------------------------- """
+
+    def start(self) -> Endpoints:
+        """ start serving on a background thread, return the endpoints to pass to a gateway """
+        started = Event()
+        self._thread = Thread(target=lambda: asyncio.run(self._serve(started)), daemon=True, name='stand-in')
+        self._thread.start()
+        started.wait()
+        return self.endpoints()
+
+    def endpoints(self) -> Endpoints:
+        return Endpoints(rest_url='http://{}:{}'.format(self._host, self._port),
+                         stream_url='ws://{}:{}'.format(self._host, self._port))
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._stop.set_result, None)
+        self._thread.join()
+
+    def set_rates(self, depth_rate: float = None, trade_rate: float = None):
+        """ change the event rates while running """
+        if depth_rate is not None:
+            self.depth_rate = depth_rate
+        if trade_rate is not None:
+            self.trade_rate = trade_rate
+
+    async def _serve(self, started: Event):
+        self._loop = asyncio.get_running_loop()
+        self._stop = self._loop.create_future()
+
+        app = web.Application()
+        app.add_routes([
+            web.get('/ws/{name}', self._on_raw_stream),
+            web.get('/stream', self._on_combined_stream),
+            web.get('/{route:market|public}/ws/{name}', self._on_raw_stream),
+            web.get('/{route:market|public}/stream', self._on_combined_stream),
+            web.get('/api/v3/ping', self._on_ping),
+            web.get('/fapi/v1/ping', self._on_ping),
+            web.get('/api/v3/time', self._on_time),
+            web.get('/fapi/v1/time', self._on_time),
+            web.get('/api/v3/depth', self._on_depth),
+            web.get('/fapi/v1/depth', self._on_depth),
+            web.route('*', '/fapi/v1/listenKey', self._on_listen_key),
+            web.route('*', '/fapi/v1/order', self._on_order),
+            web.route('*', '/fapi/v1/batchOrders', self._on_batch_orders),
+        ])
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, self._host, self._port)
+        await site.start()
+        self._port = runner.addresses[0][1]
+
+        generators = [self._loop.create_task(self._generate('depth')),
+                      self._loop.create_task(self._generate('aggTrade'))]
+        logging.info('Exchange stand-in serving on {}'.format(self.endpoints()))
+        started.set()
+        try:
+            await self._stop
+        finally:
+            for generator in generators:
+                generator.cancel()
+            for ws in list(self._sockets):
+                await ws.close()
+            await runner.cleanup()
+
+    """ ----------------------------------- """
+    """             Streams                 """
+    """ ----------------------------------- """
+
+    async def _on_raw_stream(self, request: web.Request):
+        name = request.match_info['name']
+        if name in self._listen_keys:
+            return await self._hold(request, [], user_key=name)
+        return await self._hold(request, [(name, False)])
+
+    async def _on_combined_stream(self, request: web.Request):
+        streams = request.query.get('streams', '').split('/')
+        return await self._hold(request, [(stream, True) for stream in streams if stream])
+
+    async def _hold(self, request: web.Request, streams: list, user_key: str = None):
+        """ keep a websocket subscribed to streams, given as (stream name, combined), until the client leaves """
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._sockets.add(ws)
+        for stream, combined in streams:
+            # keyed by the stream name as subscribed, the name events are published on (see _generate)
+            self._subscribers.setdefault(stream, []).append((ws, combined))
+        if user_key is not None:
+            self._user_streams.setdefault(user_key, []).append(ws)
+        try:
+            async for message in ws:
+                if message.type == WSMsgType.ERROR:
+                    break
+        finally:
+            self._sockets.discard(ws)
+            for stream, _ in streams:
+                self._subscribers[stream] = [s for s in self._subscribers[stream] if s[0] is not ws]
+            if user_key is not None:
+                self._user_streams[user_key].remove(ws)
+        return ws
+
+    async def _generate(self, stream_type: str):
+        """ send events of every symbol at the configured rate, catching up in bursts after each sleep """
+        suffix = '@depth@100ms' if stream_type == 'depth' else '@aggTrade'
+        start = time.perf_counter()
+        generated = 0
+        while True:
+            rate = self.depth_rate if stream_type == 'depth' else self.trade_rate
+            if rate:
+                due = int((time.perf_counter() - start) * rate) - generated
+                if due <= 0:
+                    await asyncio.sleep(0.001)
+                    continue
+            else:
+                due = 1
+            for _ in range(due):
+                for symbol, book in self._books.items():
+                    event = book.next_diff(self._futures) if stream_type == 'depth' else book.next_trade()
+                    await self._publish(symbol.lower() + suffix, stream_type, event)
+            generated += due
+            if not rate:
+                # let the clients and the REST handlers run
+                await asyncio.sleep(0)
+
+    async def _publish(self, stream: str, stream_type: str, event: dict):
+        subscribers = self._subscribers.get(stream)
+        if not subscribers:
+            return
+        raw = None
+        combined = None
+        for ws, is_combined in subscribers:
+            if is_combined:
+                combined = combined or json.dumps({"stream": stream, "data": event})
+                text = combined
+            else:
+                raw = raw or json.dumps(event)
+                text = raw
+            try:
+                await ws.send_str(text)
+                self.sent[stream_type] += 1
+            except ConnectionError:
+                pass
+
+    async def _publish_user(self, event: dict):
+        text = json.dumps(event)
+        for sockets in self._user_streams.values():
+            for ws in sockets:
+                try:
+                    await ws.send_str(text)
+                    self.sent['user'] += 1
+                except ConnectionError:
+                    pass
+
+    """ ----------------------------------- """
+    """             REST                    """
+    """ ----------------------------------- """
+
+    @staticmethod
+    async def _params(request: web.Request) -> dict:
+        """ request parameters, from the query string and the form body """
+        params = dict(request.query)
+        if request.can_read_body:
+            params.update(await request.post())
+        return params
+
+    async def _on_ping(self, request: web.Request):
+        return web.json_response({})
+
+    async def _on_time(self, request: web.Request):
+        return web.json_response({'serverTime': int(_now())})
+
+    async def _on_depth(self, request: web.Request):
+        book = self._books.get(request.query.get('symbol'))
+        if book is None:
+            return web.json_response({'code': -1121, 'msg': 'Invalid symbol.'}, status=400)
+        return web.json_response(book.snapshot(int(request.query.get('limit', 100))))
+
+    async def _on_listen_key(self, request: web.Request):
+        if request.method == 'POST':
+            listen_key = uuid.uuid4().hex
+            self._listen_keys.add(listen_key)
+            return web.json_response({'listenKey': listen_key})
+        return web.json_response({})
+
+    async def _on_order(self, request: web.Request):
+        params = await self._params(request)
+        try:
+            if request.method == 'POST':
+                return web.json_response(await self._place_order(params))
+            if request.method == 'DELETE':
+                return web.json_response(await self._cancel_order(params))
+            return web.json_response(self._orders.find(params))
+        except StandInError as e:
+            return web.json_response({'code': e.code, 'msg': e.msg}, status=e.status)
+
+    async def _on_batch_orders(self, request: web.Request):
+        params = await self._params(request)
+        results = []
+        if request.method == 'POST':
+            for order_params in json.loads(params.get('batchOrders', '[]')):
+                results.append(await self._try(self._place_order(order_params)))
+        elif request.method == 'DELETE':
+            client_order_ids = json.loads(params.get('origClientOrderIdList', '[]'))
+            order_ids = json.loads(params.get('orderIdList', '[]'))
+            for client_order_id in client_order_ids:
+                results.append(await self._try(
+                    self._cancel_order({'symbol': params.get('symbol'), 'origClientOrderId': client_order_id})))
+            for order_id in order_ids:
+                results.append(await self._try(
+                    self._cancel_order({'symbol': params.get('symbol'), 'orderId': order_id})))
+        return web.json_response(results)
+
+    @staticmethod
+    async def _try(coroutine) -> dict:
+        """ the result of an order action, or its error as a batch response entry """
+        try:
+            return await coroutine
+        except StandInError as e:
+            return {'code': e.code, 'msg': e.msg}
+
+    """ ----------------------------------- """
+    """             Orders                  """
+    """ ----------------------------------- """
+
+    async def _place_order(self, params: dict) -> dict:
+        order = self._orders.place(params)
+        await self._publish_order_update(order, 'NEW')
+
+        if order['type'] == 'MARKET':
+            book = self._books[order['symbol']]
+            fill_price = book.ask_prices[0] if order['side'] == 'BUY' else book.bid_prices[0]
+            self._orders.fill(order, fill_price)
+            await self._publish_order_update(order, 'TRADE', fill_price, order['origQty'])
+        return order
+
+    async def _cancel_order(self, params: dict) -> dict:
+        order = self._orders.cancel(params)
+        await self._publish_order_update(order, 'CANCELED')
+        return order
+
+    async def _publish_order_update(self, order: dict, execution_type: str, last_price=0, last_quantity='0'):
+        now = _now()
+        await self._publish_user({
+            "e": "ORDER_TRADE_UPDATE", "E": now, "T": now,
+            "o": {"s": order['symbol'], "c": order['clientOrderId'], "S": order['side'], "o": order['type'],
+                  "f": order['timeInForce'], "q": order['origQty'], "p": order['price'], "x": execution_type,
+                  "X": order['status'], "i": order['orderId'], "l": str(last_quantity), "z": order['executedQty'],
+                  "L": str(last_price), "T": now}
+        })
@@ -0,0 +1,93 @@
+"""
+A signed REST client for Binance, reusing connections across requests.
+
+    - one requests.Session with a connection pool, so TCP and TLS setup is paid once per connection rather than
+      once per request
+    - signatures and timestamps by a RequestSigner, keyed once and corrected by the server clock offset measured
+      by sync_time()
+"""
+import logging
+import time
+from urllib.parse import urlencode
+import requests
+from requests.adapters import HTTPAdapter
+from gateways.binance2.signing import RequestSigner
+
+FUTURES_TESTNET_URL = 'https://testnet.binancefuture.com'
+FUTURES_URL = 'https://fapi.binance.com'
+
+
+class RestApiError(Exception):
+    """ raised when the exchange rejects a request """
+    def __init__(self, status_code: int, code, message: str):
+        super().__init__('HTTP {} - code={}, msg={}'.format(status_code, code, message))
+        self.status_code = status_code
+        self.code = code
+        self.message = message
+
+
+class SignedRestClient:
+    def __init__(self, api_key: str, api_secret: str, base_url: str = FUTURES_TESTNET_URL, pool_size: int = 4,
+                 timeout: float = 10):
+        self._base_url = base_url
+        self._timeout = timeout
+
+        # persistent session, keeping up to pool_size connections alive to the exchange
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+        self._session.headers.update(
+            {"Content-Type": "application/json;charset=utf-8", "X-MBX-APIKEY": api_key}
+        )
+
+        self._signer = RequestSigner(api_secret)
+
+    def sync_time(self, path: str = '/fapi/v1/time') -> int:
+        """ measure the offset between server and local clocks, assuming the server time is taken half-way
+            through the round-trip; return the offset in milliseconds """
+        before = time.time() * 1000
+        server_time = self.public_request('GET', path)['serverTime']
+        after = time.time() * 1000
+        offset = self._signer.set_server_time(server_time, before, after)
+        logging.info('Server time offset: {} ms'.format(offset))
+        return offset
+
+    def timestamp(self) -> int:
+        """ current server time estimate in milliseconds """
+        return self._signer.timestamp()
+
+    def sign(self, query_string: str) -> str:
+        return self._signer.sign(query_string)
+
+    def public_request(self, method: str, path: str, params: dict = None):
+        response = self._session.request(method, self._base_url + path, params=params, timeout=self._timeout)
+        return self._handle_response(response)
+
+    def signed_request(self, method: str, path: str, params: dict = None):
+        query_string = urlencode(dict(params or {}, timestamp=self.timestamp()))
+        url = self._base_url + path + "?" + query_string + "&signature=" + self.sign(query_string)
+        response = self._session.request(method, url, timeout=self._timeout)
+        return self._handle_response(response)
+
+    def new_order(self, **params):
+        return self.signed_request('POST', '/fapi/v1/order', params)
+
+    def get_order(self, symbol: str, order_id):
+        return self.signed_request('GET', '/fapi/v1/order', {"symbol": symbol, "orderId": order_id})
+
+    def cancel_order(self, symbol: str, order_id):
+        return self.signed_request('DELETE', '/fapi/v1/order', {"symbol": symbol, "orderId": order_id})
+
+    def close(self):
+        self._session.close()
+
+    @staticmethod
+    def _handle_response(response: requests.Response):
+        if response.status_code >= 400:
+            try:
+                data = response.json()
+            except ValueError:
+                data = {'msg': response.text}
+            raise RestApiError(response.status_code, data.get('code'), data.get('msg'))
+        return response.json()
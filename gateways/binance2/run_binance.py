@@ -30,8 +30,8 @@ if __name__ == '__main__':
     API_KEY = os.getenv('BINANCE_API_KEY')
     API_SECRET = os.getenv('BINANCE_API_SECRET')
 
-    contract = 'BTCUSDT'
-    binance = BinanceGateway(symbol=contract,  api_key=API_KEY, api_secret=API_SECRET, product_type=ProductType.FUTURE)
+    contracts = ['BTCUSDT', 'ETHUSDT']
+    binance = BinanceGateway(symbol=contracts,  api_key=API_KEY, api_secret=API_SECRET, product_type=ProductType.FUTURE)
     binance.connect()
 
     while True:
@@ -40,4 +40,5 @@ if __name__ == '__main__':
         if binance.not_ready():
             logging.info("Not ready to trade")
         else:
-            logging.info('Depth: %s' % binance.get_order_book(contract))
+            for contract in contracts:
+                logging.info('Depth %s: %s' % (contract, binance.get_order_book(contract)))
@@ -0,0 +1,39 @@
+"""
+Request signing shared by the REST and WebSocket API clients.
+
+    - the HMAC-SHA256 key schedule is computed once and copied for each signature
+    - request timestamps are corrected by the offset between local and server clocks, measured by the client's
+      sync_time() and recorded with set_server_time()
+"""
+import hashlib
+import hmac
+import time
+from urllib.parse import urlencode
+
+
+# signature payload of WebSocket API parameters: sorted by name and joined as a query string
+def signature_payload(params: dict) -> str:
+    return urlencode(sorted((k, v) for k, v in params.items() if k != 'signature'))
+
+
+class RequestSigner:
+    def __init__(self, api_secret: str):
+        # keyed HMAC state, copied for each signature instead of re-keying
+        self._hmac = hmac.new(api_secret.encode("utf-8"), digestmod=hashlib.sha256)
+        # server time minus local time in milliseconds
+        self.time_offset = 0
+
+    def set_server_time(self, server_time: int, before: float, after: float) -> int:
+        """ set the clock offset from a server time read between local times before and after (ms), assuming the
+            server time is taken half-way through the round-trip; return the offset in milliseconds """
+        self.time_offset = int(server_time - (before + after) / 2)
+        return self.time_offset
+
+    def timestamp(self) -> int:
+        """ current server time estimate in milliseconds """
+        return int(time.time() * 1000) + self.time_offset
+
+    def sign(self, payload: str) -> str:
+        signer = self._hmac.copy()
+        signer.update(payload.encode("utf-8"))
+        return signer.hexdigest()
@@ -0,0 +1,77 @@
+"""
+Orders of the local exchange stand-ins (ExchangeStandIn and WsApiStandIn), kept in memory as the order dicts the
+exchange returns. Limit orders rest until cancelled; the stand-in fills market orders immediately with fill().
+Rejected requests raise StandInError with the Binance error code and message.
+"""
+import time
+
+
+# an error response of a stand-in, {"code", "msg"} with an HTTP or WebSocket API status
+class StandInError(Exception):
+    def __init__(self, code: int, msg: str, status: int = 400):
+        super().__init__(msg)
+        self.code = code
+        self.msg = msg
+        self.status = status
+
+
+class StandInOrders:
+    def __init__(self, symbols: [str] = None):
+        """ symbols are those accepted in orders, any symbol if None """
+        self._symbols = None if symbols is None else set(symbols)
+        # open orders by order id
+        self.open = {}
+        self._next_order_id = 0
+
+    def place(self, params: dict) -> dict:
+        """ a new order from request parameters, open until filled or cancelled """
+        for name in ['symbol', 'side', 'type', 'quantity']:
+            if name not in params:
+                raise StandInError(-1102, "Mandatory parameter '{}' was not sent".format(name))
+        if self._symbols is not None and params['symbol'] not in self._symbols:
+            raise StandInError(-1121, 'Invalid symbol.')
+        self._next_order_id += 1
+        order = {
+            'orderId': self._next_order_id,
+            'symbol': params['symbol'],
+            'clientOrderId': params.get('newClientOrderId') or 'stand-in-{}'.format(self._next_order_id),
+            'side': params['side'],
+            'type': params['type'],
+            'price': str(params.get('price', '0')),
+            'origQty': str(params['quantity']),
+            'executedQty': '0',
+            'timeInForce': params.get('timeInForce', 'GTC'),
+            'status': 'NEW',
+            'updateTime': int(time.time() * 1000),
+        }
+        self.open[order['orderId']] = order
+        return order
+
+    def fill(self, order: dict, price) -> dict:
+        """ fill an open order in full at price """
+        order.update(status='FILLED', executedQty=order['origQty'], avgPrice=str(price),
+                     updateTime=int(time.time() * 1000))
+        del self.open[order['orderId']]
+        return order
+
+    def cancel(self, params: dict) -> dict:
+        """ cancel an open order by orderId or origClientOrderId """
+        try:
+            order = self.find(params)
+        except StandInError:
+            raise StandInError(-2011, 'Unknown order sent.')
+        order.update(status='CANCELED', updateTime=int(time.time() * 1000))
+        del self.open[order['orderId']]
+        return order
+
+    def find(self, params: dict) -> dict:
+        """ an open order by orderId or origClientOrderId """
+        if 'orderId' in params:
+            order = self.open.get(int(params['orderId']))
+            if order is not None:
+                return order
+        elif 'origClientOrderId' in params:
+            for order in self.open.values():
+                if order['clientOrderId'] == params['origClientOrderId']:
+                    return order
+        raise StandInError(-2013, 'Order does not exist.')
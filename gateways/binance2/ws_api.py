@@ -0,0 +1,134 @@
+"""
+Order entry over the Binance futures WebSocket API - https://binance-docs.github.io/apidocs/futures/en/#websocket-api-general-info
+
+Requests are sent over one persistent websocket session instead of one HTTP request/response each:
+    request  {"id": "7", "method": "order.place", "params": {..., "apiKey", "timestamp", "signature"}}
+    response {"id": "7", "status": 200, "result": {...}}
+             {"id": "7", "status": 400, "error": {"code": -2010, "msg": "..."}}
+
+Responses may arrive in any order and are matched to their request by id. With an HMAC key every request is
+signed: its parameters sorted by name as a query string, signed with HMAC-SHA256.
+"""
+import asyncio
+import json
+import logging
+import time
+import websockets
+from common.json_decoder import JsonDecoder
+from gateways.binance2.signing import RequestSigner, signature_payload
+
+FUTURES_WS_API_URL = 'wss://ws-fapi.binance.com/ws-fapi/v1'
+FUTURES_WS_API_TESTNET_URL = 'wss://testnet.binancefuture.com/ws-fapi/v1'
+
+
+class WsApiError(Exception):
+    """ raised when the exchange rejects a request """
+    def __init__(self, status: int, code, message: str):
+        super().__init__('status {} - code={}, msg={}'.format(status, code, message))
+        self.status = status
+        self.code = code
+        self.message = message
+
+
+class WsApiClient:
+    def __init__(self, api_key: str, api_secret: str, url: str = FUTURES_WS_API_TESTNET_URL, timeout: float = 10):
+        self._api_key = api_key
+        self._url = url
+        self._timeout = timeout
+        self._decoder = JsonDecoder()
+
+        self._signer = RequestSigner(api_secret)
+
+        self._ws = None
+        self._receiver = None
+        self._connect_lock = None
+        self._next_id = 0
+        # futures of requests waiting for their response, by request id
+        self._pending = {}
+
+    async def connect(self):
+        """ open the session, if not already open; called by the first request otherwise """
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self.is_connected():
+                return
+            logging.info('WS API - connecting to {}'.format(self._url))
+            self._ws = await websockets.connect(self._url, max_queue=None)
+            self._receiver = asyncio.get_running_loop().create_task(self._receive_forever(self._ws))
+
+    def is_connected(self) -> bool:
+        return self._ws is not None and self._receiver is not None and not self._receiver.done()
+
+    async def close(self):
+        if self._ws is not None:
+            await self._ws.close()
+        if self._receiver is not None:
+            await asyncio.gather(self._receiver, return_exceptions=True)
+        self._ws = None
+
+    async def sync_time(self) -> int:
+        """ measure the offset between server and local clocks, see SignedRestClient.sync_time """
+        before = time.time() * 1000
+        server_time = (await self.request('time', signed=False))['serverTime']
+        after = time.time() * 1000
+        offset = self._signer.set_server_time(server_time, before, after)
+        logging.info('WS API - server time offset: {} ms'.format(offset))
+        return offset
+
+    def sign(self, params: dict) -> dict:
+        """ add the api key, timestamp and signature to request parameters """
+        params = dict(params, apiKey=self._api_key, timestamp=self._signer.timestamp())
+        params['signature'] = self._signer.sign(signature_payload(params))
+        return params
+
+    async def request(self, method: str, params: dict = None, signed: bool = True):
+        """ send a request and wait for its result, raise WsApiError if rejected or asyncio.TimeoutError """
+        if not self.is_connected():
+            await self.connect()
+        self._next_id += 1
+        request_id = str(self._next_id)
+        message = {'id': request_id, 'method': method}
+        if params or signed:
+            message['params'] = self.sign(params or {}) if signed else params
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            await self._ws.send(json.dumps(message))
+            return await asyncio.wait_for(future, self._timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def place_order(self, **params) -> dict:
+        return await self.request('order.place', params)
+
+    async def cancel_order(self, symbol: str, order_id=None, client_order_id: str = None) -> dict:
+        params = {'symbol': symbol}
+        if order_id is not None:
+            params['orderId'] = order_id
+        if client_order_id is not None:
+            params['origClientOrderId'] = client_order_id
+        return await self.request('order.cancel', params)
+
+    async def _receive_forever(self, ws):
+        try:
+            async for message in ws:
+                response = self._decoder.loads(message)
+                future = self._pending.get(response.get('id'))
+                if future is None or future.done():
+                    logging.warning('WS API - response to unknown request: {}'.format(message))
+                    continue
+                if response.get('status') == 200:
+                    future.set_result(response.get('result'))
+                else:
+                    error = response.get('error', {})
+                    future.set_exception(WsApiError(response.get('status'), error.get('code'), error.get('msg')))
+        except Exception:
+            logging.exception('WS API - session failed')
+        finally:
+            # requests in flight will not get a response on a new session
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError('WS API session closed'))
+            logging.info('WS API - session closed')
@@ -0,0 +1,103 @@
+"""
+A local stand-in of the Binance futures WebSocket API order entry, to run the gateway and latency measurements
+offline. It serves "time", "order.place" and "order.cancel", verifies request signatures when given the API
+secret, and keeps open orders in memory; limit orders rest until cancelled, market orders fill immediately.
+
+    stand_in = WsApiStandIn(api_secret='secret')
+    url = stand_in.start()
+    ...
+    stand_in.stop()
+"""
+import asyncio
+import json
+import logging
+import time
+from threading import Thread, Event
+import websockets
+from gateways.binance2.signing import RequestSigner, signature_payload
+from gateways.binance2.stand_in_orders import StandInError, StandInOrders
+
+
+class WsApiStandIn:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, api_secret: str = None, latency: float = 0):
+        """ latency is an optional delay in seconds before each response """
+        self._host = host
+        self._port = port
+        self._signer = None if api_secret is None else RequestSigner(api_secret)
+        self._latency = latency
+        self._loop = None
+        self._stop = None
+        self._thread = None
+        self.orders = StandInOrders()
+        self.requests = 0
+
+    def start(self) -> str:
+        """ start serving on a background thread, return the url """
+        started = Event()
+
+        async def serve():
+            self._loop = asyncio.get_running_loop()
+            self._stop = self._loop.create_future()
+            async with websockets.serve(self._handler, self._host, self._port) as server:
+                self._port = server.sockets[0].getsockname()[1]
+                started.set()
+                await self._stop
+
+        self._thread = Thread(target=lambda: asyncio.run(serve()), daemon=True, name='ws-api-stand-in')
+        self._thread.start()
+        started.wait()
+        return self.url()
+
+    def url(self) -> str:
+        return 'ws://{}:{}'.format(self._host, self._port)
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._stop.set_result, None)
+        self._thread.join()
+
+    async def _handler(self, websocket, *args):
+        async for message in websocket:
+            request = json.loads(message)
+            self.requests += 1
+            if self._latency:
+                await asyncio.sleep(self._latency)
+            try:
+                response = {'id': request['id'], 'status': 200, 'result': self._dispatch(request)}
+            except StandInError as e:
+                response = {'id': request.get('id'), 'status': e.status, 'error': {'code': e.code, 'msg': e.msg}}
+            await websocket.send(json.dumps(response))
+
+    def _dispatch(self, request: dict) -> dict:
+        method = request.get('method')
+        params = request.get('params', {})
+        if method == 'time':
+            return {'serverTime': int(time.time() * 1000)}
+        self._verify(params)
+        if method == 'order.place':
+            return self._place_order(params)
+        if method == 'order.cancel':
+            return self._cancel_order(params)
+        raise StandInError(-1100, 'Unknown method {}'.format(method))
+
+    def _verify(self, params: dict):
+        if self._signer is None:
+            return
+        if params.get('signature') != self._signer.sign(signature_payload(params)):
+            raise StandInError(-1022, 'Signature for this request is not valid.')
+
+    def _place_order(self, params: dict) -> dict:
+        order = self.orders.place(params)
+        if order['type'] == 'MARKET':
+            self.orders.fill(order, order['price'])
+        return order
+
+    def _cancel_order(self, params: dict) -> dict:
+        return self.orders.cancel(params)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(format='%(asctime)s [%(threadName)-12.12s] [%(levelname)-5.5s]  %(message)s',
+                        level=logging.INFO)
+    stand_in = WsApiStandIn()
+    logging.info('WS API stand-in serving on {}'.format(stand_in.start()))
+    stand_in._thread.join()
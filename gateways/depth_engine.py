@@ -0,0 +1,223 @@
+"""
+A local L2 order book maintained from a REST depth snapshot and a stream of depth diff events.
+
+The synchronisation follows Binance's procedure to manage a local order book:
+    - spot: drop events with u <= lastUpdateId, the first event applied must satisfy U <= lastUpdateId + 1 <= u,
+      and each following event must have U == previous u + 1
+    - USD-M futures: drop events with u < lastUpdateId, the first event applied must satisfy U <= lastUpdateId <= u
+      or pu == lastUpdateId, and each following event must have pu == previous u
+
+Each side keeps its prices in a sorted list, so a level update is a bisect plus an insert/delete, and reading the
+top k levels is a slice, with no sorting on read.
+
+Given the InstrumentDetails of the symbol, prices are kept as integer ticks and sizes as integer lots (when the
+quantity size is known), so book keys are exact and comparisons are integer comparisons.
+"""
+from bisect import bisect_left
+from sys import maxsize
+from common.interface_order import InstrumentDetails
+
+_NO_CHANGE = maxsize
+
+
+class DepthGapError(Exception):
+    """ raised when a diff event does not follow the previous one, the book must be reloaded from a snapshot """
+    pass
+
+
+# One side of the book, as parallel price and size lists sorted by ascending price.
+# The best bid is the last element and the best ask is the first.
+class BookSide:
+    def __init__(self, is_bid: bool):
+        self.is_bid = is_bid
+        self._prices = []
+        self._sizes = []
+
+    def clear(self):
+        self._prices.clear()
+        self._sizes.clear()
+
+    def load(self, levels, price_key=float, size_key=float):
+        """ replace this side with the given (price, size) levels, in any order, keyed by price_key and size_key """
+        _levels = sorted((price_key(p), size_key(s)) for p, s in levels if float(s) != 0)
+        self._prices = [p for p, _ in _levels]
+        self._sizes = [s for _, s in _levels]
+
+    def update(self, price: float, size: float) -> int:
+        """ set the size at a price, zero size removes the level.
+            Return the rank of the changed level counting from the best price (0 = best), or -1 if nothing changed """
+        prices = self._prices
+        sizes = self._sizes
+        count = len(prices)
+        i = bisect_left(prices, price)
+        found = i < count and prices[i] == price
+        if size == 0:
+            if not found:
+                return -1
+            del prices[i]
+            del sizes[i]
+            return count - 1 - i if self.is_bid else i
+        if found:
+            if sizes[i] == size:
+                return -1
+            sizes[i] = size
+            return count - 1 - i if self.is_bid else i
+        prices.insert(i, price)
+        sizes.insert(i, size)
+        return count - i if self.is_bid else i
+
+    def top(self, k: int) -> list:
+        """ return up to k (price, size) levels, best first """
+        if k <= 0:
+            return []
+        if self.is_bid:
+            return list(zip(reversed(self._prices[-k:]), reversed(self._sizes[-k:])))
+        return list(zip(self._prices[:k], self._sizes[:k]))
+
+    def best_price(self) -> float:
+        return self._prices[-1] if self.is_bid else self._prices[0]
+
+    def best_size(self) -> float:
+        return self._sizes[-1] if self.is_bid else self._sizes[0]
+
+    def __len__(self):
+        return len(self._prices)
+
+
+# An L2 order book for one symbol, synchronised from a snapshot and diff events
+class L2OrderBook:
+    def __init__(self, symbol: str, futures: bool = False, max_pending: int = 1000,
+                 instrument: InstrumentDetails = None):
+        self.symbol = symbol
+        self.futures = futures
+        self.bids = BookSide(is_bid=True)
+        self.asks = BookSide(is_bid=False)
+
+        # with instrument details, levels are keyed by integer ticks and lots instead of floats
+        self.instrument = instrument
+        self._price_key = instrument.to_ticks if instrument else float
+        self._size_key = instrument.to_lots if instrument and instrument.quantity_size else float
+
+        # update id of the last snapshot or diff applied, None while waiting for a snapshot
+        self.last_update_id = None
+        # event time (ms) of the last snapshot or diff applied
+        self.update_time = 0
+        # incremented every time the content of the book changes
+        self.version = 0
+        # rank from the best price of the best level changed by the last snapshot or diff, -1 if none changed;
+        # the top N levels are unchanged when it is -1 or >= N
+        self.last_change_rank = -1
+
+        # diff events received while waiting for a snapshot, replayed once the snapshot is loaded
+        self._pending = []
+        self._max_pending = max_pending
+        # set once the first diff following the snapshot has been applied
+        self._bridged = False
+
+    def is_ready(self) -> bool:
+        return self.last_update_id is not None
+
+    def invalidate(self, drop_pending: bool = False):
+        """ drop the book and buffer diff events until the next snapshot; drop_pending also discards the events
+            already buffered, for example when they came from a connection that was lost """
+        if drop_pending:
+            self._pending = []
+        self.last_update_id = None
+        self._bridged = False
+        self.bids.clear()
+        self.asks.clear()
+
+    def apply_snapshot(self, snapshot: dict):
+        """ load a REST depth snapshot {"lastUpdateId", "bids", "asks"} and replay buffered diff events """
+        self.bids.load(snapshot['bids'], self._price_key, self._size_key)
+        self.asks.load(snapshot['asks'], self._price_key, self._size_key)
+        self.last_update_id = snapshot['lastUpdateId']
+        self.update_time = snapshot.get('E', self.update_time)
+        self._bridged = False
+        self.version += 1
+        self.last_change_rank = 0
+
+        pending = self._pending
+        self._pending = []
+        for i, event in enumerate(pending):
+            try:
+                self.apply_diff(event)
+            except DepthGapError:
+                # keep the remaining events buffered for the next snapshot
+                self._pending.extend(pending[i + 1:])
+                raise
+
+    def apply_diff(self, event: dict) -> bool:
+        """ apply a depth diff event {"E", "U", "u", ["pu"], "b", "a"}.
+            Return True if the book changed, False if the event was buffered, older than the book or changed nothing.
+            Raise DepthGapError if an event is missing, in which case the book is invalidated. """
+        if self.last_update_id is None:
+            if len(self._pending) >= self._max_pending:
+                self._pending.pop(0)
+            self._pending.append(event)
+            return False
+
+        first_id = event['U']
+        final_id = event['u']
+        last_id = self.last_update_id
+        if self.futures:
+            if final_id < last_id:
+                return False
+            if self._bridged:
+                in_sequence = event['pu'] == last_id
+            else:
+                # an event straight after the snapshot's last update is in sequence as well
+                in_sequence = first_id <= last_id <= final_id or event.get('pu') == last_id
+        else:
+            if final_id <= last_id:
+                return False
+            if self._bridged:
+                in_sequence = first_id == last_id + 1
+            else:
+                in_sequence = first_id <= last_id + 1 <= final_id
+
+        if not in_sequence:
+            self.invalidate()
+            self._pending.append(event)
+            raise DepthGapError('{} depth gap: last update id {}, received U={} u={}'
+                                .format(self.symbol, last_id, first_id, final_id))
+
+        change_rank = _NO_CHANGE
+        price_key = self._price_key
+        size_key = self._size_key
+        bids = self.bids
+        for price, size in event['b']:
+            rank = bids.update(price_key(price), size_key(size))
+            if 0 <= rank < change_rank:
+                change_rank = rank
+        asks = self.asks
+        for price, size in event['a']:
+            rank = asks.update(price_key(price), size_key(size))
+            if 0 <= rank < change_rank:
+                change_rank = rank
+
+        self.last_update_id = final_id
+        self.update_time = event['E']
+        self._bridged = True
+        if change_rank == _NO_CHANGE:
+            self.last_change_rank = -1
+            return False
+        self.last_change_rank = change_rank
+        self.version += 1
+        return True
+
+    def get_bids(self, k: int) -> list:
+        """ up to k (price, size) bid levels as floats, best first """
+        return self._to_floats(self.bids.top(k))
+
+    def get_asks(self, k: int) -> list:
+        """ up to k (price, size) ask levels as floats, best first """
+        return self._to_floats(self.asks.top(k))
+
+    def _to_floats(self, levels: list) -> list:
+        instrument = self.instrument
+        if instrument is None:
+            return levels
+        if self._size_key is float:
+            return [(instrument.to_price(p), s) for p, s in levels]
+        return [(instrument.to_price(p), instrument.to_quantity(s)) for p, s in levels]
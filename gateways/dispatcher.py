@@ -0,0 +1,207 @@
+"""
+A dispatcher stage between a gateway's socket reading and the user callbacks.
+
+Each subscriber has its own bounded queue, so a slow callback only delays itself and never the socket reading
+or the other subscribers. When a queue is full, events are dropped according to the overflow policy and counted.
+
+A subscriber can instead conflate events: it keeps only the latest event per key (for example per symbol) in a
+one-slot mailbox, so a consumer that falls behind skips straight to the newest state. Superseded events are
+counted as coalesced.
+
+Callbacks are run by one of:
+    - INLINE: called directly by the publisher, no queue (the gateways' original behaviour)
+    - LOOP: on the publisher's event loop, one queued event per loop iteration so that socket reads interleave
+    - THREAD: on a shared thread pool, events of one subscriber are delivered in order by one worker at a time
+"""
+import logging
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from threading import Lock
+
+
+class DispatchMode(Enum):
+    INLINE = 0
+    LOOP = 1
+    THREAD = 2
+
+
+class OverflowPolicy(Enum):
+    DROP_OLDEST = 0     # make room by discarding the oldest queued event
+    DROP_NEWEST = 1     # discard the event being published
+
+
+class SubscriberStats:
+    """ Counters of one subscriber """
+    def __init__(self, name: str):
+        self.name = name
+        self.published = 0      # events published to the subscriber
+        self.delivered = 0      # events passed to the callback
+        self.overflows = 0      # publishes that found the queue full
+        self.dropped = 0        # events discarded without being delivered
+        self.errors = 0         # callbacks that raised an exception
+        self.max_queued = 0     # highest number of events queued at once
+        self.coalesced = 0      # events replaced by a newer event of the same key before delivery
+
+    def __str__(self):
+        return "{}: published={}, delivered={}, overflows={}, dropped={}, errors={}, max_queued={}, coalesced={}"\
+            .format(self.name, self.published, self.delivered, self.overflows, self.dropped, self.errors,
+                    self.max_queued, self.coalesced)
+
+
+# A callback with its own bounded queue, or with a mailbox of the latest event per key if conflate_key is given
+class Subscriber(ABC):
+    def __init__(self, callback, max_queue: int, policy: OverflowPolicy, conflate_key=None):
+        self.callback = callback
+        self.stats = SubscriberStats(getattr(callback, '__qualname__', str(callback)))
+        self._max_queue = max_queue
+        self._policy = policy
+        self._queue = deque()
+        self._lock = Lock()
+        # a drain of the queue is scheduled or running
+        self._scheduled = False
+        # function of the event arguments giving the conflation key, and the latest event per key
+        self._conflate_key = conflate_key
+        self._mailbox = {}
+
+    def publish(self, args: tuple):
+        stats = self.stats
+        with self._lock:
+            stats.published += 1
+            if self._conflate_key is not None:
+                # a key keeps its place in the mailbox when its event is replaced, so keys are served in turn
+                key = self._conflate_key(args)
+                if key in self._mailbox:
+                    stats.coalesced += 1
+                self._mailbox[key] = args
+                queued = len(self._mailbox)
+            else:
+                queue = self._queue
+                if len(queue) >= self._max_queue:
+                    stats.overflows += 1
+                    stats.dropped += 1
+                    if self._policy == OverflowPolicy.DROP_NEWEST:
+                        return
+                    queue.popleft()
+                queue.append(args)
+                queued = len(queue)
+            if queued > stats.max_queued:
+                stats.max_queued = queued
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self._schedule()
+
+    @abstractmethod
+    def _schedule(self):
+        """ arrange for the queue to be drained """
+
+    def _next(self):
+        """ pop the next event, or return None and mark the subscriber idle if the queue is empty """
+        with self._lock:
+            if self._queue:
+                return self._queue.popleft()
+            if self._mailbox:
+                return self._mailbox.pop(next(iter(self._mailbox)))
+            self._scheduled = False
+            return None
+
+    def _deliver(self, args: tuple):
+        try:
+            self.callback(*args)
+            self.stats.delivered += 1
+        except Exception:
+            self.stats.errors += 1
+            logging.exception('Callback {} failed'.format(self.stats.name))
+
+
+class InlineSubscriber(Subscriber):
+    def publish(self, args: tuple):
+        self.stats.published += 1
+        self._deliver(args)
+
+    def _schedule(self):
+        # events are delivered by publish without queueing, nothing is ever left to drain
+        pass
+
+
+class LoopSubscriber(Subscriber):
+    def __init__(self, callback, max_queue: int, policy: OverflowPolicy, conflate_key=None):
+        super().__init__(callback, max_queue, policy, conflate_key)
+        self.loop = None
+
+    def _schedule(self):
+        self.loop.call_soon_threadsafe(self._drain_one)
+
+    def _drain_one(self):
+        # deliver one event, then yield to the loop before the next
+        args = self._next()
+        if args is not None:
+            self._deliver(args)
+            self.loop.call_soon(self._drain_one)
+
+
+class ThreadSubscriber(Subscriber):
+    def __init__(self, callback, max_queue: int, policy: OverflowPolicy, executor: ThreadPoolExecutor,
+                 conflate_key=None):
+        super().__init__(callback, max_queue, policy, conflate_key)
+        self._executor = executor
+
+    def _schedule(self):
+        self._executor.submit(self._drain)
+
+    def _drain(self):
+        while True:
+            args = self._next()
+            if args is None:
+                return
+            self._deliver(args)
+
+
+# Publishes events to the subscribed callbacks, using the given dispatch mode
+class CallbackDispatcher:
+    def __init__(self, mode: DispatchMode = DispatchMode.INLINE, max_queue: int = 1000,
+                 policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST, workers: int = 2, name: str = 'dispatcher'):
+        self._mode = mode
+        self._max_queue = max_queue
+        self._policy = policy
+        self._subscribers = []
+        self._loop = None
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name) \
+            if mode == DispatchMode.THREAD else None
+
+    def subscribe(self, callback, conflate_key=None) -> Subscriber:
+        """ subscribe a callback; with conflate_key, a function of the published arguments, only the latest event
+            per key is kept. A conflating subscriber of an INLINE dispatcher runs on the loop like in LOOP mode """
+        if self._mode == DispatchMode.LOOP or (self._mode == DispatchMode.INLINE and conflate_key is not None):
+            subscriber = LoopSubscriber(callback, self._max_queue, self._policy, conflate_key)
+            subscriber.loop = self._loop
+        elif self._mode == DispatchMode.THREAD:
+            subscriber = ThreadSubscriber(callback, self._max_queue, self._policy, self._executor, conflate_key)
+        else:
+            subscriber = InlineSubscriber(callback, self._max_queue, self._policy)
+        self._subscribers.append(subscriber)
+        return subscriber
+
+    def start(self, loop):
+        """ set the event loop running LOOP mode callbacks, the loop the events are published from """
+        self._loop = loop
+        for subscriber in self._subscribers:
+            if isinstance(subscriber, LoopSubscriber):
+                subscriber.loop = loop
+
+    def has_subscribers(self) -> bool:
+        return len(self._subscribers) > 0
+
+    def publish(self, *args):
+        for subscriber in self._subscribers:
+            subscriber.publish(args)
+
+    def get_stats(self) -> [SubscriberStats]:
+        return [subscriber.stats for subscriber in self._subscribers]
+
+    def shutdown(self):
+        """ stop the worker threads of THREAD mode once they are idle """
+        if self._executor:
+            self._executor.shutdown(wait=False)
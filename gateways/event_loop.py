@@ -0,0 +1,56 @@
+"""
+Event loop selection and CPU pinning for the gateways' dedicated loop threads.
+
+    pip install uvloop
+
+uvloop is a drop-in replacement of the asyncio event loop built on libuv, it is not available on Windows.
+Pinning the loop thread to a CPU keeps its caches warm and avoids migrations between cores; it uses
+os.sched_setaffinity, which only exists on Linux.
+"""
+import asyncio
+import importlib
+import logging
+import os
+from enum import Enum
+
+
+class LoopType(Enum):
+    ASYNCIO = 0     # standard library event loop
+    UVLOOP = 1      # uvloop, raises ImportError if not installed
+    AUTO = 2        # uvloop if installed, otherwise the standard library
+
+
+def available_loop_types() -> [LoopType]:
+    loop_types = [LoopType.ASYNCIO]
+    try:
+        importlib.import_module('uvloop')
+        loop_types.append(LoopType.UVLOOP)
+    except ImportError:
+        pass
+    return loop_types
+
+
+def new_event_loop(loop_type: LoopType = LoopType.ASYNCIO) -> asyncio.AbstractEventLoop:
+    if loop_type == LoopType.AUTO:
+        loop_type = available_loop_types()[-1]
+    if loop_type == LoopType.UVLOOP:
+        uvloop = importlib.import_module('uvloop')
+        loop = uvloop.new_event_loop()
+    else:
+        loop = asyncio.new_event_loop()
+    logging.debug('Using {} event loop'.format(loop_type.name))
+    return loop
+
+
+def pin_current_thread(cpus) -> bool:
+    """ restrict the calling thread to a CPU or a collection of CPUs, return False if not supported """
+    if cpus is None:
+        return False
+    cpus = {cpus} if isinstance(cpus, int) else set(cpus)
+    if not hasattr(os, 'sched_setaffinity'):
+        logging.warning('CPU pinning is not supported on this platform')
+        return False
+    # pid 0 is the calling thread
+    os.sched_setaffinity(0, cpus)
+    logging.info('Pinned thread to CPU {}'.format(sorted(cpus)))
+    return True
@@ -1,3 +1,4 @@
+from enum import Enum
 from common.interface_book import OrderBook
 
 
@@ -6,6 +7,10 @@ class GatewayInterface:
     def get_name(self):
         pass
 
+    """ close the connections and stop the threads of this gateway """
+    def disconnect(self):
+        pass
+
     """ this gateway is not ready """
     def not_ready(self) -> bool:
         pass
@@ -19,8 +24,9 @@ class GatewayInterface:
         pass
 
     """ register a depth callback function takes three argument: 
-        (exchange_name:str, contract_name:str, book: OrderBook) """
-    def register_depth_callback(self, callback):
+        (exchange_name:str, contract_name:str, book: OrderBook)
+        with conflate, a callback that falls behind only receives the latest book of each symbol """
+    def register_depth_callback(self, callback, conflate=False):
         pass
 
     """ register an execution callback function takes two arguments, 
@@ -38,6 +44,13 @@ class GatewayInterface:
         pass
 
 
+class DepthNotify(Enum):
+    """ When depth callbacks are notified """
+    EVERY_UPDATE = 0    # on every depth update
+    TOP_N = 1           # only when one of the top N levels published to callbacks changed
+    BBO = 2             # only when the best bid or best ask (price or size) changed
+
+
 class ReadyCheck:
     """ Class to maintain readiness check """
     def __init__(self):
@@ -0,0 +1,74 @@
+"""
+Helpers for recovering a gateway stream after a fault:
+    - ExponentialBackoff: delays between reconnection attempts, doubling up to a cap, with full jitter so that
+      streams (or clients) that failed together do not retry in lockstep
+    - RecoveryStats: how often a stream faulted and how long it took to be ready again
+"""
+import asyncio
+import random
+import time
+
+
+class ExponentialBackoff:
+    def __init__(self, base: float = 0.5, cap: float = 30, factor: float = 2):
+        self._base = base
+        self._cap = cap
+        self._factor = factor
+        self.attempts = 0
+
+    def next_delay(self) -> float:
+        """ a random delay between zero and the exponential bound of the current attempt """
+        bound = min(self._cap, self._base * self._factor ** self.attempts)
+        self.attempts += 1
+        return random.uniform(0, bound)
+
+    async def wait(self) -> float:
+        delay = self.next_delay()
+        await asyncio.sleep(delay)
+        return delay
+
+    def reset(self):
+        """ call once the stream is healthy again """
+        self.attempts = 0
+
+
+class RecoveryStats:
+    """ Faults of one stream and the time from each fault until the stream was ready again """
+    def __init__(self, name: str):
+        self.name = name
+        self.faults = 0                 # faults recorded
+        self.recoveries = 0             # faults followed by the stream being ready again
+        self.last_time_to_ready = 0.0   # seconds
+        self.max_time_to_ready = 0.0    # seconds
+        self.total_time_to_ready = 0.0  # seconds
+        # monotonic time of the first fault not yet recovered, None when the stream is ready
+        self._fault_time = None
+
+    def on_fault(self):
+        self.faults += 1
+        # further faults while recovering extend the same outage
+        if self._fault_time is None:
+            self._fault_time = time.monotonic()
+
+    def on_ready(self) -> float:
+        """ record the end of an outage, return its duration in seconds or None if there was no outage """
+        if self._fault_time is None:
+            return None
+        elapsed = time.monotonic() - self._fault_time
+        self._fault_time = None
+        self.recoveries += 1
+        self.last_time_to_ready = elapsed
+        self.max_time_to_ready = max(self.max_time_to_ready, elapsed)
+        self.total_time_to_ready += elapsed
+        return elapsed
+
+    def is_recovering(self) -> bool:
+        return self._fault_time is not None
+
+    def mean_time_to_ready(self) -> float:
+        return self.total_time_to_ready / self.recoveries if self.recoveries else 0.0
+
+    def __str__(self):
+        return "{}: faults={}, recoveries={}, last={:.3f}s, mean={:.3f}s, max={:.3f}s"\
+            .format(self.name, self.faults, self.recoveries, self.last_time_to_ready, self.mean_time_to_ready(),
+                    self.max_time_to_ready)
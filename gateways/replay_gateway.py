@@ -0,0 +1,239 @@
+"""
+A gateway replaying recorded depth and market trades (see marketdata/recorder.py) to strategies, implementing
+GatewayInterface.
+
+Events of all recorded symbols are merged in timestamp order and replayed on a deterministic clock: the clock is
+the timestamp of the event being replayed, so a replay gives the same callbacks in the same order every time.
+With speed None events are replayed as fast as possible, otherwise at speed times the recorded pace. Events are
+replayed from start to end in milliseconds since epoch, all of the recordings by default, reading only the
+partitions and chunks of the range (see marketdata/store.py).
+
+Orders are simulated so that a strategy runs unchanged: orders are accepted at once, a post only order crossing
+the book is rejected, and a resting order is filled in full by a recorded trade through its price. Order events
+are delivered after the callbacks of the current market event return, before the next market event.
+
+    replay = ReplayGateway('/data/recordings', ['BTCUSDT'], exchange_name='Binance')
+    replay.register_depth_callback(strategy.on_depth)
+    replay.run()
+"""
+import heapq
+import logging
+import time
+from collections import deque
+from concurrent.futures import Future
+from threading import Thread
+from common.callback_utils import assert_param_counts
+from common.interface_book import OrderBook, VenueOrderBook
+from common.interface_order import Trade, Side, NewOrderSingle, OrderType, OrderEvent, ExecutionType, OrderStatus
+from gateways.gateway_interface import GatewayInterface
+from marketdata.chunks import ChunkKind
+from marketdata.store import MarketDataStore
+
+
+class ReplayClock:
+    """ Replay time in milliseconds since epoch, the timestamp of the event being replayed """
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self) -> float:
+        """ seconds since epoch, like time.time() """
+        return self.now / 1000
+
+
+class ReplayGateway(GatewayInterface):
+    def __init__(self, directory: str, symbols: [str], speed: float = None, name: str = 'Replay',
+                 start: float = None, end: float = None, exchange_name: str = 'Binance'):
+        """ exchange_name is the venue of the recordings, the name of the gateway they were recorded from """
+        self._exchange_name = name
+        self._symbols = list(symbols)
+        self._speed = speed
+        self._start = start
+        self._end = end
+        self.clock = ReplayClock()
+        self._store = MarketDataStore(directory, exchange_name)
+        for symbol in self._symbols:
+            if not self._store.hours(symbol, list(ChunkKind)):
+                logging.warning('No recording of {} {} in {}'.format(exchange_name, symbol, directory))
+
+        self._books = {}
+        self._depth_callbacks = []
+        self._trades_callbacks = []
+        self._execution_callbacks = []
+        self._thread = None
+        self._started = False
+        self.events_replayed = 0
+
+        # simulated orders: resting orders by order id, order events waiting to be delivered, positions by symbol
+        self._orders = {}
+        self._next_order_id = 0
+        self._order_events = deque()
+        self._positions = {}
+
+    """ ----------------------------------- """
+    """             Replay                  """
+    """ ----------------------------------- """
+
+    def connect(self):
+        """ replay on a background thread, like the live gateways """
+        self._thread = Thread(target=self.run, daemon=True, name=self._exchange_name)
+        self._thread.start()
+
+    def join(self):
+        if self._thread:
+            self._thread.join()
+
+    def run(self):
+        """ replay all events in the calling thread, return when done """
+        self._started = True
+        events = heapq.merge(*[self._events(symbol) for symbol in self._symbols], key=lambda e: e[0])
+        wall_start = None
+        first_time = None
+        for timestamp, symbol, item in events:
+            if self._speed is not None:
+                if wall_start is None:
+                    wall_start = time.monotonic()
+                    first_time = timestamp
+                delay = wall_start + (timestamp - first_time) / 1000 / self._speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+            self.clock.now = timestamp
+            if isinstance(item, OrderBook):
+                self._books[symbol] = item
+                venue_book = VenueOrderBook(self._exchange_name, item)
+                for callback in self._depth_callbacks:
+                    callback(self._exchange_name, venue_book)
+            else:
+                trade = item
+                self._match(trade)
+                for callback in self._trades_callbacks:
+                    callback([trade])
+            self.events_replayed += 1
+            self._deliver_order_events()
+
+        logging.info('Replay done: {} events'.format(self.events_replayed))
+        self._store.close()
+
+    def _events(self, symbol: str):
+        """ (timestamp, symbol, OrderBook or Trade) of the books and market trades of a symbol, in time order """
+        books = ((book.timestamp, symbol, book) for book in self._store.books(symbol, self._start, self._end))
+        trades = ((trade.received_time, symbol, trade) for trade in self._store.trades(symbol, self._start, self._end))
+        return heapq.merge(books, trades, key=lambda e: e[0])
+
+    """ ----------------------------------- """
+    """             Simulated orders        """
+    """ ----------------------------------- """
+
+    def place_orders(self, orders: [NewOrderSingle]) -> [bool]:
+        return [self._place_order(order) for order in orders]
+
+    def cancel_orders(self, symbol: str, order_ids: [str]) -> [bool]:
+        return [self._cancel_order(order_id) for order_id in order_ids]
+
+    def place_orders_async(self, orders: [NewOrderSingle]) -> Future:
+        """ same as place_orders, as a future already resolved """
+        return _resolved(self.place_orders(orders))
+
+    def cancel_orders_async(self, symbol: str, order_ids: [str]) -> Future:
+        return _resolved(self.cancel_orders(symbol, order_ids))
+
+    def _place_order(self, order: NewOrderSingle) -> bool:
+        book = self._books.get(order.symbol)
+        if order.type == OrderType.Limit and order.post_only and book is not None and self._crosses(order, book):
+            logging.info('Replay - post only order would cross: {}'.format(order))
+            return False
+        self._next_order_id += 1
+        order_id = 'replay-{}'.format(self._next_order_id)
+        self._orders[order_id] = order
+        self._queue_order_event(order_id, order, ExecutionType.NEW, OrderStatus.NEW)
+        if order.type == OrderType.Market and book is not None:
+            levels = book.asks if order.side == Side.BUY else book.bids
+            if levels:
+                self._fill(order_id, levels[0].price)
+        return True
+
+    def _cancel_order(self, order_id: str) -> bool:
+        order = self._orders.pop(order_id, None)
+        if order is None:
+            return False
+        self._queue_order_event(order_id, order, ExecutionType.CANCELED, OrderStatus.CANCELED)
+        return True
+
+    @staticmethod
+    def _crosses(order: NewOrderSingle, book: OrderBook) -> bool:
+        if order.side == Side.BUY:
+            return bool(book.asks) and order.price >= book.get_best_ask()
+        return bool(book.bids) and order.price <= book.get_best_bid()
+
+    def _match(self, trade: Trade):
+        """ fill resting orders of the symbol which the trade went through """
+        for order_id, order in list(self._orders.items()):
+            if order.symbol != trade.contract_name or order.type != OrderType.Limit:
+                continue
+            if (order.side == Side.BUY and trade.side == Side.SELL and trade.price <= order.price) or \
+                    (order.side == Side.SELL and trade.side == Side.BUY and trade.price >= order.price):
+                self._fill(order_id, order.price)
+
+    def _fill(self, order_id: str, price: float):
+        order = self._orders.pop(order_id)
+        sign = 1 if order.side == Side.BUY else -1
+        self._positions[order.symbol] = self._positions.get(order.symbol, 0) + sign * order.quantity
+        order_event = self._queue_order_event(order_id, order, ExecutionType.TRADE, OrderStatus.FILLED)
+        order_event.last_filled_time = self.clock.now
+        order_event.last_filled_price = price
+        order_event.last_filled_quantity = order.quantity
+
+    def _queue_order_event(self, order_id: str, order: NewOrderSingle, execution_type: ExecutionType,
+                           status: OrderStatus) -> OrderEvent:
+        order_event = OrderEvent(order.symbol, order_id, execution_type, status)
+        order_event.side = order.side
+        self._order_events.append(order_event)
+        return order_event
+
+    def _deliver_order_events(self):
+        # callbacks may send orders, whose events are delivered in the same loop
+        while self._order_events:
+            order_event = self._order_events.popleft()
+            for callback in self._execution_callbacks:
+                callback(self._exchange_name, order_event)
+
+    #############################################
+    ##               Interface                 ##
+    #############################################
+
+    def get_name(self):
+        return self._exchange_name
+
+    def not_ready(self) -> bool:
+        return not self._started
+
+    def get_position(self, symbol: str) -> float:
+        return self._positions.get(symbol, 0)
+
+    def get_order_book(self, symbol: str) -> OrderBook:
+        return self._books.get(symbol)
+
+    def register_depth_callback(self, callback, conflate=False):
+        """ a depth callback function takes two argument: (exchange_name:str, book: VenueOrderBook);
+            callbacks are run synchronously by the replay, so there is nothing to conflate """
+        assert_param_counts(callback, 2)
+        self._depth_callbacks.append(callback)
+
+    def register_execution_callback(self, callback):
+        """ an execution callback function takes two argument: (exchange_name:str, event: OrderEvent) """
+        assert_param_counts(callback, 2)
+        self._execution_callbacks.append(callback)
+
+    def register_position_callback(self, callback):
+        pass
+
+    def register_market_trades_callback(self, callback):
+        """ a market trades callback function takes one argument: [Trade] """
+        assert_param_counts(callback, 1)
+        self._trades_callbacks.append(callback)
+
+
+def _resolved(result) -> Future:
+    future = Future()
+    future.set_result(result)
+    return future
@@ -0,0 +1,252 @@
+"""
+Binary chunk format of recorded market data.
+
+A recording file is a sequence of chunks appended one after another, each holding the rows of one kind stored by
+column, so that a column is read without decoding the others and without copying it out of a memory map:
+
+    header      32 bytes: magic b'QFMD', format version, kind, levels, rows, first timestamp, last timestamp,
+                entries
+    DEPTH       timestamps d[rows], update_ids q[rows],
+                bid_prices d[rows * levels], bid_sizes d[rows * levels],
+                ask_prices d[rows * levels], ask_sizes d[rows * levels]
+    TRADES      timestamps d[rows], prices d[rows], sizes d[rows], sides b[rows]
+    BOOK_DELTA  timestamps d[rows], update_ids q[rows], offsets q[rows + 1],
+                prices d[entries], sizes d[entries], sides b[entries]
+
+Timestamps are milliseconds since epoch. Update ids are those of the exchange's last update applied to the book
+(Binance's lastUpdateId / u), -1 if not known. Level i of row r is at index r * levels + i, best first; missing levels
+have a NaN price and a zero size. Trade sides are 1 for buy and -1 for sell. Columns are in the machine's native
+byte order, little-endian on x86 and ARM.
+
+BOOK_DELTA chunks store only the levels which changed since the previous row, as entries offsets[r] to
+offsets[r + 1] of row r, with side 1 for bid and -1 for ask and a zero size for a level removed. The first row of
+every chunk is a keyframe holding all levels, so the book at any time is rebuilt from the start of the chunk
+containing it, without reading earlier chunks.
+
+Each recording file has an index file, path + INDEX_SUFFIX, with one 40 byte entry per chunk: the offset of the
+chunk in the recording as uint64 followed by a copy of its header. The index of a file covering hours of data is a
+few kilobytes, so the chunks of a time range are found without touching the recording itself.
+"""
+import struct
+from array import array
+from enum import Enum
+from common.interface_book import OrderBook
+from common.interface_order import Trade, Side
+
+MAGIC = b'QFMD'
+FORMAT_VERSION = 1
+CHUNK_HEADER = struct.Struct('<4sBBHIddI')
+INDEX_OFFSET = struct.Struct('<Q')
+INDEX_SUFFIX = '.idx'
+
+NAN = float('nan')
+
+
+class ChunkKind(Enum):
+    DEPTH = 1
+    TRADES = 2
+    BOOK_DELTA = 3
+
+
+# names, typecodes and lengths of the columns of a chunk, in file order
+def column_layout(kind: ChunkKind, levels: int, rows: int, entries: int = 0) -> [(str, str, int)]:
+    if kind == ChunkKind.BOOK_DELTA:
+        return [('timestamps', 'd', rows), ('update_ids', 'q', rows), ('offsets', 'q', rows + 1),
+                ('prices', 'd', entries), ('sizes', 'd', entries), ('sides', 'b', entries)]
+    if kind == ChunkKind.DEPTH:
+        return [('timestamps', 'd', rows), ('update_ids', 'q', rows),
+                ('bid_prices', 'd', rows * levels), ('bid_sizes', 'd', rows * levels),
+                ('ask_prices', 'd', rows * levels), ('ask_sizes', 'd', rows * levels)]
+    return [('timestamps', 'd', rows), ('prices', 'd', rows), ('sizes', 'd', rows), ('sides', 'b', rows)]
+
+
+class ChunkHeader:
+    __slots__ = ('kind', 'levels', 'rows', 'first_time', 'last_time', 'entries', 'offset')
+
+    def __init__(self, kind: ChunkKind, levels: int, rows: int, first_time: float, last_time: float,
+                 entries: int = 0, offset: int = 0):
+        self.kind = kind
+        self.levels = levels
+        self.rows = rows
+        self.first_time = first_time
+        self.last_time = last_time
+        # number of level entries of a BOOK_DELTA chunk
+        self.entries = entries
+        # position of the header in the file
+        self.offset = offset
+
+    def pack(self) -> bytes:
+        return CHUNK_HEADER.pack(MAGIC, FORMAT_VERSION, self.kind.value, self.levels, self.rows, self.first_time,
+                                 self.last_time, self.entries)
+
+    def body_size(self) -> int:
+        return sum(array(typecode).itemsize * length
+                   for _, typecode, length in column_layout(self.kind, self.levels, self.rows, self.entries))
+
+    def end(self) -> int:
+        """ position of the next chunk in the file """
+        return self.offset + CHUNK_HEADER.size + self.body_size()
+
+    def __str__(self):
+        return 'Chunk({}, levels={}, rows={}, time={}-{}, offset={})'.format(
+            self.kind.name, self.levels, self.rows, self.first_time, self.last_time, self.offset)
+
+
+def read_header(buffer, offset: int) -> ChunkHeader:
+    magic, version, kind, levels, rows, first_time, last_time, entries = CHUNK_HEADER.unpack_from(buffer, offset)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError('Not a market data chunk at offset {}'.format(offset))
+    return ChunkHeader(ChunkKind(kind), levels, rows, first_time, last_time, entries, offset)
+
+
+def iter_chunks(buffer, offset: int = 0):
+    """ headers of the chunks of a buffer (bytes, memoryview or mmap) from offset; an incomplete chunk at the end,
+        being written or cut short, is ignored """
+    size = len(buffer)
+    while offset + CHUNK_HEADER.size <= size:
+        header = read_header(buffer, offset)
+        if header.end() > size:
+            return
+        yield header
+        offset = header.end()
+
+
+def index_entry(header: ChunkHeader) -> bytes:
+    return INDEX_OFFSET.pack(header.offset) + header.pack()
+
+
+def read_index(buffer) -> [ChunkHeader]:
+    """ headers of the chunks listed in an index, an incomplete entry at the end is ignored """
+    entry_size = INDEX_OFFSET.size + CHUNK_HEADER.size
+    headers = []
+    for position in range(0, len(buffer) - entry_size + 1, entry_size):
+        header = read_header(buffer, position + INDEX_OFFSET.size)
+        header.offset = INDEX_OFFSET.unpack_from(buffer, position)[0]
+        headers.append(header)
+    return headers
+
+
+def read_columns(buffer, header: ChunkHeader) -> dict:
+    """ the columns of a chunk by name, as memoryviews of the buffer cast to their type, without copying """
+    view = memoryview(buffer)
+    columns = {}
+    position = header.offset + CHUNK_HEADER.size
+    for name, typecode, length in column_layout(header.kind, header.levels, header.rows, header.entries):
+        size = array(typecode).itemsize * length
+        columns[name] = view[position:position + size].cast(typecode)
+        position += size
+    return columns
+
+
+def _update_id(book: OrderBook) -> int:
+    return -1 if book.update_id is None else book.update_id
+
+
+# Depth rows buffered by column, before being written as a chunk
+class DepthColumns:
+    def __init__(self, levels: int):
+        self.levels = levels
+        self.timestamps = array('d')
+        self.update_ids = array('q')
+        self.bid_prices = array('d')
+        self.bid_sizes = array('d')
+        self.ask_prices = array('d')
+        self.ask_sizes = array('d')
+
+    def append(self, book: OrderBook):
+        self.timestamps.append(book.timestamp)
+        self.update_ids.append(_update_id(book))
+        self._append_levels(book.bids, self.bid_prices, self.bid_sizes)
+        self._append_levels(book.asks, self.ask_prices, self.ask_sizes)
+
+    def _append_levels(self, levels, prices: array, sizes: array):
+        count = min(len(levels), self.levels)
+        for i in range(count):
+            level = levels[i]
+            prices.append(level.price)
+            sizes.append(level.size)
+        for _ in range(count, self.levels):
+            prices.append(NAN)
+            sizes.append(0.0)
+
+    def to_bytes(self) -> bytes:
+        header = ChunkHeader(ChunkKind.DEPTH, self.levels, len(self), self.timestamps[0], self.timestamps[-1])
+        return header.pack() + b''.join(column.tobytes() for column in
+                                        [self.timestamps, self.update_ids, self.bid_prices, self.bid_sizes,
+                                         self.ask_prices, self.ask_sizes])
+
+    def __len__(self):
+        return len(self.timestamps)
+
+
+# Trade rows buffered by column, before being written as a chunk
+class TradeColumns:
+    def __init__(self):
+        self.timestamps = array('d')
+        self.prices = array('d')
+        self.sizes = array('d')
+        self.sides = array('b')
+
+    def append(self, trade: Trade):
+        self.timestamps.append(trade.received_time)
+        self.prices.append(trade.price)
+        self.sizes.append(trade.size)
+        self.sides.append(1 if trade.side == Side.BUY else -1)
+
+    def to_bytes(self) -> bytes:
+        header = ChunkHeader(ChunkKind.TRADES, 0, len(self), self.timestamps[0], self.timestamps[-1])
+        return header.pack() + b''.join(column.tobytes() for column in
+                                        [self.timestamps, self.prices, self.sizes, self.sides])
+
+    def __len__(self):
+        return len(self.timestamps)
+
+
+# Book updates buffered as the levels changed since the previous update; the first row is a keyframe with all levels
+class DeltaColumns:
+    def __init__(self, levels: int):
+        self.levels = levels
+        self.timestamps = array('d')
+        self.update_ids = array('q')
+        self.offsets = array('q', [0])
+        self.prices = array('d')
+        self.sizes = array('d')
+        self.sides = array('b')
+        # levels of the previous row as {price: size}
+        self._bids = None
+        self._asks = None
+
+    def append(self, book: OrderBook):
+        bids = {level.price: level.size for level in book.bids[:self.levels]}
+        asks = {level.price: level.size for level in book.asks[:self.levels]}
+        self._append_changes(1, self._bids, bids)
+        self._append_changes(-1, self._asks, asks)
+        self._bids = bids
+        self._asks = asks
+        self.timestamps.append(book.timestamp)
+        self.update_ids.append(_update_id(book))
+        self.offsets.append(len(self.prices))
+
+    def _append_changes(self, side: int, old: dict, new: dict):
+        if old is not None:
+            for price in old:
+                if price not in new:
+                    self._append_entry(side, price, 0.0)
+        for price, size in new.items():
+            if old is None or old.get(price) != size:
+                self._append_entry(side, price, size)
+
+    def _append_entry(self, side: int, price: float, size: float):
+        self.prices.append(price)
+        self.sizes.append(size)
+        self.sides.append(side)
+
+    def to_bytes(self) -> bytes:
+        header = ChunkHeader(ChunkKind.BOOK_DELTA, self.levels, len(self), self.timestamps[0], self.timestamps[-1],
+                             entries=len(self.prices))
+        return header.pack() + b''.join(column.tobytes() for column in
+                                        [self.timestamps, self.update_ids, self.offsets, self.prices, self.sizes,
+                                         self.sides])
+
+    def __len__(self):
+        return len(self.timestamps)
@@ -0,0 +1,200 @@
+"""
+Read recording files written by MarketDataRecorder through a memory map. Only the chunk headers are read when a
+file is opened, from its index file (see chunks.py); the rows are decoded one at a time from the mapped columns as
+they are iterated, so a file is never copied into Python objects up front and chunks not iterated are never read.
+
+    reader = RecordingReader('/data/recordings/BTCUSDT/20240301-09.depth.qfmd')
+    for timestamp, columns, row in reader.rows():
+        book = depth_row_book('BTCUSDT', columns, reader.levels, row)
+
+Books are read by DepthBookReader from a depth recording and by DeltaBookReader from a book delta recording, which
+seeks to the keyframe at the start of the chunk containing a time and applies the changes from there. Both give
+the book as of a time, and the books of chunks.
+
+    reader = DeltaBookReader('/data/recordings/BTCUSDT/20240301-09.book_delta.qfmd', 'BTCUSDT')
+    book = reader.book_at(timestamp)
+
+To query a directory of recordings by time range, see store.py.
+"""
+import logging
+import math
+import mmap
+import os
+from bisect import bisect_left, bisect_right
+from itertools import count
+from common.interface_book import OrderBook, PriceLevel
+from common.interface_order import Trade, Side
+from marketdata.chunks import INDEX_SUFFIX, iter_chunks, read_columns, read_index
+
+
+class RecordingReader:
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        # an empty file cannot be mapped
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) \
+            if os.path.getsize(path) > 0 else b''
+        self.headers = self._read_headers()
+        self.kind = self.headers[0].kind if self.headers else None
+        self.levels = self.headers[0].levels if self.headers else 0
+        # chunk times, in order as chunks are appended in time order
+        self.first_times = [header.first_time for header in self.headers]
+        self.last_times = [header.last_time for header in self.headers]
+
+    def _read_headers(self) -> list:
+        """ headers listed in the index file, then those of any chunks appended after the last one indexed; all
+            headers of the file if there is no index """
+        headers = []
+        index_path = self.path + INDEX_SUFFIX
+        if os.path.exists(index_path):
+            with open(index_path, 'rb') as index_file:
+                headers = [header for header in read_index(index_file.read()) if header.end() <= len(self._mmap)]
+        offset = headers[-1].end() if headers else 0
+        return headers + list(iter_chunks(self._mmap, offset))
+
+    def first_time(self) -> float:
+        return self.headers[0].first_time if self.headers else None
+
+    def last_time(self) -> float:
+        return self.headers[-1].last_time if self.headers else None
+
+    def row_count(self) -> int:
+        return sum(header.rows for header in self.headers)
+
+    def headers_between(self, start: float, end: float) -> list:
+        """ headers of the chunks with rows from start (included) to end (excluded) """
+        return self.headers[bisect_left(self.last_times, start):bisect_left(self.first_times, end)]
+
+    def columns(self, header) -> dict:
+        return read_columns(self._mmap, header)
+
+    def rows(self, headers=None):
+        """ (timestamp, columns, row) of every row of the given chunks, all chunks by default """
+        for header in self.headers if headers is None else headers:
+            columns = self.columns(header)
+            timestamps = columns['timestamps']
+            for row in range(header.rows):
+                yield timestamps[row], columns, row
+
+    def close(self):
+        if isinstance(self._mmap, mmap.mmap):
+            try:
+                self._mmap.close()
+            except BufferError:
+                # columns still referenced, the map is released when they are
+                logging.debug('{} still in use, not unmapped'.format(self.path))
+        self._file.close()
+
+
+# the book of a depth row, missing levels excluded
+def depth_row_book(symbol: str, columns: dict, levels: int, row: int, version: int = 0) -> OrderBook:
+    start = row * levels
+    return OrderBook(timestamp=columns['timestamps'][row], contract_name=symbol,
+                     bids=_levels(columns['bid_prices'], columns['bid_sizes'], start, levels),
+                     asks=_levels(columns['ask_prices'], columns['ask_sizes'], start, levels),
+                     version=version, update_id=_update_id(columns['update_ids'][row]))
+
+
+def _levels(prices, sizes, start: int, levels: int) -> [PriceLevel]:
+    result = []
+    for i in range(start, start + levels):
+        price = prices[i]
+        if math.isnan(price):
+            break
+        result.append(PriceLevel(price=price, size=sizes[i]))
+    return result
+
+
+def trade_row(symbol: str, columns: dict, row: int) -> Trade:
+    return Trade(received_time=columns['timestamps'][row], contract_name=symbol, price=columns['prices'][row],
+                 size=columns['sizes'][row], side=Side.BUY if columns['sides'][row] > 0 else Side.SELL,
+                 liquidation=False)
+
+
+class DepthBookReader(RecordingReader):
+    """ Books of a DEPTH recording, see chunks.py """
+    def __init__(self, path: str, symbol: str):
+        super().__init__(path)
+        self.symbol = symbol
+
+    def book_at(self, timestamp: float) -> OrderBook:
+        """ the book as of the given time, None if before the recording """
+        index = bisect_right(self.first_times, timestamp) - 1
+        if index < 0:
+            return None
+        columns = self.columns(self.headers[index])
+        row = bisect_right(columns['timestamps'], timestamp) - 1
+        return depth_row_book(self.symbol, columns, self.levels, row)
+
+    def books(self, headers=None, versions=None):
+        """ (timestamp, book) of every row of the given chunks, all chunks by default; books are versioned by
+            the versions iterator, counting from 1 by default """
+        versions = count(1) if versions is None else versions
+        for timestamp, columns, row in self.rows(headers):
+            yield timestamp, depth_row_book(self.symbol, columns, self.levels, row, next(versions))
+
+
+class DeltaBookReader(RecordingReader):
+    """ Rebuilds books of a BOOK_DELTA recording, see chunks.py """
+    def __init__(self, path: str, symbol: str):
+        super().__init__(path)
+        self.symbol = symbol
+
+    def book_at(self, timestamp: float) -> OrderBook:
+        """ the book as of the given time, None if before the recording """
+        index = bisect_right(self.first_times, timestamp) - 1
+        if index < 0:
+            return None
+        header = self.headers[index]
+        columns = self.columns(header)
+        timestamps = columns['timestamps']
+        bids = {}
+        asks = {}
+        row = 0
+        # the first row of the chunk is the keyframe
+        while row < header.rows and timestamps[row] <= timestamp:
+            _apply_delta(columns, row, bids, asks)
+            row += 1
+        return _state_book(self.symbol, timestamps[row - 1], columns['update_ids'][row - 1], bids, asks, self.levels)
+
+    def books(self, headers=None, versions=None):
+        """ (timestamp, book) of every row of the given chunks, all chunks by default; books are versioned by
+            the versions iterator, counting from 1 by default """
+        versions = count(1) if versions is None else versions
+        for header in self.headers if headers is None else headers:
+            columns = self.columns(header)
+            timestamps = columns['timestamps']
+            update_ids = columns['update_ids']
+            bids = {}
+            asks = {}
+            for row in range(header.rows):
+                _apply_delta(columns, row, bids, asks)
+                yield timestamps[row], _state_book(self.symbol, timestamps[row], update_ids[row], bids, asks,
+                                                   self.levels, next(versions))
+
+
+# apply the changed levels of a BOOK_DELTA row to {price: size} bids and asks
+def _apply_delta(columns: dict, row: int, bids: dict, asks: dict):
+    offsets = columns['offsets']
+    prices = columns['prices']
+    sizes = columns['sizes']
+    sides = columns['sides']
+    for i in range(offsets[row], offsets[row + 1]):
+        levels = bids if sides[i] > 0 else asks
+        if sizes[i] == 0:
+            levels.pop(prices[i], None)
+        else:
+            levels[prices[i]] = sizes[i]
+
+
+def _state_book(symbol: str, timestamp: float, update_id: int, bids: dict, asks: dict, levels: int,
+                version: int = 0) -> OrderBook:
+    return OrderBook(timestamp=timestamp, contract_name=symbol,
+                     bids=[PriceLevel(price=p, size=bids[p]) for p in sorted(bids, reverse=True)[:levels]],
+                     asks=[PriceLevel(price=p, size=asks[p]) for p in sorted(asks)[:levels]],
+                     version=version, update_id=_update_id(update_id))
+
+
+# a recorded update id, -1 when it was not known; not used as the book version since it repeats when unknown
+def _update_id(update_id: int) -> int:
+    return None if update_id < 0 else update_id
@@ -0,0 +1,210 @@
+"""
+Record streaming depth and market trades of gateways into append-only columnar chunk files, see chunks.py.
+
+The gateway callbacks only append the rows to in-memory column buffers. A full buffer is sealed and queued to a
+background writer thread, which encodes and appends the queued chunks and flushes the files once per batch, so
+that the gateway loop never waits on the disk. Buffers not yet full are also sealed every flush_interval seconds,
+so data of a quiet market still reaches the disk.
+
+Recordings are partitioned by venue (the exchange name of the gateway), symbol and hour (UTC) of the row timestamps,
+in files named <directory>/<exchange>/<symbol>/<yyyymmdd-hh>.depth.qfmd and
+<directory>/<exchange>/<symbol>/<yyyymmdd-hh>.trades.qfmd, each with an index of its chunks written after them, see chunks.py. With depth_format=ChunkKind.BOOK_DELTA, books are stored as
+the levels changed between updates with a keyframe of all levels at the start of every chunk, in
+<yyyymmdd-hh>.book_delta.qfmd files: fewer chunk_rows make the files larger but a book at a given time faster to
+rebuild, see benchmarks/bench_book_storage.py. To query recordings by time range, see store.py.
+
+    recorder = MarketDataRecorder('/data/recordings', levels=5)
+    recorder.register(gateway)
+    recorder.start()
+    ...
+    recorder.close()
+"""
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from queue import SimpleQueue, Empty
+from threading import Lock, Thread
+from common.interface_book import VenueOrderBook
+from common.interface_order import Trade
+from marketdata.chunks import ChunkKind, DepthColumns, TradeColumns, DeltaColumns, INDEX_SUFFIX, index_entry, \
+    read_header
+
+FILE_SUFFIX = '.qfmd'
+PARTITION_MS = 3600 * 1000
+PARTITION_FORMAT = '%Y%m%d-%H'
+
+
+def partition_of(timestamp: float) -> int:
+    """ the partition of a timestamp in milliseconds, as hours since epoch """
+    return int(timestamp // PARTITION_MS)
+
+
+def partition_name(hour: int) -> str:
+    return datetime.fromtimestamp(hour * 3600, tz=timezone.utc).strftime(PARTITION_FORMAT)
+
+
+def partition_hour(name: str) -> int:
+    """ the partition named by partition_name, as hours since epoch """
+    return int(datetime.strptime(name, PARTITION_FORMAT).replace(tzinfo=timezone.utc).timestamp()) // 3600
+
+
+def recording_path(directory: str, exchange_name: str, symbol: str, kind: ChunkKind, hour: int) -> str:
+    return os.path.join(directory, exchange_name, symbol,
+                        '{}.{}{}'.format(partition_name(hour), kind.name.lower(), FILE_SUFFIX))
+
+
+class MarketDataRecorder:
+    def __init__(self, directory: str, levels: int = 5, chunk_rows: int = 1000, flush_interval: float = 1.0,
+                 depth_format: ChunkKind = ChunkKind.DEPTH):
+        """ levels per side of each recorded book, rows per chunk when the market is busy, and the longest time
+            in seconds before rows are written when it is not """
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._levels = levels
+        self._chunk_rows = chunk_rows
+        self._flush_interval = flush_interval
+        self._depth_format = depth_format
+        self._depth_columns = DeltaColumns if depth_format == ChunkKind.BOOK_DELTA else DepthColumns
+
+        # column buffers being filled by the callbacks, by (exchange, symbol, kind, hour)
+        self._buffers = {}
+        self._lock = Lock()
+
+        # sealed buffers waiting to be written as ((exchange, symbol, kind, hour), columns), None to stop the writer
+        self._queue = SimpleQueue()
+        # open (recording, index) files by (exchange, symbol, kind, hour)
+        self._files = {}
+        self._thread = Thread(target=self._write_forever, daemon=True, name='recorder')
+
+        self.rows = 0
+        self.chunks_written = 0
+        self.bytes_written = 0
+
+    def register(self, gateway):
+        """ subscribe to depth and market trades of a gateway implementing GatewayInterface; market trades do not
+            tell their venue, so they are recorded under the name of the gateway """
+        exchange_name = gateway.get_name()
+        gateway.register_depth_callback(self.on_depth)
+        gateway.register_market_trades_callback(lambda trades: self.on_trades(exchange_name, trades))
+
+    def start(self):
+        self._thread.start()
+
+    def close(self):
+        """ write all buffered rows and close the files """
+        with self._lock:
+            self._seal_all()
+        self._queue.put(None)
+        self._thread.join()
+
+    def on_depth(self, exchange_name: str, venue_book: VenueOrderBook):
+        book = venue_book.get_book()
+        key = (exchange_name, book.contract_name, self._depth_format, partition_of(book.timestamp))
+        with self._lock:
+            columns = self._buffers.get(key)
+            if columns is None:
+                columns = self._buffers[key] = self._depth_columns(self._levels)
+            columns.append(book)
+            self.rows += 1
+            if len(columns) >= self._chunk_rows:
+                self._seal(key)
+
+    def on_trades(self, exchange_name: str, trades: [Trade]):
+        with self._lock:
+            for trade in trades:
+                key = (exchange_name, trade.contract_name, ChunkKind.TRADES, partition_of(trade.received_time))
+                columns = self._buffers.get(key)
+                if columns is None:
+                    columns = self._buffers[key] = TradeColumns()
+                columns.append(trade)
+                self.rows += 1
+                if len(columns) >= self._chunk_rows:
+                    self._seal(key)
+
+    def write(self, exchange_name: str, symbol: str, kind: ChunkKind, hour: int, columns):
+        """ queue rows buffered elsewhere (e.g. by a TradeTape) to be written as a chunk of the given hour partition;
+            columns is a DepthColumns, DeltaColumns or TradeColumns, not to be changed afterwards """
+        with self._lock:
+            self.rows += len(columns)
+        self._queue.put(((exchange_name, symbol, kind, hour), columns))
+
+    def _seal(self, key: tuple):
+        """ hand a buffer to the writer, called with the lock held """
+        self._queue.put((key, self._buffers.pop(key)))
+
+    def _seal_all(self):
+        for key in list(self._buffers):
+            self._seal(key)
+
+    def _write_forever(self):
+        last_seal = time.monotonic()
+        running = True
+        while running:
+            try:
+                items = [self._queue.get(timeout=self._flush_interval)]
+            except Empty:
+                items = []
+
+            if time.monotonic() - last_seal >= self._flush_interval:
+                with self._lock:
+                    self._seal_all()
+                last_seal = time.monotonic()
+
+            # write everything queued, then flush each file once; index entries are written after the chunks they
+            # point to are flushed, so that an index never points past the end of its recording
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except Empty:
+                    break
+            entries = {}
+            for item in items:
+                if item is None:
+                    running = False
+                    continue
+                key, columns = item
+                file = self._get_files(key)[0]
+                data = columns.to_bytes()
+                header = read_header(data, 0)
+                header.offset = file.tell()
+                file.write(data)
+                entries.setdefault(key, []).append(index_entry(header))
+                self.chunks_written += 1
+                self.bytes_written += len(data)
+            for key in entries:
+                self._files[key][0].flush()
+            for key, key_entries in entries.items():
+                index_file = self._files[key][1]
+                index_file.write(b''.join(key_entries))
+                index_file.flush()
+            self._close_earlier_hours()
+
+        for key in list(self._files):
+            self._close_files(key)
+        logging.info('Recorder closed: {} rows, {} chunks, {} bytes'.format(
+            self.rows, self.chunks_written, self.bytes_written))
+
+    def _get_files(self, key: tuple):
+        files = self._files.get(key)
+        if files is None:
+            exchange_name, symbol, kind, hour = key
+            path = recording_path(self._directory, exchange_name, symbol, kind, hour)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            logging.info('Recording {} {} {} to {}'.format(exchange_name, symbol, kind.name.lower(), path))
+            files = self._files[key] = (open(path, 'ab'), open(path + INDEX_SUFFIX, 'ab'))
+        return files
+
+    def _close_earlier_hours(self):
+        """ close the files of a venue, symbol and kind but those of its latest hour, a late chunk opens them again """
+        latest = {}
+        for key in self._files:
+            series, hour = key[:3], key[3]
+            latest[series] = max(hour, latest.get(series, hour))
+        for key in list(self._files):
+            if key[3] < latest[key[:3]]:
+                self._close_files(key)
+
+    def _close_files(self, key: tuple):
+        for file in self._files.pop(key):
+            file.close()
@@ -0,0 +1,120 @@
+"""
+Query the recordings of one venue in a directory written by MarketDataRecorder, by symbol and time range.
+
+Recordings are partitioned by venue, symbol and hour, and each partition has an index of the times of its chunks (see
+recorder.py and chunks.py). A query only opens the partitions of the hours it covers, finds the chunks overlapping
+the range by binary search of their index, and reads only those chunks out of the memory map, so pulling a few
+minutes out of weeks of data reads a few chunks rather than scanning files from the start.
+
+    store = MarketDataStore('/data/recordings', 'Binance')
+    for book in store.books('BTCUSDT', t0, t1):
+        ...
+    store.close()
+
+Times are milliseconds since epoch; a range includes start and excludes end, None for no bound. Books of an hour
+are read from its depth partition, or else from its book delta partition.
+"""
+import math
+import os
+import re
+from bisect import bisect_left
+from itertools import count
+from common.interface_book import OrderBook
+from marketdata.chunks import ChunkKind
+from marketdata.reader import RecordingReader, DepthBookReader, DeltaBookReader, trade_row
+from marketdata.recorder import FILE_SUFFIX, PARTITION_MS, partition_of, partition_hour, recording_path
+
+PARTITION_FILE = re.compile(r'^(\d{8}-\d{2})\.([a-z_]+)' + re.escape(FILE_SUFFIX) + '$')
+BOOK_KINDS = [ChunkKind.DEPTH, ChunkKind.BOOK_DELTA]
+
+
+class MarketDataStore:
+    def __init__(self, directory: str, exchange_name: str):
+        """ the recordings of the venue exchange_name, the name of the gateway they were recorded from """
+        self._directory = directory
+        self._exchange_name = exchange_name
+        # open readers by path, kept for later queries until closed
+        self._readers = {}
+
+    def symbols(self) -> [str]:
+        directory = os.path.join(self._directory, self._exchange_name)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name for name in os.listdir(directory) if os.path.isdir(os.path.join(directory, name)))
+
+    def hours(self, symbol: str, kinds: [ChunkKind]) -> [int]:
+        """ hours since epoch of the partitions of a symbol recorded for any of the kinds, in order """
+        directory = os.path.join(self._directory, self._exchange_name, symbol)
+        if not os.path.isdir(directory):
+            return []
+        names = {kind.name.lower() for kind in kinds}
+        hours = set()
+        for file_name in os.listdir(directory):
+            match = PARTITION_FILE.match(file_name)
+            if match and match.group(2) in names:
+                hours.add(partition_hour(match.group(1)))
+        return sorted(hours)
+
+    def books(self, symbol: str, start: float = None, end: float = None):
+        """ books of a symbol from start to end, in time order, versioned from 1 across the query """
+        start, end = _bounds(start, end)
+        versions = count(1)
+        for hour in self._hours_between(symbol, BOOK_KINDS, start, end):
+            reader = self._book_reader(symbol, hour)
+            # a book delta chunk is rebuilt from its keyframe, rows before start are skipped
+            for timestamp, book in reader.books(reader.headers_between(start, end), versions):
+                if timestamp >= end:
+                    return
+                if timestamp >= start:
+                    yield book
+
+    def trades(self, symbol: str, start: float = None, end: float = None):
+        """ market trades of a symbol from start to end, in time order """
+        start, end = _bounds(start, end)
+        for hour in self._hours_between(symbol, [ChunkKind.TRADES], start, end):
+            path = recording_path(self._directory, self._exchange_name, symbol, ChunkKind.TRADES, hour)
+            reader = self._reader(path, RecordingReader)
+            for header in reader.headers_between(start, end):
+                columns = reader.columns(header)
+                timestamps = columns['timestamps']
+                for row in range(bisect_left(timestamps, start), bisect_left(timestamps, end)):
+                    yield trade_row(symbol, columns, row)
+
+    def book_at(self, symbol: str, timestamp: float) -> OrderBook:
+        """ the book of a symbol as of a time, None if there is none recorded before """
+        hour = partition_of(timestamp)
+        reader = self._book_reader(symbol, hour)
+        book = reader.book_at(timestamp) if reader is not None else None
+        if book is None:
+            # the last book of the latest hour recorded before
+            earlier = [h for h in self.hours(symbol, BOOK_KINDS) if h < hour]
+            book = self._book_reader(symbol, earlier[-1]).book_at(timestamp) if earlier else None
+        return book
+
+    def close(self):
+        for reader in self._readers.values():
+            reader.close()
+        self._readers.clear()
+
+    def _hours_between(self, symbol: str, kinds: [ChunkKind], start: float, end: float) -> [int]:
+        return [hour for hour in self.hours(symbol, kinds)
+                if (hour + 1) * PARTITION_MS > start and hour * PARTITION_MS < end]
+
+    def _book_reader(self, symbol: str, hour: int):
+        """ reader of the depth partition of an hour, or else of its book delta partition, None if neither """
+        for kind, reader_class in [(ChunkKind.DEPTH, DepthBookReader), (ChunkKind.BOOK_DELTA, DeltaBookReader)]:
+            path = recording_path(self._directory, self._exchange_name, symbol, kind, hour)
+            if path in self._readers or os.path.exists(path):
+                return self._reader(path, lambda p: reader_class(p, symbol))
+        return None
+
+    def _reader(self, path: str, factory) -> RecordingReader:
+        reader = self._readers.get(path)
+        if reader is None:
+            reader = self._readers[path] = factory(path)
+        return reader
+
+
+def _bounds(start: float, end: float) -> (float, float):
+    return -math.inf if start is None else start, math.inf if end is None else end
+
@@ -0,0 +1,175 @@
+"""
+A tape of the recent market trades of a symbol, kept in a fixed-size ring of preallocated columns: times, prices,
+sizes and sides (1 for buy, -1 for sell). Appending a trade writes four array slots, nothing is allocated.
+
+Trades are addressed by their sequence number since the tape started, a trade still on the tape being one of the
+last capacity trades. Readers take the sequence number of the first trade they want, by count or by time, then
+aggregate or copy the trades from there without creating objects per trade:
+
+    tape = TradeTape('BTCUSDT', capacity=65536)
+    gateway.register_trade_tape(tape)     # or gateway.register_market_trades_callback(tape.on_trades)
+    ...
+    vwap = tape.vwap(tape.start_since(now - 5000))
+    count = tape.copy(tape.start_of_last(100), times, prices, sizes, sides)
+
+With a recorder, the tape is recorded under exchange_name, the venue of its trades; every segment_rows trades (or flush_interval seconds of trade time) the trades not yet written
+are handed to the recorder as TRADES chunks, a copy of the segment per column; the recorder encodes and writes them
+on its own thread. The tape is not thread safe: read it on the thread appending to it, e.g. inline callbacks.
+"""
+from array import array
+from itertools import compress
+from operator import mul
+from common.interface_order import Trade, Side
+from marketdata.chunks import ChunkKind, TradeColumns
+from marketdata.recorder import MarketDataRecorder, PARTITION_MS, partition_of
+
+_BUY = 1
+
+
+class TradeTape:
+    def __init__(self, symbol: str, capacity: int = 65536, segment_rows: int = 4096, flush_interval: float = 1.0,
+                 recorder: MarketDataRecorder = None, exchange_name: str = None):
+        if segment_rows > capacity:
+            raise ValueError('segment_rows {} larger than capacity {}'.format(segment_rows, capacity))
+        if recorder is not None and exchange_name is None:
+            raise ValueError('exchange_name is required to record the tape of {}'.format(symbol))
+        self.symbol = symbol
+        self.exchange_name = exchange_name
+        self.capacity = capacity
+        self.times = array('d', bytes(8 * capacity))
+        self.prices = array('d', bytes(8 * capacity))
+        self.sizes = array('d', bytes(8 * capacity))
+        self.sides = array('b', bytes(capacity))
+        # number of trades appended since start, the sequence number of the next trade
+        self.count = 0
+
+        # trades from sequence number _flushed are not written yet, the first of them at time _flush_time
+        self._recorder = recorder
+        self._segment_rows = segment_rows
+        self._flush_ms = flush_interval * 1000
+        self._flushed = 0
+        self._flush_time = None
+
+    def append(self, timestamp: float, price: float, size: float, side: int):
+        """ a trade at timestamp milliseconds since epoch, side 1 for buy and -1 for sell """
+        i = self.count % self.capacity
+        self.times[i] = timestamp
+        self.prices[i] = price
+        self.sizes[i] = size
+        self.sides[i] = side
+        self.count += 1
+        if self._recorder is not None:
+            if self._flush_time is None:
+                self._flush_time = timestamp
+            if self.count - self._flushed >= self._segment_rows or timestamp - self._flush_time >= self._flush_ms:
+                self.flush()
+
+    def on_trades(self, trades: [Trade]):
+        """ market trades callback, trades of other symbols are ignored """
+        for trade in trades:
+            if trade.contract_name == self.symbol:
+                self.append(trade.received_time, trade.price, trade.size, 1 if trade.side == Side.BUY else -1)
+
+    def __len__(self):
+        """ number of trades on the tape """
+        return min(self.count, self.capacity)
+
+    """ ----------------------------------- """
+    """             Reading                 """
+    """ ----------------------------------- """
+
+    def start_of_last(self, n: int) -> int:
+        """ sequence number of the first of the last n trades, fewer if fewer are on the tape """
+        return self.count - min(n, len(self))
+
+    def start_since(self, timestamp: float) -> int:
+        """ sequence number of the first trade on the tape at or after timestamp """
+        return self._search(self.count - len(self), timestamp)
+
+    def ranges(self, start: int, end: int = None) -> ((int, int), (int, int)):
+        """ the trades from sequence number start to end (the last trade by default) as two ranges of indices of
+            the columns, oldest first; the second range is empty unless the trades wrap around the end of the ring """
+        end = self.count if end is None else end
+        start = max(start, self.count - len(self))
+        if start >= end:
+            return (0, 0), (0, 0)
+        first = start % self.capacity
+        last = first + end - start
+        if last <= self.capacity:
+            return (first, last), (0, 0)
+        return (first, self.capacity), (0, last - self.capacity)
+
+    def copy(self, start: int, times: array, prices: array, sizes: array, sides: array) -> int:
+        """ copy the trades from sequence number start into preallocated columns, as many as they hold; returns the
+            number copied """
+        end = min(self.count, max(start, self.count - len(self)) + len(times))
+        position = 0
+        for first, last in self.ranges(start, end):
+            length = last - first
+            if length:
+                for source, target in ((self.times, times), (self.prices, prices), (self.sizes, sizes),
+                                       (self.sides, sides)):
+                    memoryview(target)[position:position + length] = memoryview(source)[first:last]
+                position += length
+        return position
+
+    def volume(self, start: int) -> (float, float):
+        """ (buy volume, sell volume) of the trades from sequence number start """
+        buy = 0.0
+        sell = 0.0
+        for first, last in self.ranges(start):
+            sizes = memoryview(self.sizes)[first:last]
+            total = sum(sizes)
+            bought = sum(compress(sizes, map(_BUY.__eq__, memoryview(self.sides)[first:last])))
+            buy += bought
+            sell += total - bought
+        return buy, sell
+
+    def vwap(self, start: int) -> float:
+        """ volume weighted average price of the trades from sequence number start, None if there are none """
+        notional = 0.0
+        volume = 0.0
+        for first, last in self.ranges(start):
+            # summed over views of the columns, without copying them
+            sizes = memoryview(self.sizes)[first:last]
+            notional += sum(map(mul, memoryview(self.prices)[first:last], sizes))
+            volume += sum(sizes)
+        return notional / volume if volume else None
+
+    """ ----------------------------------- """
+    """             Writing                 """
+    """ ----------------------------------- """
+
+    def flush(self):
+        """ hand the trades not yet written to the recorder, one chunk per hour partition """
+        if self._recorder is None or self._flushed == self.count:
+            return
+        # trades pushed off the ring before being written are lost
+        start = max(self._flushed, self.count - len(self))
+        while start < self.count:
+            hour = partition_of(self.times[start % self.capacity])
+            end = self._search(start, (hour + 1) * PARTITION_MS)
+            self._recorder.write(self.exchange_name, self.symbol, ChunkKind.TRADES, hour, self._columns(start, end))
+            start = end
+        self._flushed = self.count
+        self._flush_time = None
+
+    def _search(self, start: int, timestamp: float) -> int:
+        """ sequence number of the first trade from start at or after timestamp, by binary search """
+        low = start
+        high = self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.times[middle % self.capacity] < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _columns(self, start: int, end: int) -> TradeColumns:
+        columns = TradeColumns()
+        for first, last in self.ranges(start, end):
+            for source, target in ((self.times, columns.timestamps), (self.prices, columns.prices),
+                                   (self.sizes, columns.sizes), (self.sides, columns.sides)):
+                target.frombytes(memoryview(source)[first:last].cast('B'))
+        return columns
@@ -0,0 +1,81 @@
+"""
+BinanceGateway against a local ExchangeStandIn.
+
+Needs python-binance and aiohttp. Run from the repository root:
+    python -m pytest -q tests
+"""
+import threading
+import time
+import pytest
+
+pytest.importorskip('binance')
+pytest.importorskip('aiohttp')
+
+from gateways.binance2.binance2 import BinanceGateway, ProductType
+from gateways.binance2.exchange_stand_in import ExchangeStandIn
+from gateways.dispatcher import DispatchMode
+from gateways.gateway_interface import DepthNotify
+
+SYMBOLS = ['BTCUSDT', 'ETHUSDT']
+
+
+def wait_for(condition, timeout: float = 10):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def stand_in():
+    stand_in = ExchangeStandIn(SYMBOLS, depth_rate=200, trade_rate=50)
+    yield stand_in
+    stand_in.stop()
+
+
+@pytest.fixture
+def quiet_stand_in():
+    # no depth diff within the test, books only change by their snapshot
+    stand_in = ExchangeStandIn(SYMBOLS, depth_rate=0.01, trade_rate=0.01)
+    yield stand_in
+    stand_in.stop()
+
+
+def test_disconnect_stops_loop_and_dispatcher_threads(stand_in):
+    gateway = BinanceGateway(SYMBOLS, product_type=ProductType.FUTURE, name='test-gateway',
+                             dispatch_mode=DispatchMode.THREAD, endpoints=stand_in.start())
+    books = []
+    gateway.register_depth_callback(lambda exchange, venue_book: books.append(venue_book))
+    gateway.connect()
+    wait_for(lambda: len(books) > 10)
+
+    gateway.disconnect()
+    wait_for(lambda: not [t for t in threading.enumerate() if t.name.startswith('test-gateway')])
+
+
+@pytest.mark.parametrize('depth_notify', [DepthNotify.EVERY_UPDATE, DepthNotify.TOP_N, DepthNotify.BBO])
+def test_book_published_after_resync(quiet_stand_in, depth_notify):
+    gateway = BinanceGateway(SYMBOLS, product_type=ProductType.FUTURE, depth_notify=depth_notify,
+                             endpoints=quiet_stand_in.start())
+    books = {}
+    gateway.register_depth_callback(lambda exchange, venue_book: books.update(
+        {venue_book.get_book().contract_name: venue_book.get_book()}))
+    gateway.connect()
+    try:
+        wait_for(lambda: len(books) == len(SYMBOLS))
+        assert all(book.bids and book.asks for book in books.values())
+        assert all(book.update_id is not None for book in books.values())
+    finally:
+        gateway.disconnect()
+
+
+@pytest.mark.parametrize('dispatch_mode', [DispatchMode.LOOP, DispatchMode.THREAD])
+def test_array_book_requires_inline_dispatch(dispatch_mode):
+    with pytest.raises(ValueError):
+        BinanceGateway(SYMBOLS, array_book=True, dispatch_mode=dispatch_mode)
+
+
+def test_array_book_cannot_be_conflated():
+    gateway = BinanceGateway(SYMBOLS, array_book=True)
+    with pytest.raises(ValueError):
+        gateway.register_depth_callback(lambda exchange, venue_book: None, conflate=True)
@@ -0,0 +1,63 @@
+"""
+AsyncHandler of common/config_logging.py.
+
+Run from the repository root:
+    python -m pytest -q tests
+"""
+import io
+import logging
+from common.config_logging import AsyncHandler
+
+
+def new_logger(name: str, handler: logging.Handler) -> logging.Logger:
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(handler)
+    return logger
+
+
+def test_records_written_in_order():
+    stream = io.StringIO()
+    target = logging.StreamHandler(stream)
+    target.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+    handler = AsyncHandler([target])
+    logger = new_logger('test.async', handler)
+    for i in range(3):
+        logger.info('record {}'.format(i))
+    logger.warning('done')
+    handler.flush()
+    handler.close()
+    logger.removeHandler(handler)
+    assert stream.getvalue() == 'INFO record 0\nINFO record 1\nINFO record 2\nWARNING done\n'
+    assert handler.lock is not None
+
+
+def test_full_queue_drops_below_warning():
+    stream = io.StringIO()
+    handler = AsyncHandler([logging.StreamHandler(stream)], capacity=0)
+    logger = new_logger('test.async_full', handler)
+    logger.info('dropped')
+    logger.warning('kept')
+    handler.close()
+    logger.removeHandler(handler)
+    assert handler.dropped == 1
+    assert 'kept' in stream.getvalue() and 'dropped\n' not in stream.getvalue()
+
+
+def test_record_failing_to_format_does_not_lose_batch():
+    stream = io.StringIO()
+    failed = []
+    target = logging.StreamHandler(stream)
+    target.setFormatter(logging.Formatter('%(message)s'))
+    target.handleError = failed.append
+    handler = AsyncHandler([target])
+    logger = new_logger('test.async_format', handler)
+    logger.info('before')
+    logger.info('bad %d', 'not a number')
+    logger.info('after')
+    handler.flush()
+    handler.close()
+    logger.removeHandler(handler)
+    assert stream.getvalue() == 'before\nafter\n'
+    assert [record.msg for record in failed] == ['bad %d']
@@ -0,0 +1,35 @@
+"""
+Merging of venue books in ConsolidatedOrderBook.
+
+Run from the repository root:
+    python -m pytest -q tests
+"""
+from common.consolidated_book import ConsolidatedOrderBook
+from common.interface_book import OrderBook, PriceLevel, VenueOrderBook
+
+
+def venue_book(venue: str, symbol: str, bid: float, ask: float) -> VenueOrderBook:
+    return VenueOrderBook(venue, OrderBook(0, symbol, [PriceLevel(bid, 1.0)], [PriceLevel(ask, 1.0)]))
+
+
+def test_merges_venues_best_first():
+    book = ConsolidatedOrderBook('BTCUSDT')
+    book.on_depth('Binance', venue_book('Binance', 'BTCUSDT', 100.0, 101.0))
+    book.on_depth('Bybit', venue_book('Bybit', 'BTCUSDT', 100.5, 101.5))
+    assert book.get_best_bid_level().quote_id == 'Bybit'
+    assert book.get_best_ask_level().quote_id == 'Binance'
+
+
+def test_ignores_other_contracts_by_default():
+    book = ConsolidatedOrderBook('BTCUSDT')
+    book.on_depth('Binance', venue_book('Binance', 'BTCUSDT', 100.0, 101.0))
+    book.on_depth('Binance', venue_book('Binance', 'ETHUSDT', 3000.0, 3001.0))
+    assert book.get_best_bid() == 100.0
+    assert book.get_best_ask() == 101.0
+
+
+def test_venue_contracts_map_contract_names():
+    book = ConsolidatedOrderBook('BTCUSDT', venue_contracts={'Binance': 'BTCUSDT', 'Deribit': 'BTC-PERPETUAL'})
+    book.on_depth('Deribit', venue_book('Deribit', 'BTC-PERPETUAL', 100.5, 101.5))
+    book.on_depth('Deribit', venue_book('Deribit', 'BTCUSDT', 200.0, 201.0))
+    assert book.get_best_bid() == 100.5
@@ -0,0 +1,114 @@
+"""
+Sequencing of depth diff events in L2OrderBook, following Binance's procedure to manage a local order book.
+
+Run from the repository root:
+    python -m pytest -q tests
+"""
+import pytest
+from gateways.depth_engine import L2OrderBook, DepthGapError
+
+SNAPSHOT = {'lastUpdateId': 100, 'bids': [['99.0', '1.0'], ['98.0', '2.0']], 'asks': [['101.0', '1.0']]}
+
+
+def diff(first_id: int, final_id: int, previous_id: int = None, bids=None, asks=None) -> dict:
+    event = {'E': final_id, 'U': first_id, 'u': final_id, 'b': bids or [], 'a': asks or []}
+    if previous_id is not None:
+        event['pu'] = previous_id
+    return event
+
+
+def synced_book(futures: bool) -> L2OrderBook:
+    book = L2OrderBook('BTCUSDT', futures=futures)
+    book.apply_snapshot(SNAPSHOT)
+    return book
+
+
+# spot: drop u <= lastUpdateId, bridge with U <= lastUpdateId + 1 <= u, then U == previous u + 1
+
+def test_spot_bridges_and_follows():
+    book = synced_book(futures=False)
+    assert book.apply_diff(diff(95, 102, bids=[['99.5', '1.0']]))
+    assert book.apply_diff(diff(103, 104, asks=[['101.0', '0']]))
+    assert book.last_update_id == 104
+    assert book.get_bids(1) == [(99.5, 1.0)]
+    assert book.get_asks(1) == []
+
+
+def test_spot_drops_stale_events():
+    book = synced_book(futures=False)
+    assert not book.apply_diff(diff(90, 100, bids=[['97.0', '1.0']]))
+    assert book.last_update_id == 100
+    assert len(book.bids) == 2
+
+
+def test_spot_first_event_after_snapshot_must_bridge():
+    book = synced_book(futures=False)
+    with pytest.raises(DepthGapError):
+        book.apply_diff(diff(102, 103))
+    assert not book.is_ready()
+
+
+def test_spot_gap_after_bridging():
+    book = synced_book(futures=False)
+    book.apply_diff(diff(101, 102))
+    with pytest.raises(DepthGapError):
+        book.apply_diff(diff(104, 105))
+    assert not book.is_ready()
+
+
+def test_spot_buffered_events_replayed_on_snapshot():
+    book = L2OrderBook('BTCUSDT', futures=False)
+    assert not book.apply_diff(diff(90, 95))
+    assert not book.apply_diff(diff(96, 101, bids=[['99.0', '5.0']]))
+    assert not book.apply_diff(diff(102, 102, asks=[['100.5', '1.0']]))
+    book.apply_snapshot(SNAPSHOT)
+    assert book.last_update_id == 102
+    assert book.get_bids(1) == [(99.0, 5.0)]
+    assert book.get_asks(1) == [(100.5, 1.0)]
+
+
+# futures: drop u < lastUpdateId, bridge with U <= lastUpdateId <= u or pu == lastUpdateId, then pu == previous u
+
+def test_futures_bridges_and_follows():
+    book = synced_book(futures=True)
+    assert book.apply_diff(diff(95, 105, 94, bids=[['99.5', '1.0']]))
+    assert book.apply_diff(diff(106, 110, 105, bids=[['99.5', '0']]))
+    assert book.last_update_id == 110
+    assert book.get_bids(1) == [(99.0, 1.0)]
+
+
+def test_futures_bridges_on_previous_update_id():
+    book = synced_book(futures=True)
+    assert book.apply_diff(diff(101, 105, 100, bids=[['99.5', '1.0']]))
+    assert book.last_update_id == 105
+
+
+def test_futures_drops_stale_events():
+    book = synced_book(futures=True)
+    assert not book.apply_diff(diff(90, 99, 89, bids=[['97.0', '1.0']]))
+    assert book.last_update_id == 100
+
+
+def test_futures_first_event_after_snapshot_must_bridge():
+    book = synced_book(futures=True)
+    with pytest.raises(DepthGapError):
+        book.apply_diff(diff(102, 105, 101))
+    assert not book.is_ready()
+
+
+def test_futures_gap_after_bridging():
+    book = synced_book(futures=True)
+    book.apply_diff(diff(95, 105, 94))
+    with pytest.raises(DepthGapError):
+        book.apply_diff(diff(107, 110, 106))
+    assert not book.is_ready()
+
+
+def test_invalidate_drop_pending_discards_buffered_events():
+    book = synced_book(futures=True)
+    book.invalidate()
+    book.apply_diff(diff(101, 105, 100, bids=[['99.5', '1.0']]))
+    book.invalidate(drop_pending=True)
+    book.apply_snapshot(SNAPSHOT)
+    assert book.last_update_id == 100
+    assert book.get_bids(1) == [(99.0, 1.0)]
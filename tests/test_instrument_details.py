@@ -0,0 +1,26 @@
+"""
+Conversion of order prices and quantities to ticks and lots, and back to the strings sent to the exchange.
+
+Run from the repository root:
+    python -m pytest -q tests
+"""
+import pytest
+from common.interface_order import InstrumentDetails
+
+
+def test_format_price_rounds_to_tick():
+    instrument = InstrumentDetails('BTCUSDT', tick_size=0.1, quantity_size=0.001)
+    assert instrument.format_price(instrument.to_ticks(23142.9 + 1e-9)) == '23142.9'
+    assert instrument.format_price(instrument.to_ticks(0.1 + 0.2)) == '0.3'
+
+
+def test_format_quantity_rounds_to_lot():
+    instrument = InstrumentDetails('BTCUSDT', tick_size=0.1, quantity_size=0.001)
+    assert instrument.format_quantity(instrument.to_lots(0.1 + 0.2)) == '0.300'
+    assert instrument.format_quantity(instrument.to_lots('0.01')) == '0.010'
+
+
+def test_lots_require_quantity_size():
+    instrument = InstrumentDetails('BTCUSDT', tick_size=0.1)
+    with pytest.raises(ValueError):
+        instrument.to_lots(0.01)
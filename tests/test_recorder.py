@@ -0,0 +1,71 @@
+"""
+Recording books and market trades with MarketDataRecorder and reading them back with MarketDataStore.
+
+Run from the repository root:
+    python -m pytest -q tests
+"""
+import os
+import pytest
+from common.interface_book import OrderBook, PriceLevel, VenueOrderBook
+from common.interface_order import Trade, Side
+from marketdata.chunks import ChunkKind
+from marketdata.recorder import MarketDataRecorder, recording_path, partition_of
+from marketdata.store import MarketDataStore
+from gateways.replay_gateway import ReplayGateway
+
+SYMBOL = 'BTCUSDT'
+TIME = 1700000000000.0
+
+
+def venue_book(venue: str, timestamp: float, bid: float, update_id: int) -> VenueOrderBook:
+    return VenueOrderBook(venue, OrderBook(timestamp, SYMBOL, [PriceLevel(bid, 1.0)], [PriceLevel(bid + 0.1, 1.0)],
+                                           version=7, update_id=update_id))
+
+
+@pytest.mark.parametrize('depth_format', [ChunkKind.DEPTH, ChunkKind.BOOK_DELTA])
+def test_venues_recorded_apart_with_exchange_update_ids(tmp_path, depth_format):
+    recorder = MarketDataRecorder(str(tmp_path), depth_format=depth_format)
+    recorder.start()
+    recorder.on_depth('Binance', venue_book('Binance', TIME, 100.0, 5001))
+    recorder.on_depth('Bybit', venue_book('Bybit', TIME, 200.0, 9001))
+    recorder.on_depth('Binance', venue_book('Binance', TIME + 100, 100.1, 5003))
+    recorder.on_trades('Bybit', [Trade(TIME, SYMBOL, 200.0, 0.5, Side.BUY, False)])
+    recorder.close()
+
+    assert os.path.exists(recording_path(str(tmp_path), 'Binance', SYMBOL, depth_format, partition_of(TIME)))
+    binance = MarketDataStore(str(tmp_path), 'Binance')
+    bybit = MarketDataStore(str(tmp_path), 'Bybit')
+    assert [(book.get_best_bid(), book.update_id) for book in binance.books(SYMBOL)] == [(100.0, 5001),
+                                                                                         (100.1, 5003)]
+    assert [(book.get_best_bid(), book.update_id) for book in bybit.books(SYMBOL)] == [(200.0, 9001)]
+    assert list(binance.trades(SYMBOL)) == []
+    assert [trade.price for trade in bybit.trades(SYMBOL)] == [200.0]
+    binance.close()
+    bybit.close()
+
+
+def test_unknown_update_id(tmp_path):
+    recorder = MarketDataRecorder(str(tmp_path))
+    recorder.start()
+    recorder.on_depth('Binance', venue_book('Binance', TIME, 100.0, None))
+    recorder.close()
+    store = MarketDataStore(str(tmp_path), 'Binance')
+    assert [book.update_id for book in store.books(SYMBOL)] == [None]
+    store.close()
+
+
+@pytest.mark.parametrize('depth_format', [ChunkKind.DEPTH, ChunkKind.BOOK_DELTA])
+def test_replayed_versions_differ_with_unknown_update_ids(tmp_path, depth_format):
+    recorder = MarketDataRecorder(str(tmp_path), depth_format=depth_format)
+    recorder.start()
+    for i in range(5):
+        recorder.on_depth('Binance', venue_book('Binance', TIME + i * 100, 100.0 + i, None))
+    recorder.close()
+
+    replay = ReplayGateway(str(tmp_path), [SYMBOL], exchange_name='Binance')
+    books = []
+    replay.register_depth_callback(lambda exchange, venue_book: books.append(venue_book.get_book()))
+    replay.run()
+    assert [book.update_id for book in books] == [None] * 5
+    versions = [book.version for book in books]
+    assert len(set(versions)) == 5 and versions == sorted(versions)
@@ -0,0 +1,40 @@
+"""
+Batch order requests of the week 7 BinanceFutureGateway, sent to a local ExchangeStandIn.
+
+Needs python-binance and aiohttp. Run from the repository root:
+    python -m pytest -q tests
+"""
+import pytest
+
+pytest.importorskip('binance')
+pytest.importorskip('aiohttp')
+
+from common.interface_order import NewOrderSingle, Side, OrderType, InstrumentDetails
+from gateways.binance2.exchange_stand_in import ExchangeStandIn
+from workshop.week_07.binance_gateway import BinanceFutureGateway
+
+SYMBOL = 'BTCUSDT'
+
+
+@pytest.fixture(scope='module')
+def gateway():
+    stand_in = ExchangeStandIn([SYMBOL])
+    gateway = BinanceFutureGateway(SYMBOL, api_key='key', api_secret='secret', endpoints=stand_in.start(),
+                                   instrument=InstrumentDetails(SYMBOL, tick_size=0.1, quantity_size=0.001))
+    gateway.connect()
+    yield gateway
+    stand_in.stop()
+
+
+def orders() -> [NewOrderSingle]:
+    return [NewOrderSingle(SYMBOL, Side.BUY, 0.01, OrderType.Limit, price=22000.1 + 1e-9),
+            NewOrderSingle(SYMBOL, Side.SELL, 0.01, OrderType.Limit, price=24000.0, post_only=True),
+            NewOrderSingle(SYMBOL, Side.BUY, 0.01, OrderType.Market)]
+
+
+def test_place_orders(gateway):
+    assert gateway.place_orders(orders()) == [True, True, True]
+
+
+def test_place_orders_async(gateway):
+    assert gateway.place_orders_async(orders() * 3).result(timeout=10) == [True] * 9
@@ -1,22 +1,33 @@
 """
-To demonstrate how to use the python-binance library to download order books periodically.
+To demonstrate how to record streaming order books and market trades of Binance futures into columnar binary
+files, see marketdata/chunks.py for the format.
 https://python-binance.readthedocs.io/en/latest/index.html
 
 To install the library: pip install python-binance
 
 """
 
+import logging
 import time
-from common.config_logging import get_file_logger
-from binance.client import Client
+from common.config_logging import to_stdout
+from gateways.binance2.binance2 import BinanceGateway, ProductType
+from marketdata.recorder import MarketDataRecorder
 
 
 if __name__ == '__main__':
-    logger = get_file_logger("depth", "/data/future_btcusdt.txt")
-    client = Client()
-    while True:
-        depth = client.futures_order_book(symbol='BTCUSDT')
-        print(depth)
-        logger.info(depth)
-        time.sleep(2)
+    to_stdout()
 
+    # depth updates every 100ms and market trades, top 20 levels of each book
+    binance = BinanceGateway(symbol='BTCUSDT', product_type=ProductType.FUTURE, depth=20)
+    recorder = MarketDataRecorder('/data/recordings', levels=20)
+    recorder.register(binance)
+    recorder.start()
+    binance.connect()
+
+    try:
+        while True:
+            time.sleep(10)
+            logging.info('Recorded {} rows, {} chunks, {} bytes'.format(
+                recorder.rows, recorder.chunks_written, recorder.bytes_written))
+    except KeyboardInterrupt:
+        recorder.close()
@@ -5,11 +5,7 @@ Create a method to send market order
 """
 
 import logging
-import time
-from urllib.parse import urlencode
-import hmac
-import hashlib
-import requests
+from gateways.binance2.rest_client import SignedRestClient, RestApiError
 
 logging.basicConfig(format='%(asctime)s [%(threadName)-12.12s] [%(levelname)-5.5s]  %(message)s', level=logging.INFO)
 
@@ -17,36 +13,24 @@ logging.basicConfig(format='%(asctime)s [%(threadName)-12.12s] [%(levelname)-5.5
 BASE_URL = 'https://testnet.binancefuture.com'
 
 
-def send_market_order(key: str, secret: str, symbol: str, quantity: float, side: bool):
-    # order parameters
-    timestamp = int(time.time() * 1000)
+def send_market_order(client: SignedRestClient, symbol: str, quantity: float, side: bool):
+    # order parameters, timestamp and signature are added by the client
     params = {
         "symbol": symbol,
         "side": "BUY" if side else "SELL",
         "type": "MARKET",
-        "quantity": quantity,
-        'timestamp': timestamp
+        "quantity": quantity
     }
+    logging.info('Order parameters: {}'.format(params))
 
-    # create query string
-    query_string = urlencode(params)
-    logging.info('Query string: {}'.format(query_string))
-
-    # signature
-    signature = hmac.new(secret.encode("utf-8"), query_string.encode("utf-8"), hashlib.sha256).hexdigest()
-
-    # url
-    url = BASE_URL + '/fapi/v1/order' + "?" + query_string + "&signature=" + signature
-
-    # post request
-    session = requests.Session()
-    session.headers.update(
-        {"Content-Type": "application/json;charset=utf-8", "X-MBX-APIKEY": key}
-    )
-    response = session.post(url=url, params={})
+    # post request over the client's persistent connection, a rejected order returns None as before
+    try:
+        response_map = client.new_order(**params)
+    except RestApiError as e:
+        logging.warning('Order rejected: {}'.format(e))
+        return None
 
     # get order id
-    response_map = response.json()
     order_id = response_map.get('orderId')
 
     return order_id
@@ -55,4 +39,5 @@ def send_market_order(key: str, secret: str, symbol: str, quantity: float, side:
 if __name__ == '__main__':
     api_key = ''
     api_secret = ''
-    send_market_order(api_key, api_secret, 'BTCUSDT', 0.1, True)
+    rest_client = SignedRestClient(api_key, api_secret, BASE_URL)
+    send_market_order(rest_client, 'BTCUSDT', 0.1, True)
@@ -6,10 +6,7 @@ import logging
 import os
 import time
 from dotenv import load_dotenv
-from urllib.parse import urlencode
-import hmac
-import hashlib
-import requests
+from gateways.binance2.rest_client import SignedRestClient, RestApiError
 
 # logging configuration
 logging.basicConfig(format='%(asctime)s [%(threadName)-12.12s] [%(levelname)-5.5s]  %(message)s', level=logging.INFO)
@@ -27,36 +24,24 @@ def get_credentials():
 
 
 # send market order
-def send_market_order(key: str, secret: str, symbol: str, quantity: float, side: bool):
-    # order parameters
-    timestamp = int(time.time() * 1000)
+def send_market_order(client: SignedRestClient, symbol: str, quantity: float, side: bool):
+    # order parameters, timestamp and signature are added by the client
     params = {
         "symbol": symbol,
         "side": "BUY" if side else "SELL",
         "type": "MARKET",
-        "quantity": quantity,
-        'timestamp': timestamp
+        "quantity": quantity
     }
+    logging.info('Order parameters: {}'.format(params))
 
-    # create query string
-    query_string = urlencode(params)
-    logging.info('Query string: {}'.format(query_string))
-
-    # signature
-    signature = hmac.new(secret.encode("utf-8"), query_string.encode("utf-8"), hashlib.sha256).hexdigest()
-
-    # url
-    url = BASE_URL + '/fapi/v1/order' + "?" + query_string + "&signature=" + signature
-
-    # post request
-    session = requests.Session()
-    session.headers.update(
-        {"Content-Type": "application/json;charset=utf-8", "X-MBX-APIKEY": key}
-    )
-    response = session.post(url=url, params={})
+    # post request over the client's persistent connection, a rejected order returns None as before
+    try:
+        response_map = client.new_order(**params)
+    except RestApiError as e:
+        logging.warning('Order rejected: {}'.format(e))
+        return None
 
     # get order id
-    response_map = response.json()
     order_id = response_map.get('orderId')
 
     return order_id
@@ -64,12 +49,14 @@ def send_market_order(key: str, secret: str, symbol: str, quantity: float, side:
 
 # main loop to buy and sell periodically
 if __name__ == '__main__':
-    # get api key and secret
+    # get api key and secret, and create a client that keeps its connections open
     api_key, api_secret = get_credentials()
+    rest_client = SignedRestClient(api_key, api_secret, BASE_URL)
+    rest_client.sync_time()
 
     is_buy = True
     while True:
-        send_market_order(api_key, api_secret, 'BTCUSDT', 0.1, is_buy)
+        send_market_order(rest_client, 'BTCUSDT', 0.1, is_buy)
 
         # sleep
         logging.info('sleep')
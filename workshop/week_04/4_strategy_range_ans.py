@@ -6,10 +6,7 @@ import logging
 import os
 import time
 from dotenv import load_dotenv
-from urllib.parse import urlencode
-import hmac
-import hashlib
-import requests
+from gateways.binance2.rest_client import SignedRestClient
 
 # logging configuration
 logging.basicConfig(format='%(asctime)s [%(threadName)-12.12s] [%(levelname)-5.5s]  %(message)s', level=logging.INFO)
@@ -64,9 +61,8 @@ def parse(json_object: {}) -> OrderBook:
     return OrderBook(_event_time, bids, asks)
 
 
-def get_depth(sym: str):
-    response = requests.get(BASE_URL + '/fapi/v1/depth', params={'symbol': sym})
-    return parse(response.json())
+def get_depth(client: SignedRestClient, sym: str):
+    return parse(client.public_request('GET', '/fapi/v1/depth', {'symbol': sym}))
 
 
 def get_credentials():
@@ -76,55 +72,19 @@ def get_credentials():
     return os.getenv('BINANCE_API_KEY'), os.getenv('BINANCE_API_SECRET')
 
 
-def sign_url(secret: str, api_url, params: {}):
-    # create query string
-    query_string = urlencode(params)
-
-    # signature
-    signature = hmac.new(secret.encode("utf-8"), query_string.encode("utf-8"), hashlib.sha256).hexdigest()
-
-    # url
-    return BASE_URL + api_url + "?" + query_string + "&signature=" + signature
-
-
-def send_market_order(key: str, secret: str, sym: str, quantity: float, side: bool):
-    # order parameters
-    timestamp = int(time.time() * 1000)
+# send market order through the client's pooled connections, and get the filled price
+def send_market_order(client: SignedRestClient, sym: str, quantity: float, side: bool):
     side_str = "BUY" if side else "SELL"
-    order_params = {
-        "symbol": sym,
-        "side": side_str,
-        "type": "MARKET",
-        "quantity": quantity,
-        'timestamp': timestamp
-    }
-
     logging.info(
         'Sending market order: Symbol: {}, Side: {}, Quantity: {}'.
-        format(symbol, side_str, quantity)
+        format(sym, side_str, quantity)
     )
 
-    # new order url
-    url = sign_url(secret, '/fapi/v1/order', order_params)
-
     # POST order request
-    session = requests.Session()
-    session.headers.update(
-        {"Content-Type": "application/json;charset=utf-8", "X-MBX-APIKEY": key}
-    )
-    post_response = session.post(url=url, params={})
-    post_response_data = post_response.json()
+    post_response_data = client.new_order(symbol=sym, side=side_str, type="MARKET", quantity=quantity)
 
     # GET filled price
-    timestamp = int(time.time() * 1000)
-    query_params = {
-        "symbol": "BTCUSDT",
-        "orderId": post_response_data['orderId'],
-        "timestamp": timestamp
-    }
-    url = sign_url(secret, '/fapi/v1/order', query_params)
-    get_response = session.get(url=url, params={})
-    get_response_data = get_response.json()
+    get_response_data = client.get_order(sym, post_response_data['orderId'])
     return get_response_data['avgPrice']
 
 
@@ -135,8 +95,10 @@ if __name__ == '__main__':
     lower_bound = 21830.0
     target_size = 0.1
 
-    # get api key and secret
+    # get api key and secret, and create a client that keeps its connections open
     api_key, api_secret = get_credentials()
+    rest_client = SignedRestClient(api_key, api_secret, BASE_URL)
+    rest_client.sync_time()
 
     # strategy position
     position = 0
@@ -146,7 +108,7 @@ if __name__ == '__main__':
         time.sleep(1)
 
         # get order book
-        order_book = get_depth(symbol)
+        order_book = get_depth(rest_client, symbol)
 
         # determine target position
         target_position = 0
@@ -176,7 +138,7 @@ if __name__ == '__main__':
             # order to send?
             if order_qty != 0:
                 is_buy = True if order_qty > 0 else False
-                filled_price = send_market_order(api_key, api_secret, symbol, abs(order_qty), is_buy)
+                filled_price = send_market_order(rest_client, symbol, abs(order_qty), is_buy)
                 position = target_position
                 logging.info('Filled price: {}'.format(filled_price))
             else:
@@ -16,7 +16,7 @@ import os
 import time
 from dotenv import load_dotenv
 from common.interface_book import VenueOrderBook
-from common.interface_order import OrderEvent, Side, OrderStatus
+from common.interface_order import OrderEvent, Side, OrderStatus, InstrumentDetails, NewOrderSingle, OrderType
 from workshop.week_07.binance_gateway import BinanceFutureGateway
 import logging
 
@@ -38,11 +38,15 @@ class Order:
 # Pricing strategy class
 class PricingStrategy:
 
-    def __init__(self, symbol: str, order_size, sensitivity, binance_gateway: BinanceFutureGateway):
+    def __init__(self, symbol: str, order_size, sensitivity, binance_gateway: BinanceFutureGateway,
+                 instrument: InstrumentDetails = None):
         self._symbol = symbol
         self._order_size = order_size
-        self._sensitivity = sensitivity
         self._binance_gateway = binance_gateway
+
+        # with instrument details, prices are compared as integer ticks to avoid float rounding drift
+        self._price_key = instrument.to_ticks if instrument else float
+        self._sensitivity = self._price_key(sensitivity)
         self._position = 0
         self._live_buy_order = None
         self._live_sell_order = None
@@ -50,29 +54,37 @@ class PricingStrategy:
     def start(self):
         logging.info("Start strategy")
 
-    # callback on order book update
+    # callback on order book update, new orders and cancels of both sides are each sent in one batch request
     def on_orderbook(self, order_book: VenueOrderBook):
+        _new_orders = []
+        _cancels = []
+
         # raise a buy order if there is currently none
         if self._live_buy_order is None:
             _limit_price = order_book.get_book().get_best_bid()
-            _order = Order(self._symbol, Side.BUY, _limit_price, self._order_size)
-            self._post_only_order(_order)
+            _new_orders.append(Order(self._symbol, Side.BUY, _limit_price, self._order_size))
         else:
             # should we refresh our price?
-            if abs(order_book.get_book().get_best_bid() - self._live_buy_order.price) > self._sensitivity:
+            if abs(self._price_key(order_book.get_book().get_best_bid()) - self._price_key(self._live_buy_order.price)) \
+                    > self._sensitivity:
                 # cancel live order
-                self._cancel_order(self._live_buy_order)
+                _cancels.append(self._live_buy_order)
 
         # raise a sell order if there is currently none
         if self._live_sell_order is None:
             _limit_price = order_book.get_book().get_best_ask()
-            _order = Order(self._symbol, Side.SELL, _limit_price, self._order_size)
-            self._post_only_order(_order)
+            _new_orders.append(Order(self._symbol, Side.SELL, _limit_price, self._order_size))
         else:
             # should we refresh our price?
-            if abs(order_book.get_book().get_best_ask() - self._live_sell_order.price) > self._sensitivity:
+            if abs(self._price_key(order_book.get_book().get_best_ask()) - self._price_key(self._live_sell_order.price)) \
+                    > self._sensitivity:
                 # cancel live order
-                self._cancel_order(self._live_sell_order)
+                _cancels.append(self._live_sell_order)
+
+        if _new_orders:
+            self._post_only_orders(_new_orders)
+        if _cancels:
+            self._cancel_orders(_cancels)
 
     # callback on execution update
     def on_execution(self, order_event: OrderEvent):
@@ -92,31 +104,55 @@ class PricingStrategy:
                     # sell order is done, we can create new one
                     self._live_sell_order = None
 
-    def _post_only_order(self, order: Order):
-        if order.side == Side.BUY:
-            # ensure there's no existing buy order
-            if self._live_buy_order is None:
-                success = self._binance_gateway.place_limit_order(order.side, order.price, order.quantity, 'GTX')
-                if success:
+    # orders are sent without blocking the gateway loop, the side is taken by the order while the request is in
+    # flight and released if the exchange rejects it
+    def _post_only_orders(self, orders: [Order]):
+        _to_send = []
+        for order in orders:
+            if order.side == Side.BUY:
+                # ensure there's no existing buy order
+                if self._live_buy_order is None:
                     self._live_buy_order = order
+                else:
+                    raise Exception("Logic error - attempt to raise buy order when there is already one")
             else:
-                raise Exception("Logic error - attempt to raise buy order when there is already one")
-        else:
-            # ensure there's no existing sell order
-            if self._live_sell_order is None:
-                success = self._binance_gateway.place_limit_order(order.side, order.price, order.quantity, 'GTX')
-                if success:
+                # ensure there's no existing sell order
+                if self._live_sell_order is None:
                     self._live_sell_order = order
-
-    # cancel the given order if not cancel request not previously sent
-    def _cancel_order(self, order: Order):
-        if not self._ready_to_cancel(order):
-            # not ready to cancel yet, wait
+                else:
+                    continue
+            _to_send.append(order)
+
+        _requests = [NewOrderSingle(order.symbol, order.side, order.quantity, OrderType.Limit, order.price, post_only=True)
+                     for order in _to_send]
+        future = self._binance_gateway.place_orders_async(_requests)
+        future.add_done_callback(
+            lambda f: [self._on_order_sent(order, success) for order, success in zip(_to_send, f.result())])
+
+    # callback when the exchange responds to an order request
+    def _on_order_sent(self, order: Order, success: bool):
+        if success:
+            return
+        if order is self._live_buy_order:
+            self._live_buy_order = None
+        elif order is self._live_sell_order:
+            self._live_sell_order = None
+
+    # cancel the given orders if ready and cancel request not previously sent
+    def _cancel_orders(self, orders: [Order]):
+        # orders not ready to cancel yet wait for the next update
+        _to_cancel = [order for order in orders if self._ready_to_cancel(order) and not order.cancelling]
+        if not _to_cancel:
             return
-        if not order.cancelling:
-            _order_id = order.last_order_event.order_id
-            logging.info("Sending cancel request for order id: {}".format(_order_id))
-            order.cancelling = self._binance_gateway.cancel_order(order.symbol, order.last_order_event.order_id)
+        _order_ids = [order.last_order_event.order_id for order in _to_cancel]
+        logging.info("Sending cancel request for order ids: {}".format(_order_ids))
+
+        # mark as cancelling while the request is in flight, reset if the cancel is rejected
+        for order in _to_cancel:
+            order.cancelling = True
+        future = self._binance_gateway.cancel_orders_async(self._symbol, _order_ids)
+        future.add_done_callback(
+            lambda f: [setattr(order, 'cancelling', success) for order, success in zip(_to_cancel, f.result())])
 
     # update current position
     def _update_position(self, order_event: OrderEvent):
@@ -147,13 +183,14 @@ if __name__ == '__main__':
     symbol = 'BTCUSDT'
     order_size = 0.01
     sensitivity = 0.1
+    instrument = InstrumentDetails(symbol, tick_size=0.1, quantity_size=0.001)
 
     # create a binance gateway object
-    binance_gateway = BinanceFutureGateway(symbol, api_key, api_secret)
+    binance_gateway = BinanceFutureGateway(symbol, api_key, api_secret, instrument=instrument)
 
     # create a strategy a register callbacks with gateway
 
-    strategy = PricingStrategy(symbol, order_size, sensitivity, binance_gateway)
+    strategy = PricingStrategy(symbol, order_size, sensitivity, binance_gateway, instrument)
     binance_gateway.register_execution_callback(strategy.on_execution)
     binance_gateway.register_depth_callback(strategy.on_orderbook)
 
@@ -1,38 +1,77 @@
 import asyncio
 import json
-from threading import Thread
+from concurrent.futures import Future
+from threading import Thread, current_thread
 import websockets
-from binance.depthcache import FuturesDepthCacheManager
 from binance import AsyncClient, BinanceSocketManager, Client
+from binance.enums import FuturesType
 from common.interface_book import VenueOrderBook, PriceLevel, OrderBook
+from gateways.depth_engine import L2OrderBook, DepthGapError
+from gateways.event_loop import LoopType, new_event_loop, pin_current_thread
+from gateways.recovery import ExponentialBackoff
 import logging
-from common.interface_order import OrderEvent, OrderStatus, ExecutionType, Side
-import schedule
+from common.interface_order import Side, NewOrderSingle, OrderType, InstrumentDetails
+from common.json_decoder import JsonDecoder
+from gateways.binance2.binance_messages import decode_order_trade_update, is_listen_key_expired
+from gateways.binance2.endpoints import Endpoints
+from gateways.binance2.ws_api import WsApiClient, FUTURES_WS_API_URL, FUTURES_WS_API_TESTNET_URL
 
 logging.basicConfig(format='%(asctime)s [%(threadName)-12.12s] [%(levelname)-5.5s]  %(message)s', level=logging.INFO)
 
+# maximum number of orders per batch request accepted by the exchange
+MAX_BATCH_ORDERS = 5
+MAX_BATCH_CANCELS = 10
+
+# seconds between listen key keepalive requests, a listen key expires 60 minutes after it was last extended
+LISTEN_KEY_KEEPALIVE_INTERVAL = 15 * 60
+
+
+# split a list into consecutive chunks of at most the given size
+def _chunks(items: list, size: int) -> list:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
 
 class BinanceFutureGateway:
 
-    def __init__(self, symbol: str, api_key=None, api_secret=None, name='Binance', testnet=True):
+    def __init__(self, symbol: str, api_key=None, api_secret=None, name='Binance', testnet=True,
+                 loop_type=LoopType.ASYNCIO, cpu=None, ws_order_entry=False, ws_api_url=None,
+                 endpoints: Endpoints = None, instrument: InstrumentDetails = None):
         self._api_key = api_key
         self._api_secret = api_secret
         self._exchange_name = name
         self._symbol = symbol
         self.testnet = testnet
 
-        # binance async client
+        # with instrument details, order prices and quantities are sent rounded to a tick and a lot, with the
+        # exact number of decimals, instead of the float as given
+        self._instrument = instrument
+
+        # decoder of user data stream messages, using the fastest JSON library installed
+        self._decoder = JsonDecoder()
+
+        # binance clients, connecting to the given endpoints instead of Binance if any
+        self._endpoints = endpoints or Endpoints()
         self._client = None
         self._async_client = None
-        self._dcm = None  # depth cache, which implements the logic to manage a local order book
+        self._bm = None  # binance socket manager
+        self._ds = None  # depth diff socket
         self._dws = None  # depth async WebSocket session
         self._listen_key = None
 
-        # depth cache
-        self._depth_cache = None
+        # with ws_order_entry, orders are placed and cancelled over one persistent WebSocket API session instead
+        # of REST; ws_api_url overrides the exchange endpoint, for example with a WsApiStandIn url
+        self._ws_api = None
+        if ws_order_entry:
+            url = ws_api_url or (FUTURES_WS_API_TESTNET_URL if testnet else FUTURES_WS_API_URL)
+            self._ws_api = WsApiClient(api_key, api_secret, url=url)
+
+        # local order book, maintained from a depth snapshot and the diff stream
+        self._depth_book = L2OrderBook(symbol, futures=True, instrument=instrument)
 
-        # this is a loop and dedicated thread to run all async concurrent tasks
-        self._loop = asyncio.new_event_loop()
+        # this is a loop and dedicated thread to run all async concurrent tasks, the loop implementation is chosen
+        # by loop_type and the thread optionally pinned to a CPU or a collection of CPUs
+        self._loop = new_event_loop(loop_type)
+        self._cpu = cpu
         self._loop_thread = Thread(target=self._run_async_tasks, daemon=True, name=name)
 
         # callbacks
@@ -51,110 +90,176 @@ class BinanceFutureGateway:
         self._loop_thread.start()
 
         # synchronous client
-        self._client = Client(self._api_key, self._api_secret, testnet=self.testnet)
-
-        # job
-        schedule.every(15).minutes.do(self._extend_listen_key)
+        self._client = self._endpoints.client_class(Client)(self._api_key, self._api_secret, testnet=self.testnet)
 
     # an internal method to reconnect websocket
     async def _reconnect_ws(self):
         logging.info("reconnecting websocket")
-        self._async_client = await AsyncClient.create(self._api_key, self._api_secret, testnet=self.testnet)
+        if self._async_client is not None:
+            # the old client is replaced, close its session
+            try:
+                await self._async_client.close_connection()
+            except Exception:
+                logging.debug('error closing async client', exc_info=True)
+        self._async_client = await self._endpoints.client_class(AsyncClient).create(self._api_key, self._api_secret,
+                                                                                    testnet=self.testnet)
+        self._bm = self._endpoints.socket_manager_class(BinanceSocketManager)(self._async_client)
+        if self._ws_api:
+            await self._ws_api.connect()
+            await self._ws_api.sync_time()
 
     # an internal method to runs tasks in parallel
     def _run_async_tasks(self):
         """ Run the following tasks concurrently in the current thread """
+        pin_current_thread(self._cpu)
         self._loop.create_task(self._listen_depth_forever())
         self._loop.create_task(self._listen_execution_forever())
         self._loop.run_forever()
 
-    # an internal async method to listen to depth stream
+    # an internal async method to listen to depth stream; on any failure the socket is closed, and the client and
+    # socket are reconnected with backoff
     async def _listen_depth_forever(self):
         logging.info("Subscribing to depth events")
+        backoff = ExponentialBackoff()
         while True:
-            if not self._dws:
-                logging.info("depth socket not connected, reconnecting")
-                self._dcm = FuturesDepthCacheManager(self._async_client, symbol=self._symbol)
-                self._dws = await self._dcm.__aenter__()
-
-            # wait for depth update
             try:
-                self._depth_cache = await self._dws.recv()
+                if not self._dws:
+                    logging.info("depth socket not connected, reconnecting")
+                    self._ds = self._bm.futures_multiplex_socket([self._symbol.lower() + '@depth@100ms'],
+                                                                 futures_type=FuturesType.USD_M)
+                    # diffs received while the snapshot is requested are buffered by the socket and replayed after
+                    self._dws = await self._ds.__aenter__()
+                    # diffs buffered from the previous connection do not follow the new snapshot
+                    self._depth_book.invalidate(drop_pending=True)
+                    await self._load_depth_snapshot()
+                    backoff.reset()
+
+                # wait for depth update
+                message = await self._dws.recv()
+
+                try:
+                    changed = self._depth_book.apply_diff(message['data'])
+                except DepthGapError as e:
+                    logging.warning('{}, reloading depth snapshot'.format(e))
+                    await self._load_depth_snapshot()
+                    changed = True
 
-                if self._depth_callbacks:
+                if changed and self._depth_callbacks:
                     # notify callbacks
                     for _callback in self._depth_callbacks:
                         _callback(VenueOrderBook(self._exchange_name, self.get_order_book()))
-            except Exception as e:
+            except Exception:
                 logging.exception('encountered issue in depth processing')
-                # reset socket and reconnect
-                self._dws = None
-                await self._reconnect_ws()
+                # close socket and reconnect
+                await self._close_depth()
+                await backoff.wait()
+                try:
+                    await self._reconnect_ws()
+                except Exception:
+                    logging.exception('failed to reconnect websocket')
 
-    # an internal async method to listen to user data stream
+    async def _close_depth(self):
+        if self._ds is not None:
+            try:
+                await self._ds.__aexit__(None, None, None)
+            except Exception:
+                logging.debug('error closing depth socket', exc_info=True)
+        self._ds = None
+        self._dws = None
+
+    # an internal async method to listen to user data stream, reconnected with a new listen key whenever the
+    # stream drops or its listen key expires
     async def _listen_execution_forever(self):
         logging.info("Subscribing to user data events")
-        self._listen_key = await self._async_client.futures_stream_get_listen_key()
         if self.testnet:
-            url = 'wss://stream.binancefuture.com/ws/' + self._listen_key
+            base_url = 'wss://stream.binancefuture.com/ws/'
         else:
-            url = 'wss://fstream.binance.com/ws/' + self._listen_key
+            base_url = 'wss://fstream.binance.com/ws/'
+        base_url = self._endpoints.user_stream_url(base_url)
+
+        backoff = ExponentialBackoff()
+        while True:
+            try:
+                self._listen_key = await self._async_client.futures_stream_get_listen_key()
+                async with websockets.connect(base_url + self._listen_key) as ws:
+                    logging.info("User data stream connected")
+                    backoff.reset()
+                    keepalive = self._loop.create_task(self._keep_listen_key_alive(ws, self._listen_key))
+                    try:
+                        await self._receive_user_data(ws)
+                    finally:
+                        keepalive.cancel()
+            except Exception:
+                logging.exception('encountered issue in user data stream')
 
-        conn = websockets.connect(url)
-        ws = await conn.__aenter__()
-        while ws.open:
-            _message = await ws.recv()
+            logging.info("User data stream disconnected, reconnecting")
+            await backoff.wait()
+
+    # an internal async method to process user data messages until the stream closes or its listen key expires
+    async def _receive_user_data(self, ws):
+        async for _message in ws:
             # logging.info(_message)
 
-            # convert to json
-            _data = json.loads(_message)
-            update_type = _data.get('e')
-
-            if update_type == 'ORDER_TRADE_UPDATE':
-                _trade_data = _data.get('o')
-                _order_id = _trade_data.get('c')
-                _symbol = _trade_data.get('s')
-                _execution_type = _trade_data.get('x')
-                _order_status = _trade_data.get('X')
-                _side = _trade_data.get('S')
-                _last_filled_price = float(_trade_data.get('L'))
-                _last_filled_qty = float(_trade_data.get('l'))
-
-                # create an order event
-                _order_event = OrderEvent(_symbol, _order_id, ExecutionType[_execution_type], OrderStatus[_order_status])
-                _order_event.side = Side[_side]
-                if _execution_type == 'TRADE':
-                    _order_event.last_filled_price = _last_filled_price
-                    _order_event.last_filled_quantity = _last_filled_qty
+            # decode order updates only, other events are skipped without being parsed
+            _order_event = decode_order_trade_update(self._decoder, _message)
 
+            if _order_event is not None:
                 # notify callbacks
                 if self._execution_callbacks:
                     # notify callbacks
                     for _callback in self._execution_callbacks:
                         _callback(_order_event)
+            elif is_listen_key_expired(self._decoder, _message):
+                logging.warning("Listen key expired")
+                return
 
-    def _extend_listen_key(self):
-        logging.info("Extending listen key")
-        self._client.futures_stream_keepalive(self._listen_key)
+    # an internal async method to extend the listen key validity (60 minutes) periodically; if it cannot be
+    # extended, the stream is closed so that it reconnects with a new listen key
+    async def _keep_listen_key_alive(self, ws, listen_key: str):
+        while True:
+            await asyncio.sleep(LISTEN_KEY_KEEPALIVE_INTERVAL)
+            try:
+                logging.info("Extending listen key")
+                await self._async_client.futures_stream_keepalive(listen_key)
+            except Exception:
+                logging.exception('failed to extend listen key, closing user data stream')
+                await ws.close()
+                return
+
+    # an internal async method to load the depth snapshot, retried if it is behind the buffered diffs
+    async def _load_depth_snapshot(self, attempts=5):
+        for attempt in range(attempts):
+            snapshot = await self._async_client.futures_order_book(symbol=self._symbol, limit=1000)
+            try:
+                self._depth_book.apply_snapshot(snapshot)
+                return
+            except DepthGapError as e:
+                if attempt == attempts - 1:
+                    raise
+                logging.warning('{}, snapshot behind the depth stream, retrying'.format(e))
 
     """ 
         Get order book 
     """
     def get_order_book(self) -> VenueOrderBook:
-        bids = [PriceLevel(price=p, size=s) for (p, s) in self._depth_cache.get_bids()[:5]]
-        asks = [PriceLevel(price=p, size=s) for (p, s) in self._depth_cache.get_asks()[:5]]
-        return OrderBook(timestamp=self._depth_cache.update_time, contract_name=self._symbol, bids=bids, asks=asks)
+        book = self._depth_book
+        bids = [PriceLevel(price=p, size=s) for (p, s) in book.get_bids(5)]
+        asks = [PriceLevel(price=p, size=s) for (p, s) in book.get_asks(5)]
+        return OrderBook(timestamp=book.update_time, contract_name=self._symbol, bids=bids, asks=asks,
+                         version=book.version, update_id=book.last_update_id)
 
     """
         Place a limit order
     """
     def place_limit_order(self, side: Side, price, quantity, tif='IOC') -> bool:
+        if self._use_ws_api():
+            return self.place_limit_order_async(side, price, quantity, tif).result()
         try:
             self._client.futures_create_order(symbol=self._symbol,
                                               side=side.name,
                                               type='LIMIT',
-                                              price=price,
-                                              quantity=quantity,
+                                              price=self._format_price(price),
+                                              quantity=self._format_quantity(quantity),
                                               timeInForce=tif)
             return True
         except Exception as e:
@@ -165,6 +270,8 @@ class BinanceFutureGateway:
         Cancel an order
     """
     def cancel_order(self, symbol, order_id) -> bool:
+        if self._use_ws_api():
+            return self.cancel_order_async(symbol, order_id).result()
         try:
             self._client.futures_cancel_order(symbol=symbol, origClientOrderId=order_id)
             return True
@@ -172,6 +279,175 @@ class BinanceFutureGateway:
             logging.warning("Failed to cancel order: {}, {}".format(order_id, e))
             return False
 
+    """
+        Place a limit order without blocking the caller. The request is sent on the gateway event loop through the
+        shared AsyncClient session, so depth and execution processing keep running while it is in flight.
+        Return a future resolving to True if the order is accepted, False otherwise. Do not wait on the future from
+        a gateway callback, use future.add_done_callback() instead.
+    """
+    def place_limit_order_async(self, side: Side, price, quantity, tif='IOC') -> Future:
+        return asyncio.run_coroutine_threadsafe(self._place_limit_order(side, price, quantity, tif), self._loop)
+
+    """
+        Cancel an order without blocking the caller, see place_limit_order_async.
+        Return a future resolving to True if the cancel is accepted, False otherwise.
+    """
+    def cancel_order_async(self, symbol, order_id) -> Future:
+        return asyncio.run_coroutine_threadsafe(self._cancel_order(symbol, order_id), self._loop)
+
+    async def _place_limit_order(self, side: Side, price, quantity, tif) -> bool:
+        try:
+            if self._ws_api:
+                await self._ws_api.place_order(symbol=self._symbol,
+                                               side=side.name,
+                                               type='LIMIT',
+                                               price=self._format_price(price),
+                                               quantity=self._format_quantity(quantity),
+                                               timeInForce=tif)
+            else:
+                await self._async_client.futures_create_order(symbol=self._symbol,
+                                                              side=side.name,
+                                                              type='LIMIT',
+                                                              price=self._format_price(price),
+                                                              quantity=self._format_quantity(quantity),
+                                                              timeInForce=tif)
+            return True
+        except Exception as e:
+            logging.info("Failed to place order: {}".format(e))
+            return False
+
+    async def _cancel_order(self, symbol, order_id) -> bool:
+        try:
+            if self._ws_api:
+                await self._ws_api.cancel_order(symbol, client_order_id=order_id)
+            else:
+                await self._async_client.futures_cancel_order(symbol=symbol, origClientOrderId=order_id)
+            return True
+        except Exception as e:
+            logging.warning("Failed to cancel order: {}, {}".format(order_id, e))
+            return False
+
+    """
+        Place several orders with batch requests of up to 5 orders each.
+        A post only limit order is sent as GTX, other limit orders with the given time in force.
+        Return one boolean per order, True if the order is accepted.
+    """
+    def place_orders(self, orders: [NewOrderSingle], tif='GTC') -> [bool]:
+        results = []
+        for batch in _chunks(orders, MAX_BATCH_ORDERS):
+            try:
+                responses = self._client.futures_place_batch_order(
+                    batchOrders=[self._batch_order_params(order, tif) for order in batch])
+                results.extend(self._batch_results(responses, 'place order'))
+            except Exception as e:
+                logging.info("Failed to place orders: {}".format(e))
+                results.extend([False] * len(batch))
+        return results
+
+    """
+        Cancel several orders by client order id with batch requests of up to 10 orders each.
+        Return one boolean per order id, True if the cancel is accepted.
+    """
+    def cancel_orders(self, symbol, order_ids: [str]) -> [bool]:
+        results = []
+        for batch in _chunks(order_ids, MAX_BATCH_CANCELS):
+            try:
+                responses = self._client.futures_cancel_orders(symbol=symbol,
+                                                               origClientOrderIdList=json.dumps(batch))
+                results.extend(self._batch_results(responses, 'cancel order'))
+            except Exception as e:
+                logging.warning("Failed to cancel orders: {}, {}".format(batch, e))
+                results.extend([False] * len(batch))
+        return results
+
+    """
+        Place several orders without blocking the caller, batches are sent concurrently from the gateway event loop.
+        Return a future resolving to one boolean per order, see place_orders.
+    """
+    def place_orders_async(self, orders: [NewOrderSingle], tif='GTC') -> Future:
+        return asyncio.run_coroutine_threadsafe(self._place_orders(orders, tif), self._loop)
+
+    """
+        Cancel several orders without blocking the caller, batches are sent concurrently on the gateway event loop.
+        Return a future resolving to one boolean per order id, see cancel_orders.
+    """
+    def cancel_orders_async(self, symbol, order_ids: [str]) -> Future:
+        return asyncio.run_coroutine_threadsafe(self._cancel_orders(symbol, order_ids), self._loop)
+
+    async def _place_orders(self, orders: [NewOrderSingle], tif) -> [bool]:
+        loop = asyncio.get_running_loop()
+
+        # AsyncClient.futures_place_batch_order URL-encodes batchOrders before the request is encoded again, so
+        # depending on the python-binance version the exchange cannot parse it; batches are sent by the synchronous
+        # client, which encodes it once, on executor threads so that the loop keeps running
+        async def _place_batch(batch):
+            try:
+                batch_params = [self._batch_order_params(order, tif) for order in batch]
+                responses = await loop.run_in_executor(
+                    None, lambda: self._client.futures_place_batch_order(batchOrders=batch_params))
+                return self._batch_results(responses, 'place order')
+            except Exception as e:
+                logging.info("Failed to place orders: {}".format(e))
+                return [False] * len(batch)
+
+        results = await asyncio.gather(*[_place_batch(batch) for batch in _chunks(orders, MAX_BATCH_ORDERS)])
+        return [result for batch_results in results for result in batch_results]
+
+    async def _cancel_orders(self, symbol, order_ids: [str]) -> [bool]:
+        async def _cancel_batch(batch):
+            try:
+                responses = await self._async_client.futures_cancel_orders(symbol=symbol,
+                                                                           origClientOrderIdList=json.dumps(batch))
+                return self._batch_results(responses, 'cancel order')
+            except Exception as e:
+                logging.warning("Failed to cancel orders: {}, {}".format(batch, e))
+                return [False] * len(batch)
+
+        results = await asyncio.gather(*[_cancel_batch(batch) for batch in _chunks(order_ids, MAX_BATCH_CANCELS)])
+        return [result for batch_results in results for result in batch_results]
+
+    # blocking order methods go through the WebSocket API session, except on the gateway loop thread itself
+    # (from a callback), where waiting for the response would block the loop, so REST is used instead
+    def _use_ws_api(self) -> bool:
+        return self._ws_api is not None and current_thread() is not self._loop_thread
+
+    # order price and quantity as sent to the exchange, through the instrument details if given
+    def _format_price(self, price) -> str:
+        if self._instrument is None:
+            return str(price)
+        return self._instrument.format_price(self._instrument.to_ticks(price))
+
+    def _format_quantity(self, quantity) -> str:
+        if self._instrument is None or not self._instrument.quantity_size:
+            return str(quantity)
+        return self._instrument.format_quantity(self._instrument.to_lots(quantity))
+
+    # order parameters of a batch order request
+    def _batch_order_params(self, order: NewOrderSingle, tif) -> dict:
+        params = {
+            'symbol': order.symbol,
+            'side': order.side.name,
+            'quantity': self._format_quantity(order.quantity),
+        }
+        if order.type == OrderType.Market:
+            params['type'] = 'MARKET'
+        else:
+            params['type'] = 'LIMIT'
+            params['price'] = self._format_price(order.price)
+            params['timeInForce'] = 'GTX' if order.post_only else tif
+        return params
+
+    # a batch response has one entry per order, either the order or an error with code and msg
+    @staticmethod
+    def _batch_results(responses: list, action: str) -> [bool]:
+        results = []
+        for response in responses:
+            success = 'orderId' in response
+            if not success:
+                logging.warning("Failed to {}: code={}, msg={}".format(action, response.get('code'), response.get('msg')))
+            results.append(success)
+        return results
+
     """ 
         Register a depth callback function that takes one argument: (book: VenueOrderBook) 
     """
@@ -0,0 +1,37 @@
+"""
+Run the pricing strategy on recorded market data instead of the exchange, see workshop/misc/run_data_collector.py
+to record it. Orders are simulated by the ReplayGateway, events are replayed as fast as possible.
+
+"""
+import importlib
+import logging
+import time
+from common.interface_order import InstrumentDetails
+from gateways.replay_gateway import ReplayGateway
+
+logging.basicConfig(format='%(asctime)s [%(threadName)-12.12s] [%(levelname)-5.5s]  %(message)s', level=logging.INFO)
+
+# the strategy module name starts with a digit, it cannot be imported with an import statement
+PricingStrategy = importlib.import_module('workshop.week_07.1_pricing_strategy_ans').PricingStrategy
+
+
+if __name__ == '__main__':
+    # strategy parameters
+    symbol = 'BTCUSDT'
+    order_size = 0.01
+    sensitivity = 0.1
+    instrument = InstrumentDetails(symbol, tick_size=0.1, quantity_size=0.001)
+
+    # replay gateway in place of the binance gateway, speed=None to replay as fast as possible
+    replay_gateway = ReplayGateway('/data/recordings', [symbol], speed=None, exchange_name='Binance')
+
+    # the strategy callbacks take the book and the order event only
+    strategy = PricingStrategy(symbol, order_size, sensitivity, replay_gateway, instrument)
+    replay_gateway.register_execution_callback(lambda exchange_name, order_event: strategy.on_execution(order_event))
+    replay_gateway.register_depth_callback(lambda exchange_name, order_book: strategy.on_orderbook(order_book))
+
+    strategy.start()
+    start = time.time()
+    replay_gateway.run()
+    logging.info('Replayed {} events in {:.1f} seconds, position {}'.format(
+        replay_gateway.events_replayed, time.time() - start, replay_gateway.get_position(symbol)))